@@ -565,50 +565,229 @@
 
 
 
-from flask import Flask, request, jsonify, render_template
-import yfinance as yf
-import pandas as pd
+import datetime as dt
+import json
+import math
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+import time
+
+from flask import Blueprint, Flask, Response, current_app, g, request, jsonify, render_template, stream_with_context
 import numpy as np
 from flask_cors import CORS
 
-app = Flask(__name__)
-CORS(app)
-
-@app.route("/api/companies")
+from backtest import backtest_bars
+from barstore import PERIODS, Bars, CalendarIndex, normalize_symbol, period_start
+from downsample import METHODS as DOWNSAMPLE_METHODS, downsample_columns
+from correlation import CorrelationService
+from encoding import JSON_MIME, encode, offered_mimetypes
+from fundamentals import FundamentalsCache, extract_financials
+from indicators import IndicatorEngine
+from ingest import AppendStore, Ingestor, LiveIndicators, ReplayFeeder
+from metrics import Registry, Timings
+from montecarlo import monte_carlo, summarize
+from portfolio import ALLOCATIONS, portfolio_backtest
+from providers import get_provider
+from respcache import CachedResponse, ResponseCache, compressions
+from resample import DAILY, parse_interval, resample
+from screener import FilterError, LatestTable
+from sweep import parse_range, sweep
+from walkforward import walk_forward
+
+# routes are registered on ``api``; ``create_app`` builds a Flask app with its own ``Services``
+api = Blueprint("api", __name__)
+
+metrics = Registry()
+request_latency = metrics.histogram("tradex_request_seconds", "Request latency by route.",
+                                    ("method", "route", "status"))
+stage_latency = metrics.histogram("tradex_stage_seconds", "Time spent per request stage.", ("route", "stage"))
+upstream_latency = metrics.histogram("tradex_upstream_seconds", "Provider call latency.", ("call",))
+upstream_errors = metrics.counter("tradex_upstream_errors_total", "Provider calls that raised.", ("call",))
+# Server-Timing headers are opt-in: they expose internals to every client
+SERVER_TIMING = os.environ.get("TRADEX_SERVER_TIMING", "") not in ("", "0")
+
+def upstream(call, fn, *args):
+    """``fn(*args)`` with its latency and failures recorded under ``call``."""
+    start = time.perf_counter()
+    try:
+        return fn(*args)
+    except Exception:
+        upstream_errors.inc(call)
+        raise
+    finally:
+        upstream_latency.observe(time.perf_counter() - start, call)
+
+def mark(stage):
+    timings = g.get("timings")
+    if timings is not None:
+        timings.mark(stage)
+
+# provider-backed symbols have no version to compare; their responses expire after this many seconds
+RESPONSE_TTL = float(os.environ.get("TRADEX_RESPONSE_TTL", 60))
+
+class Services:
+    """Provider, stores and caches behind one app's routes, kept in ``app.extensions["tradex"]``."""
+
+    def __init__(self):
+        self.provider = provider = get_provider()
+        # failures the provider falls back from never reach upstream(); count them too
+        provider.report_errors(lambda call, exc: upstream_errors.inc(call))
+        self.fundamentals = FundamentalsCache(
+            lambda symbol: extract_financials(upstream("info", self.provider.info, symbol)),
+            snapshot_path=os.environ.get("TRADEX_FUNDAMENTALS_SNAPSHOT"),
+        )
+        # TRADEX_INGEST=replay replays Data/ from TRADEX_REPLAY_START into an append-only store
+        store = provider.store
+        self.ingestor = self.live = None
+        if store is not None and os.environ.get("TRADEX_INGEST") == "replay":
+            feeder = ReplayFeeder(store, start=os.environ.get("TRADEX_REPLAY_START"),
+                                  speed=float(os.environ.get("TRADEX_REPLAY_SPEED", 1)))
+            store = AppendStore(store, until=feeder.start, journal_dir=os.environ.get("TRADEX_JOURNAL_DIR"))
+            self.ingestor = Ingestor(feeder, store)
+            self.live = LiveIndicators(store)
+        self.store = store
+        # indicators for every symbol in Data/, computed once and sliced per request
+        self.engine = IndicatorEngine(store) if store is not None else None
+        # batch requests fan out per symbol; provider calls are I/O bound
+        self.batch_pool = ThreadPoolExecutor(max_workers=int(os.environ.get("TRADEX_BATCH_WORKERS", 8)))
+        # sweep, walk-forward and Monte Carlo share one process pool, started on first use (after any fork)
+        self.compute_workers = int(os.environ.get("TRADEX_COMPUTE_WORKERS", 0)) or os.cpu_count() or 1
+        self._compute_pool = None
+        self._compute_lock = threading.Lock()
+        # latest indicator values per symbol, built on the first screen and updated per appended bar
+        self.screener = LatestTable(store)
+        # return correlation/covariance per (symbols, window, end date)
+        self.correlations = CorrelationService(store)
+        # encoded /api/data bodies with ETags, keyed by the request and tagged with the data version
+        self.responses = ResponseCache(maxsize=int(os.environ.get("TRADEX_RESPONSE_CACHE_SIZE", 512)))
+        if self.ingestor is not None:
+            store.listeners += [
+                self.live.on_append,
+                lambda bar: self.screener.append(bar.symbol, bar.date, bar.close, bar.volume),
+                lambda bar: self.engine.invalidate(bar.symbol),
+                lambda bar: self.correlations.invalidate(bar.symbol),
+                lambda bar: self.responses.invalidate_symbol(bar.symbol),
+            ]
+
+    def warm(self):
+        """Load the bar store and precompute what the first requests would otherwise build.
+
+        Run before a pre-forking server forks (see ``gunicorn.conf.py``) so workers
+        share the arrays copy-on-write instead of each building them.
+        """
+        if self.store is None:
+            return
+        self.store.symbols()
+        if self.engine is not None:
+            self.engine.warm()
+        if self.live is not None:
+            self.live.warm()
+        self.screener.ensure_built()
+
+    def compute_pool(self):
+        with self._compute_lock:
+            if self._compute_pool is None:
+                self._compute_pool = ProcessPoolExecutor(max_workers=self.compute_workers)
+            return self._compute_pool
+
+    def close(self):
+        """Shut down the worker pools."""
+        with self._compute_lock:
+            if self._compute_pool is not None:
+                self._compute_pool.shutdown(cancel_futures=True)
+                self._compute_pool = None
+        self.batch_pool.shutdown(wait=False, cancel_futures=True)
+
+    def start_ingest(self):
+        """Start the ingest thread; after the fork when pre-forking, threads do not survive it."""
+        if self.ingestor is not None:
+            self.ingestor.start()
+
+    def stats(self):
+        return {"fundamentals": self.fundamentals.stats(), "correlation": self.correlations.stats(),
+                "responses": self.responses.stats()}
+
+def current_services():
+    """``Services`` of the app handling the current request."""
+    return current_app.extensions["tradex"]
+
+def create_app(warm_caches=None, start_background=True):
+    """Flask app with its own ``Services``; ``warm_caches`` defaults to ``TRADEX_WARM``."""
+    flask_app = Flask(__name__)
+    CORS(flask_app)
+    services = flask_app.extensions["tradex"] = Services()
+    flask_app.register_blueprint(api)
+    if warm_caches is None:
+        warm_caches = os.environ.get("TRADEX_WARM", "") not in ("", "0")
+    if warm_caches:
+        services.warm()
+    if start_background:
+        services.start_ingest()
+    return flask_app
+
+def __getattr__(name):
+    # ``app.app`` (gunicorn app:app, flask run, scripts) builds the default app on first use
+    global app
+    if name == "app":
+        app = create_app()
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+RANGE_MAP = {
+    "1d": "1d",
+    "1w": "5d",
+    "1m": "1mo",
+    "3m": "3mo",
+    "1y": "1y",
+    "2y": "2y"
+}
+MAX_BATCH = 100
+MAX_MC_PATHS = 50000
+# short x long window grid of one /api/sweep or /api/walkforward request
+MAX_SWEEP_PAIRS = 10000
+
+COMPANIES = [
+    {"symbol": "INFY.NS", "name": "Infosys"},
+    {"symbol": "TCS.NS", "name": "Tata Consultancy Services"},
+    {"symbol": "RELIANCE.NS", "name": "Reliance Industries"},
+    {"symbol": "HDFCBANK.NS", "name": "HDFC Bank"},
+    {"symbol": "ITC.NS", "name": "ITC"},
+    {"symbol": "WIPRO.NS", "name": "Wipro"},
+    {"symbol": "BHARTIARTL.NS", "name": "Bharti Airtel"},
+    {"symbol": "LT.NS", "name": "Larsen & Toubro"},
+    {"symbol": "ICICIBANK.NS", "name": "ICICI Bank"},
+    {"symbol": "AXISBANK.NS", "name": "Axis Bank"},
+    {"symbol": "KOTAKBANK.NS", "name": "Kotak Mahindra Bank"},
+    {"symbol": "SBIN.NS", "name": "State Bank of India"},
+    {"symbol": "ASIANPAINT.NS", "name": "Asian Paints"},
+    {"symbol": "BAJFINANCE.NS", "name": "Bajaj Finance"},
+    {"symbol": "ULTRACEMCO.NS", "name": "UltraTech Cement"},
+    {"symbol": "MARUTI.NS", "name": "Maruti Suzuki"},
+    {"symbol": "SUNPHARMA.NS", "name": "Sun Pharma"},
+    {"symbol": "HINDUNILVR.NS", "name": "Hindustan Unilever"},
+    {"symbol": "TITAN.NS", "name": "Titan Company"},
+    {"symbol": "HCLTECH.NS", "name": "HCL Technologies"},
+    {"symbol": "ADANIENT.NS", "name": "Adani Enterprises"},
+    {"symbol": "ADANIGREEN.NS", "name": "Adani Green Energy"},
+    {"symbol": "ADANIPORTS.NS", "name": "Adani Ports"},
+    {"symbol": "JSWSTEEL.NS", "name": "JSW Steel"},
+    {"symbol": "TATAMOTORS.NS", "name": "Tata Motors"},
+    {"symbol": "POWERGRID.NS", "name": "Power Grid Corporation"},
+    {"symbol": "NTPC.NS", "name": "NTPC"},
+    {"symbol": "ONGC.NS", "name": "ONGC"},
+    {"symbol": "COALINDIA.NS", "name": "Coal India"},
+    {"symbol": "BPCL.NS", "name": "Bharat Petroleum"},
+]
+
+# the list never changes: encoded (and gzipped) once, served with an ETag
+COMPANIES_RESPONSE = CachedResponse(
+    None, json.dumps(COMPANIES, sort_keys=True, separators=(",", ":")).encode() + b"\n", JSON_MIME, 1024)
+
+@api.route("/api/companies")
 def get_companies():
-    companies = [
-        {"symbol": "INFY.NS", "name": "Infosys"},
-        {"symbol": "TCS.NS", "name": "Tata Consultancy Services"},
-        {"symbol": "RELIANCE.NS", "name": "Reliance Industries"},
-        {"symbol": "HDFCBANK.NS", "name": "HDFC Bank"},
-        {"symbol": "ITC.NS", "name": "ITC"},
-        {"symbol": "WIPRO.NS", "name": "Wipro"},
-        {"symbol": "BHARTIARTL.NS", "name": "Bharti Airtel"},
-        {"symbol": "LT.NS", "name": "Larsen & Toubro"},
-        {"symbol": "ICICIBANK.NS", "name": "ICICI Bank"},
-        {"symbol": "AXISBANK.NS", "name": "Axis Bank"},
-        {"symbol": "KOTAKBANK.NS", "name": "Kotak Mahindra Bank"},
-        {"symbol": "SBIN.NS", "name": "State Bank of India"},
-        {"symbol": "ASIANPAINT.NS", "name": "Asian Paints"},
-        {"symbol": "BAJFINANCE.NS", "name": "Bajaj Finance"},
-        {"symbol": "ULTRACEMCO.NS", "name": "UltraTech Cement"},
-        {"symbol": "MARUTI.NS", "name": "Maruti Suzuki"},
-        {"symbol": "SUNPHARMA.NS", "name": "Sun Pharma"},
-        {"symbol": "HINDUNILVR.NS", "name": "Hindustan Unilever"},
-        {"symbol": "TITAN.NS", "name": "Titan Company"},
-        {"symbol": "HCLTECH.NS", "name": "HCL Technologies"},
-        {"symbol": "ADANIENT.NS", "name": "Adani Enterprises"},
-        {"symbol": "ADANIGREEN.NS", "name": "Adani Green Energy"},
-        {"symbol": "ADANIPORTS.NS", "name": "Adani Ports"},
-        {"symbol": "JSWSTEEL.NS", "name": "JSW Steel"},
-        {"symbol": "TATAMOTORS.NS", "name": "Tata Motors"},
-        {"symbol": "POWERGRID.NS", "name": "Power Grid Corporation"},
-        {"symbol": "NTPC.NS", "name": "NTPC"},
-        {"symbol": "ONGC.NS", "name": "ONGC"},
-        {"symbol": "COALINDIA.NS", "name": "Coal India"},
-        {"symbol": "BPCL.NS", "name": "Bharat Petroleum"},
-    ]
-    return jsonify(companies)
+    return cached_response(COMPANIES_RESPONSE)
 
 # Helper Functions
 def calculate_rsi(data, window=14):
@@ -631,68 +810,677 @@ def calculate_macd(data, fast=12, slow=26, signal=9):
 def calculate_ma(data, window):
     return data.rolling(window=window).mean()
 
-@app.route("/")
+def rounded(values):
+    values = np.round(values, 2)
+    return np.where(np.isnan(values), 0.0, values)
+
+def index_dates(df):
+    # calendar dates of the (possibly tz-aware) index as datetime64[D]
+    index = df.index.tz_localize(None) if getattr(df.index, "tz", None) is not None else df.index
+    return np.asarray(index, dtype="datetime64[D]")
+
+def series_columns(series, ma_range):
+    bars = series["bars"]
+    columns = {
+        "dates": bars.dates,
+        "close": np.round(bars.close, 2),
+        "rsi": rounded(series["rsi"]),
+        "macd": rounded(series["macd"]),
+        "signal": rounded(series["signal"]),
+    }
+    for window in ma_range:
+        columns[f"ma{window}"] = rounded(series["ma"][window])
+    return columns
+
+def history_columns(df, ma_range):
+    close = df["Close"]
+    macd, signal = calculate_macd(close)
+    columns = {
+        "dates": index_dates(df),
+        "close": np.round(close.to_numpy(dtype=float), 2),
+        "rsi": rounded(calculate_rsi(close).to_numpy(dtype=float)),
+        "macd": rounded(macd.to_numpy(dtype=float)),
+        "signal": rounded(signal.to_numpy(dtype=float)),
+    }
+    for window in ma_range:
+        columns[f"ma{window}"] = rounded(calculate_ma(close, window).to_numpy(dtype=float))
+    return columns
+
+def graph_lists(columns):
+    return {
+        name: np.datetime_as_string(values, unit="D").tolist() if name == "dates" else values.tolist()
+        for name, values in columns.items()
+    }
+
+def graph_from_series(series, ma_range):
+    return graph_lists(series_columns(series, ma_range))
+
+def graph_from_history(df, ma_range):
+    return graph_lists(history_columns(df, ma_range))
+
+def parse_ma_range(value):
+    try:
+        ma_range = [int(w) for w in value[:2]]
+    except (TypeError, ValueError):
+        return None
+    if len(ma_range) != 2 or min(ma_range) < 1:
+        return None
+    return ma_range
+
+def parse_symbols(value):
+    """``symbols`` of a request body: a list of strings, or ``None`` when absent; ``TypeError`` otherwise."""
+    if value is None:
+        return None
+    if not isinstance(value, list) or not all(isinstance(s, str) for s in value):
+        raise TypeError("symbols must be a list of strings")
+    return value
+
+def parse_principal(value):
+    """``value`` as a finite positive amount; ``ValueError`` otherwise."""
+    principal = float(value)
+    if not math.isfinite(principal) or principal <= 0:
+        raise ValueError(f"invalid principal {value!r}")
+    return principal
+
+def backtest_payload(result):
+    series, trades = result["series"], result["trades"]
+    return {
+        "series": {
+            "dates": np.datetime_as_string(series["dates"], unit="D").tolist(),
+            "close": np.round(series["close"], 2).tolist(),
+            "maShort": np.round(series["maShort"], 2).tolist(),
+            "maLong": np.round(series["maLong"], 2).tolist(),
+        },
+        "trades": {
+            "date": np.datetime_as_string(trades["date"], unit="D").tolist(),
+            "action": trades["action"].tolist(),
+            "close": np.round(trades["close"], 2).tolist(),
+            "maShort": np.round(trades["maShort"], 2).tolist(),
+            "maLong": np.round(trades["maLong"], 2).tolist(),
+            "qty": trades["qty"].tolist(),
+            "invest": np.round(trades["invest"], 2).tolist(),
+            "gainLoss": [None if np.isnan(v) else v for v in np.round(trades["gainLoss"], 2).tolist()],
+            "principal": np.round(trades["principal"], 2).tolist(),
+        },
+        "finalPrincipal": round(result["finalPrincipal"], 2),
+    }
+
+def frame_bars(symbol, df):
+    return Bars(
+        symbol,
+        index_dates(df),
+        *(df[col].to_numpy(dtype=float) for col in ("Open", "High", "Low", "Close")),
+        np.nan_to_num(df["Volume"].to_numpy(dtype=float)).astype(np.int64),
+    )
+
+def serves_locally(services, symbol, interval=DAILY):
+    """Whether ``build_columns`` answers ``symbol`` from precomputed indicators, without the provider."""
+    if services.live is not None and interval == DAILY and symbol in services.live.store:
+        return True
+    return services.engine is not None and symbol in services.engine.store
+
+# bars fetched ahead of a provider symbol's period, so its MACD and RSI have converged to
+# the full-history values that local symbols get (EMAs with spans up to 26 bars)
+WARMUP_BARS = 250
+
+def history_period(period, ma_range):
+    """Provider period covering ``period`` plus the indicator warm-up before it."""
+    kind, amount = PERIODS.get(period, PERIODS["1mo"])
+    if amount is None:
+        return "max"
+    # ~21 trading days a month
+    months = (amount if kind == "months" else 1) + math.ceil(max(WARMUP_BARS, *ma_range) / 21)
+    return next((name for name, (k, a) in PERIODS.items() if k == "months" and a >= months), "max")
+
+def build_columns(services, symbol, period, ma_range, df=None, years=(), months=(), interval=DAILY):
+    """``graph`` part of the /api/data response as arrays, or ``None`` if there are no bars.
+
+    Symbols in Data/ are served from the precomputed indicators, others from
+    ``df`` or the provider. With ``years``/``months`` the bars of those calendar
+    months are returned instead of the trailing ``period``; indicators are
+    computed over the full history first so there is no warm-up gap per bucket.
+    ``df`` may reach back further than ``period`` (see ``history_period``): the
+    indicators are computed over all of it and then cut to ``period``.
+    Bars are aggregated to ``interval`` before indicators are computed.
+    """
+    custom = bool(len(years) or len(months))
+    if services.live is not None and interval == DAILY and symbol in services.live.store:
+        rows = services.live.store.calendar(symbol).rows(years, months) if custom else None
+        series = services.live.lookup(symbol, period, ma_range, rows=rows)
+        if len(series["bars"]) == 0:
+            return None
+        return series_columns(series, ma_range)
+    if services.engine is not None and symbol in services.engine.store:
+        rows = services.engine.calendar(symbol, interval).rows(years, months) if custom else None
+        series = services.engine.lookup(symbol, period, ma_range, rows=rows, interval=interval)
+        if len(series["bars"]) == 0:
+            return None
+        return series_columns(series, ma_range)
+    if df is None:
+        df = upstream("history", services.provider.history, symbol,
+                      "max" if custom else history_period(period, ma_range))
+        mark("history")
+    if df.empty:
+        return None
+    if interval != DAILY:
+        df = resample(frame_bars(symbol, df), interval).to_frame()
+    columns = history_columns(df, ma_range)
+    if custom:
+        rows = CalendarIndex(columns["dates"]).rows(years, months)
+        if len(rows) == 0:
+            return None
+        columns = {name: values[rows] for name, values in columns.items()}
+    else:
+        start = period_start(columns["dates"], period)
+        columns = {name: values[start:] for name, values in columns.items()}
+    return columns
+
+MONTH_NAMES = ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]
+
+def parse_calendar(months, years):
+    """customMonths (1-12 or names like "Mar") and customYears as int lists, or ``None`` if invalid."""
+    try:
+        months = [
+            MONTH_NAMES.index(m.strip().lower()[:3]) + 1
+            if isinstance(m, str) and not m.strip().isdigit() else int(m)
+            for m in (months or [])
+        ]
+        years = [int(y) for y in (years or [])]
+    except (TypeError, ValueError):
+        return None
+    if any(not 1 <= m <= 12 for m in months):
+        return None
+    return months, years
+
+def parse_data_request(data, accept_mimetypes):
+    """``(params, None)`` for a valid /api/data request body, else ``(None, error message)``.
+
+    ``accept_mimetypes`` (a werkzeug ``MIMEAccept``) picks the encoding among
+    ``offered_mimetypes``. Shared by the Flask and the ASGI app.
+    """
+    symbol = data.get("symbol")
+    if not symbol:
+        return None, "Symbol is required"
+    if not isinstance(symbol, str):
+        return None, "symbol must be a string"
+
+    ma_range = parse_ma_range(data.get("maRange", [20, 30]))
+    if ma_range is None:
+        return None, "maRange must be two positive integers"
+
+    calendar = parse_calendar(data.get("customMonths", []), data.get("customYears", []))
+    if calendar is None:
+        return None, "customMonths must be months (1-12 or names), customYears integers"
+    months, years = calendar
+
+    try:
+        interval = parse_interval(data.get("interval", DAILY))
+    except ValueError:
+        return None, "interval must be 1d, 1w, 1mo or <N>d (N calendar days)"
+
+    max_points = method = None
+    if data.get("maxPoints") is not None:
+        method = data.get("downsample", "lttb")
+        try:
+            max_points = int(data["maxPoints"])
+        except (TypeError, ValueError):
+            max_points = 0
+        if max_points < 3 or method not in DOWNSAMPLE_METHODS:
+            return None, "maxPoints must be an integer >= 3 and downsample lttb or minmax"
+
+    return {
+        "symbol": symbol,
+        "period": RANGE_MAP.get(data.get("range", "1m"), "1mo"),
+        "ma_range": ma_range,
+        "months": months,
+        "years": years,
+        "interval": interval,
+        "max_points": max_points,
+        "method": method,
+        "mimetype": accept_mimetypes.best_match(offered_mimetypes(), default=JSON_MIME),
+    }, None
+
+def encode_data(payload, mimetype, dumps):
+    """Body and content type of a /api/data ``payload`` whose graph is still arrays.
+
+    JSON goes through ``dumps`` (the app's JSON provider), the other encodings
+    through ``encoding.encode``.
+    """
+    if mimetype != JSON_MIME:
+        return encode(payload, mimetype)
+    payload = dict(payload, graph=graph_lists(payload["graph"]))
+    return dumps(payload).encode() + b"\n", JSON_MIME
+
+def data_payload(services, symbol, graph_data, ma_range):
+    return {
+        "graph": graph_data,
+        "financials": services.fundamentals.get(symbol),
+        "maLabels": [f"MA{ma_range[0]}", f"MA{ma_range[1]}"]
+    }
+
+def data_version(services, symbol):
+    """What a cached /api/data response of ``symbol`` was built from.
+
+    Local bars are identified by their count and last date; the day is part of
+    it too so fundamentals (cached for a day) are refetched. Provider data is
+    versioned by ``RESPONSE_TTL`` buckets.
+    """
+    today = dt.date.today().isoformat()
+    bars = services.store.get(symbol) if services.store is not None and symbol in services.store else None
+    if bars is None:
+        return (today, int(time.time() // RESPONSE_TTL) if RESPONSE_TTL > 0 else time.time())
+    return (today, len(bars), str(bars.dates[-1]) if len(bars) else None)
+
+def cached_response(entry, cache=None):
+    """Serve ``entry``: 304 if the client holds its ETag, else the body in the best accepted coding.
+
+    Only GET and HEAD answer a matching ``If-None-Match`` with 304; for other
+    methods it is a failed precondition (412, RFC 9110).
+    """
+    etag = f'"{entry.etag}"'
+    headers = {"ETag": etag, "Vary": "Accept, Accept-Encoding", "Cache-Control": "no-cache"}
+    if request.if_none_match.contains(entry.etag):
+        if request.method not in ("GET", "HEAD"):
+            return Response(status=412, headers=headers)
+        if cache is not None:
+            cache.count_not_modified()
+        return Response(status=304, headers=headers)
+    coding = request.accept_encodings.best_match(compressions() + ("identity",), default="identity")
+    body, coding = entry.variant(coding)
+    if coding is not None:
+        headers["Content-Encoding"] = coding
+    return Response(body, content_type=entry.content_type, headers=headers)
+
+@api.before_app_request
+def start_timings():
+    g.timings = Timings()
+
+@api.after_app_request
+def record_timings(response):
+    timings = g.pop("timings", None)
+    if timings is None:
+        return response
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    request_latency.observe(timings.total(), request.method, route, response.status_code)
+    stage_latency.observe_many([(seconds, (route, stage)) for stage, seconds in timings.stages])
+    if SERVER_TIMING:
+        response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+@api.route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/api/data", methods=["POST"])
+# /api/data query arguments holding lists: "maRange=20,30" or "maRange=20&maRange=30"
+LIST_ARGS = ("maRange", "customMonths", "customYears")
+
+def data_args(args):
+    """The JSON body equivalent of /api/data query arguments."""
+    data = args.to_dict()
+    for name in LIST_ARGS:
+        if name in args:
+            data[name] = [v for value in args.getlist(name) for v in value.split(",") if v.strip()]
+    return data
+
+@api.route("/api/data", methods=["GET", "POST"])
 def get_data():
-    data = request.json
+    # GET takes the body's fields as query arguments and is the one to revalidate with If-None-Match
+    services = current_services()
+    data = (request.json or {}) if request.method == "POST" else data_args(request.args)
+    params, error = parse_data_request(data, request.accept_mimetypes)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    symbol, period, ma_range = params["symbol"], params["period"], params["ma_range"]
+    months, years, interval = params["months"], params["years"], params["interval"]
+    max_points, method, mimetype = params["max_points"], params["method"], params["mimetype"]
+    mark("parse")
+
+    # the body only depends on these and on the data version, so a repeat is served as stored bytes
+    key = (normalize_symbol(symbol), symbol.upper(), period, tuple(ma_range), tuple(months), tuple(years),
+           str(interval), max_points, method, mimetype)
+    version = data_version(services, key[0])
+    entry = services.responses.get(key, version)
+    if entry is not None:
+        mark("cache")
+        return cached_response(entry, services.responses)
+
+    columns = build_columns(services, symbol, period, ma_range, years=years, months=months, interval=interval)
+    if columns is None:
+        return jsonify({"error": "No data found"}), 404
+    mark("indicators")
+
+    if max_points is not None:
+        # indices chosen on the close so every series stays aligned
+        columns = downsample_columns(columns, max_points, method)
+        mark("downsample")
+
+    payload = data_payload(services, symbol, columns, ma_range)
+    mark("fundamentals")
+    body, content_type = encode_data(payload, mimetype, current_app.json.dumps)
+    entry = services.responses.put(key, key[0], version, body, content_type)
+    mark("serialize")
+    return cached_response(entry, services.responses)
+
+def batch_symbol(services, symbol, specs):
+    """Answer every ``(key, period, ma_range)`` spec of one symbol with a single bar load."""
+    df_all = None
+    if services.engine is None or symbol not in services.engine.store:
+        longest = max((history_period(period, ma_range) for _, period, ma_range in specs), key=list(PERIODS).index)
+        df_all = upstream("history", services.provider.history, symbol, longest)
+
+    results = {}
+    for key, period, ma_range in specs:
+        # build_columns cuts the indicators computed over all of df_all to period
+        columns = build_columns(services, symbol, period, ma_range, df_all)
+        if columns is None:
+            results[key] = {"error": "No data found"}
+        else:
+            results[key] = data_payload(services, symbol, graph_lists(columns), ma_range)
+    return results
+
+@api.route("/api/data/batch", methods=["POST"])
+def get_data_batch():
+    data = request.json or {}
+    specs = data.get("requests")
+    if not isinstance(specs, list) or not specs:
+        return jsonify({"error": "requests must be a non-empty list"}), 400
+    if len(specs) > MAX_BATCH:
+        return jsonify({"error": f"At most {MAX_BATCH} requests per batch"}), 400
+
+    errors = {}
+    by_symbol = {}
+    for n, spec in enumerate(specs):
+        spec = spec if isinstance(spec, dict) else {}
+        symbol = spec.get("symbol")
+        range_key = spec.get("range", "1m")
+        ma_range = parse_ma_range(spec.get("maRange", [20, 30]))
+        if symbol and ma_range is not None:
+            key = spec.get("id") or f"{symbol}:{range_key}:{ma_range[0]}-{ma_range[1]}"
+        else:
+            key = spec.get("id") or str(n)
+        if not symbol:
+            errors[key] = {"error": "Symbol is required"}
+        elif ma_range is None:
+            errors[key] = {"error": "maRange must be two positive integers"}
+        else:
+            period = RANGE_MAP.get(range_key, "1mo")
+            by_symbol.setdefault(symbol, []).append((key, period, ma_range))
+
+    services = current_services()
+    futures = {services.batch_pool.submit(batch_symbol, services, symbol, group): group
+               for symbol, group in by_symbol.items()}
+
+    def generate():
+        # one JSON object, written out symbol by symbol as the lookups finish
+        yield "{"
+        sep = ""
+        for key, value in errors.items():
+            yield sep + json.dumps(key) + ":" + json.dumps(value)
+            sep = ","
+        for future in as_completed(futures):
+            try:
+                results = future.result()
+            except Exception:
+                results = {key: {"error": "Upstream error"} for key, _, _ in futures[future]}
+            for key, value in results.items():
+                yield sep + json.dumps(key) + ":" + json.dumps(value)
+                sep = ","
+        yield "}"
+
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+@api.route("/api/backtest", methods=["POST"])
+def get_backtest():
+    data = request.json or {}
+    services = current_services()
     symbol = data.get("symbol")
-    ma_range = data.get("maRange", [20, 30])
-    custom_months = data.get("customMonths", [])
-    custom_years = data.get("customYears", [])
-
-    range_map = {
-        "1d": "1d",
-        "1w": "5d",
-        "1m": "1mo",
-        "3m": "3mo",
-        "1y": "1y",
-        "2y": "2y"
-    }
-    period = range_map.get(data.get("range", "1mo"), "1mo")
-
     if not symbol:
         return jsonify({"error": "Symbol is required"}), 400
 
-    ticker = yf.Ticker(symbol)
-    df = ticker.history(period=period)
+    ma_range = parse_ma_range(data.get("maRange", [20, 30]))
+    if ma_range is None:
+        return jsonify({"error": "maRange must be two positive integers"}), 400
 
-    if df.empty:
+    try:
+        start = np.datetime64(data["startDate"], "D") if data.get("startDate") else None
+        end = np.datetime64(data["endDate"], "D") if data.get("endDate") else None
+        principal = parse_principal(data.get("principal", 100000))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid startDate or endDate, or principal not positive"}), 400
+
+    bars = services.store.get(symbol) if services.store is not None else None
+    if bars is None:
         return jsonify({"error": "No data found"}), 404
 
-    df["RSI"] = calculate_rsi(df["Close"])
-    df["MACD"], df["Signal"] = calculate_macd(df["Close"])
-    df[f"MA{ma_range[0]}"] = calculate_ma(df["Close"], ma_range[0])
-    df[f"MA{ma_range[1]}"] = calculate_ma(df["Close"], ma_range[1])
-
-    graph_data = {
-        "dates": df.index.strftime("%Y-%m-%d").tolist(),
-        "close": df["Close"].round(2).tolist(),
-        "rsi": df["RSI"].round(2).fillna(0).tolist(),
-        "macd": df["MACD"].round(2).fillna(0).tolist(),
-        "signal": df["Signal"].round(2).fillna(0).tolist(),
-        f"ma{ma_range[0]}": df[f"MA{ma_range[0]}"].round(2).fillna(0).tolist(),
-        f"ma{ma_range[1]}": df[f"MA{ma_range[1]}"].round(2).fillna(0).tolist(),
-    }
+    result = backtest_bars(bars, start, end, ma_range[0], ma_range[1], principal)
+    payload = backtest_payload(result)
+    payload["symbol"] = symbol
+    payload["maLabels"] = [f"MA{ma_range[0]}", f"MA{ma_range[1]}"]
+    return jsonify(payload)
+
+@api.route("/api/sweep", methods=["POST"])
+def get_sweep():
+    data = request.json or {}
+    services = current_services()
+    if services.store is None:
+        return jsonify({"error": "No local data"}), 404
+
+    try:
+        # "5:50", "5:50:5" or [5, 50] / [5, 50, 5]; bounds are inclusive
+        shorts, longs = (
+            parse_range(":".join(str(v) for v in value) if isinstance(value, list) else value)
+            for value in (data.get("short", "5:50"), data.get("long", "10:100"))
+        )
+        top = int(data.get("top", 50))
+        start = np.datetime64(data["startDate"], "D") if data.get("startDate") else None
+        end = np.datetime64(data["endDate"], "D") if data.get("endDate") else None
+        if len(shorts) * len(longs) > MAX_SWEEP_PAIRS:
+            raise ValueError("window grid too large")
+        symbols = parse_symbols(data.get("symbols"))
+        rows = sweep(services.store, shorts, longs, symbols=symbols, start=start, end=end,
+                     workers=services.compute_workers, pool=services.compute_pool())
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid short/long range (windows >= 1, at most {MAX_SWEEP_PAIRS} pairs), "
+                                 "top, symbols (a list), startDate or endDate"}), 400
+    return jsonify({"count": len(rows), "results": rows[:top]})
+
+@api.route("/api/walkforward", methods=["POST"])
+def get_walkforward():
+    data = request.json or {}
+    services = current_services()
+    if services.store is None:
+        return jsonify({"error": "No local data"}), 404
+
+    try:
+        shorts, longs = (
+            parse_range(":".join(str(v) for v in value) if isinstance(value, list) else value)
+            for value in (data.get("short", "5:50"), data.get("long", "10:100"))
+        )
+        train = int(data.get("train", 120))
+        test = int(data.get("test", 20))
+        step = int(data["step"]) if data.get("step") is not None else None
+        if len(shorts) * len(longs) > MAX_SWEEP_PAIRS:
+            raise ValueError("window grid too large")
+        result = walk_forward(services.store, shorts, longs, train=train, test=test, step=step,
+                              symbols=data.get("symbols"), workers=services.compute_workers,
+                              pool=services.compute_pool())
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid short/long range (windows >= 1, at most {MAX_SWEEP_PAIRS} pairs), "
+                                 "or train/test/step bar counts (step >= test)"}), 400
+    return jsonify(result)
+
+@api.route("/api/montecarlo", methods=["POST"])
+def get_montecarlo():
+    data = request.json or {}
+    services = current_services()
+    symbol = data.get("symbol")
+    if not symbol:
+        return jsonify({"error": "Symbol is required"}), 400
+    if services.store is None or services.store.get(symbol) is None:
+        return jsonify({"error": "No data found"}), 404
 
-    info = ticker.info
-    financial_data = {
-        "Name": info.get("longName"),
-        "Sector": info.get("sector"),
-        "Industry": info.get("industry"),
-        "Market Cap": info.get("marketCap"),
-        "P/E Ratio": info.get("trailingPE"),
-        "EPS": info.get("trailingEps"),
-        "Dividend Yield": info.get("dividendYield")
-    }
+    ma_range = parse_ma_range(data.get("maRange", [20, 30]))
+    if ma_range is None:
+        return jsonify({"error": "maRange must be two positive integers"}), 400
+    try:
+        paths = int(data.get("paths", 10000))
+        block = float(data.get("block", 20))
+        seed = int(data.get("seed", 0))
+        principal = parse_principal(data.get("principal", 100000))
+        start = np.datetime64(data["startDate"], "D") if data.get("startDate") else None
+        end = np.datetime64(data["endDate"], "D") if data.get("endDate") else None
+        if not 1 <= paths <= MAX_MC_PATHS:
+            raise ValueError(paths)
+        results = monte_carlo(services.store, [symbol], ma_range[0], ma_range[1], paths=paths, block=block,
+                              start=start, end=end, principal=principal, seed=seed,
+                              workers=services.compute_workers, pool=services.compute_pool())
+    except (TypeError, ValueError):
+        return jsonify({"error": f"paths must be 1-{MAX_MC_PATHS}, block >= 1, principal positive "
+                                 "and dates valid"}), 400
+    if not results:
+        return jsonify({"error": "No data found"}), 404
 
+    result = next(iter(results.values()))
+    counts, edges = np.histogram(result["finalPrincipal"], bins=40)
+    payload = summarize(result, principal)
+    payload["symbol"] = symbol
+    payload["histogram"] = {"counts": counts.tolist(), "edges": np.round(edges, 2).tolist()}
+    payload["maLabels"] = [f"MA{ma_range[0]}", f"MA{ma_range[1]}"]
+    return jsonify(payload)
+
+@api.route("/api/portfolio", methods=["POST"])
+def get_portfolio():
+    data = request.json or {}
+    services = current_services()
+    if services.store is None:
+        return jsonify({"error": "No local data"}), 404
+
+    ma_range = parse_ma_range(data.get("maRange", [20, 30]))
+    if ma_range is None:
+        return jsonify({"error": "maRange must be two positive integers"}), 400
+    allocation = data.get("allocation", "equal")
+    if allocation not in ALLOCATIONS:
+        return jsonify({"error": "allocation must be equal or capped"}), 400
+    try:
+        start = np.datetime64(data["startDate"], "D") if data.get("startDate") else None
+        end = np.datetime64(data["endDate"], "D") if data.get("endDate") else None
+        principal = parse_principal(data.get("principal", 100000))
+        max_weight = float(data.get("maxWeight", 0.1))
+        if not 0 < max_weight <= 1:
+            raise ValueError(max_weight)
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid startDate or endDate, principal must be positive "
+                                 "and maxWeight in (0, 1]"}), 400
+
+    try:
+        result = portfolio_backtest(services.store, symbols=data.get("symbols"), start=start, end=end,
+                                    short=ma_range[0], long=ma_range[1], principal=principal,
+                                    allocation=allocation, max_weight=max_weight)
+    except KeyError:
+        return jsonify({"error": "No data found"}), 404
     return jsonify({
-        "graph": graph_data,
-        "financials": financial_data,
-        "maLabels": [f"MA{ma_range[0]}", f"MA{ma_range[1]}"]
+        "dates": np.datetime_as_string(result["dates"], unit="D").tolist(),
+        "equity": np.round(result["equity"], 2).tolist(),
+        "cash": np.round(result["cash"], 2).tolist(),
+        "traded": np.round(result["traded"], 2).tolist(),
+        "symbols": [
+            {"symbol": sym, "pnl": round(float(pnl), 2), "trades": int(trades)}
+            for sym, pnl, trades in zip(result["symbols"], result["pnl"], result["trades"])
+        ],
+        "finalEquity": round(result["finalEquity"], 2),
+        "turnover": round(result["turnover"], 4),
+        "maxDrawdown": round(result["maxDrawdown"], 4),
+        "maLabels": [f"MA{ma_range[0]}", f"MA{ma_range[1]}"],
     })
 
+@api.route("/api/screener", methods=["POST"])
+def get_screener():
+    data = request.json or {}
+    services = current_services()
+    expression = data.get("filter")
+    if not expression:
+        return jsonify({"error": "filter is required"}), 400
+    if services.store is None:
+        return jsonify({"error": "No local data"}), 404
+
+    # "companies" restricts the screen to the /api/companies list
+    symbols = data.get("symbols")
+    if symbols == "companies":
+        symbols = [c["symbol"] for c in COMPANIES]
+    try:
+        limit = int(data["limit"]) if data.get("limit") is not None else None
+        rows = services.screener.screen(expression, symbols=symbols, sort=data.get("sort"),
+                               descending=bool(data.get("descending", False)), limit=limit)
+    except (TypeError, ValueError) as exc:
+        message = str(exc) if isinstance(exc, FilterError) else "Invalid limit"
+        return jsonify({"error": message}), 400
+
+    names = {normalize_symbol(c["symbol"]): c["name"] for c in COMPANIES}
+    for row in rows:
+        row["name"] = names.get(row["symbol"])
+    return jsonify({"count": len(rows), "results": rows})
+
+def matrix_lists(matrix, digits=6):
+    return [[None if np.isnan(v) else round(float(v), digits) for v in row] for row in matrix]
+
+@api.route("/api/correlation", methods=["POST"])
+def get_correlation():
+    data = request.json or {}
+    services = current_services()
+    if services.store is None:
+        return jsonify({"error": "No local data"}), 404
+
+    try:
+        symbols = parse_symbols(data.get("symbols")) or services.store.symbols()
+        end = np.datetime64(data["endDate"], "D") if data.get("endDate") else None
+        result = services.correlations.matrices(symbols, window=data.get("window", 60), end=end)
+    except KeyError as exc:
+        return jsonify({"error": f"No data found for {exc.args[0]}"}), 404
+    except (TypeError, ValueError):
+        return jsonify({"error": "symbols must be a list of strings, window an integer >= 2 "
+                                 "and endDate a date"}), 400
+
+    payload = dict(result)
+    payload["correlation"] = matrix_lists(result["correlation"], 4)
+    payload["covariance"] = matrix_lists(result["covariance"], 8)
+    return jsonify(payload)
+
+@api.route("/api/cache-stats")
+def cache_stats():
+    services = current_services()
+    stats = services.stats()
+    if services.ingestor is not None:
+        stats["ingest"] = services.ingestor.stats()
+    if services.provider.client is not None:
+        stats["upstream"] = services.provider.client.stats()
+    return jsonify(stats)
+
+def cache_stats_by_name():
+    return {(name,): s for name, s in current_services().stats().items()}
+
+metrics.gauge("tradex_cache_hits_total", "Cache hits.",
+              lambda: {k: s["hits"] for k, s in cache_stats_by_name().items()}, ("cache",), kind="counter")
+metrics.gauge("tradex_cache_misses_total", "Cache misses.",
+              lambda: {k: s["misses"] for k, s in cache_stats_by_name().items()}, ("cache",), kind="counter")
+metrics.gauge("tradex_cache_hit_ratio", "Cache hit ratio since start.",
+              lambda: {k: s["hit_ratio"] for k, s in cache_stats_by_name().items()}, ("cache",))
+metrics.gauge("tradex_cache_entries", "Entries held per cache.",
+              lambda: {k: s["size"] for k, s in cache_stats_by_name().items()}, ("cache",))
+def upstream_stats():
+    client = current_services().provider.client
+    return client.stats() if client is not None else {}
+
+metrics.gauge("tradex_upstream_client_total", "Upstream client outcomes (attempts, retried, coalesced, ...).",
+              lambda: {(k,): v for k, v in upstream_stats().items() if isinstance(v, int)}, ("outcome",),
+              kind="counter")
+metrics.gauge("tradex_upstream_circuit_open", "1 while the upstream circuit breaker is open.",
+              lambda: float(upstream_stats().get("circuit") == "open"))
+metrics.gauge("tradex_ingested_bars_total", "Bars appended by the ingestor.",
+              lambda: getattr(current_services().ingestor, "appended", 0), kind="counter")
+
+@api.route("/metrics")
+def get_metrics():
+    return Response(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
 if __name__ == "__main__":
-    app.run(debug=True)
+    create_app().run(debug=True)
@@ -0,0 +1,310 @@
+"""Async (ASGI) serving mode for the ``/api/companies`` and ``/api/data`` routes.
+
+Bars and fundamentals for a request are fetched concurrently. Upstream calls
+go through a bounded semaphore and a thread pool of the same size, so a slow
+provider cannot tie up more than ``upstream_limit`` threads, and each request
+is cut off after ``request_timeout`` seconds with a 504.
+
+    uvicorn asgi:app --workers 4
+
+With ``ingest`` (``TRADEX_INGEST=replay``) bars are ingested on the server's
+event loop (see ``ingest``) and ``GET /api/stream?symbols=INFY,TCS`` pushes
+each new bar with its updated indicator values as Server-Sent Events::
+
+    id: 1234
+    event: bar
+    data: {"symbol": "INFY", "date": "2025-07-17", "close": 1570.2, "rsi": 48.1, ...}
+
+The ``id`` is the hub's sequence number. A client that reconnects with
+``Last-Event-ID`` (or ``?since=``) gets the events it missed; if those are no
+longer in the backlog it receives one ``reset`` event, the stream ends, and it
+should refetch ``/api/data`` and subscribe again from the reset's id.
+
+Plain ASGI, no framework needed; any ASGI server can host it.
+"""
+import asyncio
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from werkzeug.datastructures import MIMEAccept
+from werkzeug.http import parse_accept_header
+
+from app import COMPANIES, build_columns, encode_data, history_period, parse_data_request, serves_locally
+from barstore import normalize_symbol
+from downsample import downsample_columns
+from events import CLOSED, RESET, DeltaHub
+from fundamentals import FundamentalsCache, extract_financials
+from indicators import IndicatorEngine
+from ingest import AppendStore, Ingestor, LiveIndicators, ReplayFeeder
+from providers import get_provider
+from upstream import UpstreamError
+
+log = logging.getLogger(__name__)
+
+
+class UpstreamTimeout(Exception):
+    pass
+
+
+class AsyncDataApp:
+    def __init__(self, provider=None, use_engine=True, upstream_limit=8,
+                 upstream_timeout=10.0, request_timeout=15.0, ingest=None, heartbeat=15.0):
+        self.provider = provider if provider is not None else get_provider()
+        self.store = self.provider.store
+        # ingest: None, "replay" (Data/ from TRADEX_REPLAY_START) or a Feeder instance
+        self.ingestor = self.live = self.hub = None
+        feeder = None if isinstance(ingest, str) else ingest
+        if ingest == "replay" and self.store is not None:
+            feeder = ReplayFeeder(self.store, start=os.environ.get("TRADEX_REPLAY_START"),
+                                  speed=float(os.environ.get("TRADEX_REPLAY_SPEED", 1)))
+        if feeder is not None and self.store is not None:
+            self.store = AppendStore(self.store, until=getattr(feeder, "start", None))
+            self.ingestor = Ingestor(feeder, self.store)
+            self.live = LiveIndicators(self.store)
+            self.hub = DeltaHub()
+            self.store.listeners += [self.live.on_append, self._publish_bar]
+        self.heartbeat = heartbeat
+        self._ingest_task = None
+        self.engine = None
+        if use_engine and self.store is not None:
+            self.engine = IndicatorEngine(self.store)
+            if self.ingestor is not None:
+                self.store.listeners.append(lambda bar: self.engine.invalidate(bar.symbol))
+        self.fundamentals = FundamentalsCache(lambda symbol: extract_financials(self.provider.info(symbol)))
+        self.upstream_limit = upstream_limit
+        self.upstream_timeout = upstream_timeout
+        self.request_timeout = request_timeout
+        self._executor = ThreadPoolExecutor(max_workers=upstream_limit, thread_name_prefix="upstream")
+        self._semaphore = None
+        self.routes = {
+            ("GET", "/api/companies"): self.companies,
+            ("POST", "/api/data"): self.data,
+            ("GET", "/api/stream/stats"): self.stream_stats,
+        }
+
+    async def upstream(self, fn, *args):
+        if self._semaphore is None:
+            # created lazily so it binds to the server's event loop
+            self._semaphore = asyncio.BoundedSemaphore(self.upstream_limit)
+        loop = asyncio.get_running_loop()
+        async with self._semaphore:
+            try:
+                return await asyncio.wait_for(loop.run_in_executor(self._executor, fn, *args),
+                                              self.upstream_timeout)
+            except asyncio.TimeoutError:
+                raise UpstreamTimeout() from None
+
+    async def companies(self, body, headers):
+        return 200, COMPANIES
+
+    async def data(self, body, headers):
+        """Same parameters and encodings as the Flask ``/api/data``, without the response cache."""
+        accept = parse_accept_header(headers.get(b"accept", b"").decode("latin-1"), MIMEAccept)
+        params, error = parse_data_request(body, accept)
+        if error is not None:
+            return 400, {"error": error}
+        symbol, period, ma_range = params["symbol"], params["period"], params["ma_range"]
+        months, years, interval = params["months"], params["years"], params["interval"]
+
+        df = None
+        if serves_locally(self, symbol, interval):
+            financials = await self.upstream(self.fundamentals.get, symbol)
+        else:
+            # calendar months are picked out of the full history
+            fetch = "max" if months or years else history_period(period, ma_range)
+            df, financials = await asyncio.gather(
+                self.upstream(self.provider.history, symbol, fetch),
+                self.upstream(self.fundamentals.get, symbol),
+            )
+        # indicators and resampling are CPU bound; keep them off the event loop
+        columns = await asyncio.get_running_loop().run_in_executor(
+            None, build_columns, self, symbol, period, ma_range, df, years, months, interval)
+        if columns is None:
+            return 404, {"error": "No data found"}
+        if params["max_points"] is not None:
+            columns = downsample_columns(columns, params["max_points"], params["method"])
+
+        payload = {
+            "graph": columns,
+            "financials": financials,
+            "maLabels": [f"MA{ma_range[0]}", f"MA{ma_range[1]}"],
+        }
+        return (200, *encode_data(payload, params["mimetype"], json.dumps))
+
+    async def stream_stats(self, body, headers):
+        if self.hub is None:
+            return 404, {"error": "Streaming needs ingestion enabled"}
+        return 200, dict(self.hub.stats(), ingest=self.ingestor.stats())
+
+    def _publish_bar(self, bar):
+        tail = self.live.lookup(bar.symbol, "1d")
+        delta = {"symbol": bar.symbol, "date": str(bar.date)}
+        for name in ("open", "high", "low", "close"):
+            delta[name] = round(float(getattr(bar, name)), 2)
+        delta["volume"] = int(bar.volume)
+        values = {"rsi": tail["rsi"], "macd": tail["macd"], "signal": tail["signal"]}
+        values.update((f"ma{w}", ma) for w, ma in tail["ma"].items())
+        for name, column in values.items():
+            value = float(column[-1]) if len(column) else np.nan
+            delta[name] = None if np.isnan(value) else round(value, 2)
+        # encoded once here, not once per subscriber
+        self.hub.publish(bar.symbol, json.dumps(delta))
+
+    async def stream(self, scope, receive, send):
+        if self.hub is None:
+            await self._respond(send, 404, {"error": "Streaming needs ingestion enabled"})
+            return
+        query = parse_qs(scope.get("query_string", b"").decode())
+        symbols = {normalize_symbol(s) for s in ",".join(query.get("symbols", [])).split(",") if s.strip()}
+        headers = dict(scope.get("headers", []))
+        cursor = headers.get(b"last-event-id", b"").decode() or (query.get("since") or [""])[0]
+        try:
+            since = int(cursor) if cursor else None
+        except ValueError:
+            since = None
+            symbols = set()
+        if not symbols:
+            await self._respond(send, 400, {"error": "symbols and an integer since are required"})
+            return
+
+        sub = self.hub.subscribe(symbols, since)
+        watcher = asyncio.ensure_future(self._watch_disconnect(receive, sub))
+        try:
+            await send({
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [
+                    (b"content-type", b"text/event-stream"),
+                    (b"cache-control", b"no-cache"),
+                    (b"x-accel-buffering", b"no"),
+                    (b"access-control-allow-origin", b"*"),
+                ],
+            })
+            if since is None:
+                # a cursor for fresh clients, so their first reconnect does not miss anything
+                hello = f"retry: 2000\nid: {self.hub.last_seq}\nevent: hello\ndata: {{}}\n\n"
+                await send({"type": "http.response.body", "body": hello.encode(), "more_body": True})
+            while True:
+                try:
+                    first = await asyncio.wait_for(sub.get(), self.heartbeat)
+                except asyncio.TimeoutError:
+                    await send({"type": "http.response.body", "body": b": keepalive\n\n", "more_body": True})
+                    continue
+                # everything already queued goes out in one body chunk
+                chunks, more = [], True
+                for seq, symbol, data in [first] + sub.drain():
+                    if data == CLOSED:
+                        return
+                    if data == RESET:
+                        chunks.append(f"id: {seq}\nevent: reset\ndata: {{}}\n\n")
+                        more = False
+                        break
+                    chunks.append(f"id: {seq}\nevent: bar\ndata: {data}\n\n")
+                await send({"type": "http.response.body", "body": "".join(chunks).encode(), "more_body": more})
+                if not more:
+                    return
+        finally:
+            self.hub.unsubscribe(sub)
+            watcher.cancel()
+
+    @staticmethod
+    async def _watch_disconnect(receive, sub):
+        while (await receive())["type"] != "http.disconnect":
+            pass
+        sub.close()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+        if scope["method"] == "GET" and scope["path"] == "/api/stream":
+            await self.stream(scope, receive, send)
+            return
+
+        handler = self.routes.get((scope["method"], scope["path"]))
+        if handler is None:
+            await self._respond(send, 404, {"error": "Not found"})
+            return
+
+        body = await self._read_body(receive)
+        try:
+            payload = json.loads(body) if body else {}
+        except ValueError:
+            payload = None
+        if payload is not None and not isinstance(payload, dict):
+            payload = None
+        if payload is None and scope["method"] == "POST":
+            await self._respond(send, 400, {"error": "Invalid JSON body"})
+            return
+
+        try:
+            response = await asyncio.wait_for(handler(payload or {}, dict(scope.get("headers", []))),
+                                              self.request_timeout)
+        except (asyncio.TimeoutError, UpstreamTimeout):
+            response = 504, {"error": "Upstream timeout"}
+        except UpstreamError:
+            response = 502, {"error": "Upstream error"}
+        except Exception:
+            log.exception("%s %s failed", scope["method"], scope["path"])
+            response = 500, {"error": "Internal server error"}
+        await self._respond(send, *response)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                if self.engine is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.engine.warm)
+                if self.ingestor is not None:
+                    await asyncio.get_running_loop().run_in_executor(None, self.live.warm)
+                    self.hub.bind()
+                    self._ingest_task = asyncio.ensure_future(self.ingestor.run())
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self._ingest_task is not None:
+                    self._ingest_task.cancel()
+                self._executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    @staticmethod
+    async def _read_body(receive):
+        chunks = []
+        while True:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body"):
+                return b"".join(chunks)
+
+    @staticmethod
+    async def _respond(send, status, result, content_type=None):
+        # handlers return a JSON-able result, or an encoded body and its content type
+        if content_type is None:
+            body, content_type = json.dumps(result).encode(), "application/json"
+        else:
+            body = result
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", content_type.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"access-control-allow-origin", b"*"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+app = AsyncDataApp(
+    upstream_limit=int(os.environ.get("TRADEX_UPSTREAM_LIMIT", 8)),
+    upstream_timeout=float(os.environ.get("TRADEX_UPSTREAM_TIMEOUT", 10)),
+    request_timeout=float(os.environ.get("TRADEX_REQUEST_TIMEOUT", 15)),
+    ingest=os.environ.get("TRADEX_INGEST"),
+)
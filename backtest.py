@@ -0,0 +1,125 @@
+"""MA crossover backtest, the server side of ``runSimulation`` in ``final/script.js``.
+
+Rules are the same as the browser version: skip bars until both averages
+exist, buy ``floor(principal / close)`` shares whenever flat and the short MA
+is above the long one, sell everything whenever holding and it is below, and
+liquidate at the last bar of the window. Averages come from prefix sums and
+the position path from a forward fill of the MA comparison, so the only
+Python loop is over trades.
+"""
+import numpy as np
+
+from indicators import sma
+
+INITIAL_PRINCIPAL = 100000.0
+
+
+def holding_states(ma_short, ma_long):
+    """Boolean position per bar: enter while flat and short > long, exit while holding and short < long.
+
+    Equal or missing averages keep the previous state, so the state is the
+    sign of the last strict comparison (flat before the first one).
+    """
+    above = ma_short > ma_long
+    decided = above | (ma_short < ma_long)
+    # usually every bar after a column's first strict comparison has one too, and the state is just ``above``
+    ties = (np.logical_or.accumulate(decided, axis=0) & ~decided).any(axis=0)
+    if above.ndim == 1:
+        return _carried_states(ma_short, ma_long) if ties else above
+    if ties.any():
+        above[:, ties] = _carried_states(ma_short[:, ties], ma_long[:, ties])
+    return above
+
+
+def _carried_states(ma_short, ma_long):
+    with np.errstate(invalid="ignore"):
+        sign = np.sign(ma_short - ma_long)
+    sign = np.nan_to_num(sign)
+    n = sign.shape[0]
+    idx = np.where(sign != 0, np.arange(n).reshape((n,) + (1,) * (sign.ndim - 1)), -1)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    last = np.take_along_axis(sign, np.maximum(idx, 0), axis=0)
+    return (idx >= 0) & (last > 0)
+
+
+def trade_points(holding):
+    """Row indices where the position is entered and exited (1-D ``holding``)."""
+    return np.flatnonzero(np.diff(holding.astype(np.int8), prepend=np.int8(0)))
+
+
+def date_window(dates, start=None, end=None):
+    """Row range of ``dates`` (sorted datetime64) within ``[start, end]``, inclusive."""
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+    return lo, max(lo, hi)
+
+
+def run_backtest(dates, close, short=20, long=30, principal=INITIAL_PRINCIPAL):
+    """Backtest one symbol; ``dates``/``close`` are already cut to the simulated window.
+
+    Returns the chart series (from the first bar with both averages) and the
+    trade log as parallel arrays.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    ma_short = sma(close, short, 0)
+    ma_long = sma(close, long, 0)
+    valid = ~(np.isnan(ma_short) | np.isnan(ma_long))
+    first = int(valid.argmax()) if valid.any() else len(close)
+
+    holding = holding_states(ma_short, ma_long)
+    points = trade_points(holding)
+    liquidate = len(close) > 0 and bool(holding[-1])
+    if liquidate:
+        points = np.append(points, len(close) - 1)
+
+    n = len(points)
+    qty = np.zeros(n, dtype=np.int64)
+    invest = np.zeros(n)
+    gain_loss = np.full(n, np.nan)
+    balance = np.zeros(n)
+    cash = float(principal)
+    shares = 0
+    buy_price = 0.0
+    for k, i in enumerate(points):
+        price = close[i]
+        if k % 2 == 0:
+            shares = int(cash // price)
+            buy_price = price
+            invest[k] = shares * price
+            cash -= invest[k]
+        else:
+            invest[k] = shares * buy_price
+            gain_loss[k] = shares * price - invest[k]
+            cash += shares * price
+        qty[k] = shares
+        balance[k] = cash
+
+    actions = np.where(np.arange(n) % 2 == 0, "BUY", "SELL")
+    return {
+        "series": {
+            "dates": dates[first:],
+            "close": close[first:],
+            "maShort": ma_short[first:],
+            "maLong": ma_long[first:],
+        },
+        "trades": {
+            "index": points,
+            "date": dates[points],
+            "action": actions,
+            "close": close[points],
+            "maShort": ma_short[points],
+            "maLong": ma_long[points],
+            "qty": qty,
+            "invest": invest,
+            "gainLoss": gain_loss,
+            "principal": balance,
+        },
+        "finalPrincipal": cash,
+        "liquidated": liquidate,
+    }
+
+
+def backtest_bars(bars, start=None, end=None, short=20, long=30, principal=INITIAL_PRINCIPAL):
+    lo, hi = date_window(bars.dates, start, end)
+    window = bars.slice(lo, hi)
+    return run_backtest(window.dates, window.close, short, long, principal)
@@ -0,0 +1,162 @@
+"""Consolidated fixed-width binary bar file, loaded with ``numpy.memmap``.
+
+Layout (little endian)::
+
+    header   8s magic, u4 version, u4 symbol count
+    table    one TABLE_DTYPE row per symbol
+    columns  per symbol: dates, open, high, low, close, volume as contiguous
+             8-byte columns of ``count`` values each (dates are int64 days
+             since the epoch, i.e. datetime64[D])
+
+Every column starts on an 8-byte boundary so it can be viewed straight out of
+the map without copying. The file is replaced atomically, so workers that still
+map an older version keep reading valid pages.
+
+Rebuild after editing ``Data/``::
+
+    python barfile.py            # only re-parses CSVs whose mtime/size changed
+    python barfile.py --force    # re-parse everything
+"""
+import argparse
+import os
+import struct
+import sys
+
+import numpy as np
+
+from barstore import DATA_DIR, Bars, csv_files, parse_csv
+
+MAGIC = b"TRDXBARS"
+VERSION = 1
+HEADER = struct.Struct("<8sII")
+BAR_PATH = os.path.join(DATA_DIR, "bars.bin")
+
+COLUMNS = (
+    ("dates", "datetime64[D]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<i8"),
+)
+
+TABLE_DTYPE = np.dtype([
+    ("symbol", "S24"),
+    ("offset", "<i8"),
+    ("count", "<i8"),
+    ("mtime_ns", "<i8"),
+    ("size", "<i8"),
+])
+
+
+def read_table(path):
+    """Return the symbol table of ``path`` or ``None`` if it is missing or invalid."""
+    try:
+        with open(path, "rb") as f:
+            magic, version, nsym = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            table = np.frombuffer(f.read(nsym * TABLE_DTYPE.itemsize), dtype=TABLE_DTYPE)
+            return table if len(table) == nsym else None
+    except (OSError, struct.error):
+        return None
+
+
+def _views(buf, offset, count, symbol):
+    cols = []
+    for name, dtype in COLUMNS:
+        cols.append(buf[offset:offset + count * 8].view(dtype))
+        offset += count * 8
+    return Bars(symbol, *cols)
+
+
+def open_bars(path=BAR_PATH):
+    """Map ``path`` read-only and return ``{symbol: Bars}`` whose columns are views of the map."""
+    table = read_table(path)
+    if table is None:
+        return None
+    if len(table) == 0:
+        return {}
+    buf = np.memmap(path, dtype=np.uint8, mode="r")
+    return {
+        row["symbol"].decode(): _views(buf, int(row["offset"]), int(row["count"]), row["symbol"].decode())
+        for row in table
+    }
+
+
+def is_stale(path=BAR_PATH, data_dir=DATA_DIR):
+    table = read_table(path)
+    if table is None:
+        return True
+    files = csv_files(data_dir)
+    if sorted(r["symbol"].decode() for r in table) != sorted(files):
+        return True
+    for row in table:
+        st = os.stat(files[row["symbol"].decode()])
+        if st.st_mtime_ns != row["mtime_ns"] or st.st_size != row["size"]:
+            return True
+    return False
+
+
+def convert(data_dir=DATA_DIR, path=BAR_PATH, force=False):
+    """(Re)build ``path`` from the CSVs in ``data_dir``.
+
+    Symbols whose CSV has the same mtime and size as recorded in the existing
+    file are copied over from it instead of being parsed again. Returns the list
+    of symbols that were parsed.
+    """
+    files = csv_files(data_dir)
+    old = None if force else read_table(path)
+    old_rows = {} if old is None else {r["symbol"].decode(): r for r in old}
+    old_bars = open_bars(path) if old_rows else {}
+
+    bars, stats, parsed = {}, {}, []
+    for sym, csv_path in files.items():
+        st = os.stat(csv_path)
+        stats[sym] = st
+        row = old_rows.get(sym)
+        if row is not None and row["mtime_ns"] == st.st_mtime_ns and row["size"] == st.st_size:
+            bars[sym] = old_bars[sym]
+        else:
+            bars[sym] = parse_csv(csv_path, sym)
+            parsed.append(sym)
+
+    symbols = sorted(bars)
+    table = np.zeros(len(symbols), dtype=TABLE_DTYPE)
+    offset = HEADER.size + len(symbols) * TABLE_DTYPE.itemsize
+    offset += -offset % 8
+    data_start = offset
+    for i, sym in enumerate(symbols):
+        n = len(bars[sym])
+        table[i] = (sym.encode(), offset, n, stats[sym].st_mtime_ns, stats[sym].st_size)
+        offset += n * 8 * len(COLUMNS)
+
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(symbols)))
+        f.write(table.tobytes())
+        f.write(b"\0" * (data_start - f.tell()))
+        for sym in symbols:
+            b = bars[sym]
+            for name, dtype in COLUMNS:
+                f.write(np.ascontiguousarray(getattr(b, name), dtype=dtype).tobytes())
+    os.replace(tmp, path)
+    return parsed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convert Data/*.csv into the memory-mapped bar file.")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=None, help="defaults to <data-dir>/bars.bin")
+    parser.add_argument("--force", action="store_true", help="re-parse every CSV")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.join(args.data_dir, "bars.bin")
+    parsed = convert(args.data_dir, output, force=args.force)
+    total = len(read_table(output))
+    print(f"{output}: {total} symbols, {len(parsed)} re-parsed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
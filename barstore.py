@@ -0,0 +1,216 @@
+import os
+import datetime as dt
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Data")
+
+# yfinance style periods: either a number of trailing bars or a calendar lookback in months
+PERIODS = {
+    "1d": ("bars", 1),
+    "5d": ("bars", 5),
+    "1mo": ("months", 1),
+    "3mo": ("months", 3),
+    "6mo": ("months", 6),
+    "1y": ("months", 12),
+    "2y": ("months", 24),
+    "5y": ("months", 60),
+    "max": ("bars", None),
+}
+
+
+def normalize_symbol(symbol):
+    # "INFY.NS" -> "INFY", the file name used in Data/
+    return symbol.upper().split(".")[0]
+
+
+class Bars:
+    """Columnar OHLCV series: one contiguous array per field plus a datetime64[D] index."""
+
+    __slots__ = ("symbol", "dates", "open", "high", "low", "close", "volume")
+
+    def __init__(self, symbol, dates, open, high, low, close, volume):
+        self.symbol = symbol
+        self.dates = dates
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+
+    def __len__(self):
+        return len(self.dates)
+
+    def slice(self, start, stop=None):
+        # basic slicing only, so every column stays a view of the store
+        s = slice(start, stop)
+        return Bars(self.symbol, self.dates[s], self.open[s], self.high[s],
+                    self.low[s], self.close[s], self.volume[s])
+
+    def period(self, period):
+        return self.slice(period_start(self.dates, period))
+
+    def take(self, rows):
+        return Bars(self.symbol, self.dates[rows], self.open[rows], self.high[rows],
+                    self.low[rows], self.close[rows], self.volume[rows])
+
+    def to_frame(self):
+        import pandas as pd
+
+        return pd.DataFrame(
+            {
+                "Open": self.open,
+                "High": self.high,
+                "Low": self.low,
+                "Close": self.close,
+                "Volume": self.volume,
+            },
+            index=pd.DatetimeIndex(self.dates, name="Date"),
+        )
+
+
+def _months_back(day, months):
+    year, month = divmod(day.year * 12 + day.month - 1 - months, 12)
+    month += 1
+    # clamp e.g. 31-Mar minus one month to the end of February
+    next_month = dt.date(year + month // 12, month % 12 + 1, 1)
+    last_day = (next_month - dt.timedelta(days=1)).day
+    return dt.date(year, month, min(day.day, last_day))
+
+
+def period_start(dates, period):
+    """Row index where a yfinance style ``period`` lookback begins."""
+    n = len(dates)
+    if n == 0:
+        return 0
+    kind, amount = PERIODS.get(period, PERIODS["1mo"])
+    if amount is None:
+        return 0
+    if kind == "bars":
+        return max(n - amount, 0)
+    last = dates[-1].astype(dt.date)
+    start = np.datetime64(_months_back(last, amount), "D")
+    return int(np.searchsorted(dates, start, side="right"))
+
+
+class CalendarIndex:
+    """(year, month) -> row range of a sorted date column, for picking calendar buckets."""
+
+    __slots__ = ("years", "months", "starts", "stops")
+
+    def __init__(self, dates):
+        keys, starts = np.unique(dates.astype("datetime64[M]").astype(np.int64), return_index=True)
+        self.years = keys // 12 + 1970
+        self.months = keys % 12 + 1
+        self.starts = starts
+        self.stops = np.append(starts[1:], len(dates))
+
+    def rows(self, years=(), months=()):
+        """Row indices of every bar whose year is in ``years`` and month in ``months``.
+
+        An empty list means no restriction on that field. Work is proportional to
+        the number of months in the index plus the rows returned.
+        """
+        mask = np.ones(len(self.starts), dtype=bool)
+        if len(years):
+            mask &= np.isin(self.years, years)
+        if len(months):
+            mask &= np.isin(self.months, months)
+        starts, stops = self.starts[mask], self.stops[mask]
+        lengths = stops - starts
+        # concatenated aranges: each run counts up from its start
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return np.arange(lengths.sum()) + offsets
+
+
+def parse_csv(path, symbol=None):
+    """Parse a headerless ``DD-MM-YYYY HH:MM:SS,open,high,low,close,volume`` file."""
+    if symbol is None:
+        symbol = os.path.splitext(os.path.basename(path))[0]
+    with open(path) as f:
+        rows = [line.rstrip().split(",") for line in f if line.strip()]
+
+    # reorder to ISO so numpy parses the whole column in one call, no per-row strptime
+    dates = np.array([f"{r[0][6:10]}-{r[0][3:5]}-{r[0][0:2]}" for r in rows], dtype="datetime64[D]")
+    prices = np.array([r[1:5] for r in rows], dtype=np.float64)
+    volume = np.array([r[5] for r in rows], dtype=np.float64).astype(np.int64)
+
+    order = np.argsort(dates, kind="stable")
+    prices = prices[order]
+    return Bars(
+        symbol,
+        np.ascontiguousarray(dates[order]),
+        np.ascontiguousarray(prices[:, 0]),
+        np.ascontiguousarray(prices[:, 1]),
+        np.ascontiguousarray(prices[:, 2]),
+        np.ascontiguousarray(prices[:, 3]),
+        np.ascontiguousarray(volume[order]),
+    )
+
+
+def csv_files(data_dir):
+    if not os.path.isdir(data_dir):
+        return {}
+    return {
+        os.path.splitext(name)[0].upper(): os.path.join(data_dir, name)
+        for name in sorted(os.listdir(data_dir))
+        if name.lower().endswith(".csv")
+    }
+
+
+class BarStore:
+    """All symbols in ``data_dir`` as columnar arrays.
+
+    Bars are served from the memory-mapped file at ``bar_path`` (see ``barfile``),
+    which is rebuilt from the CSVs first if any of them changed. Columns are
+    read-only views of the map, shared through the page cache by every worker.
+    """
+
+    def __init__(self, data_dir=DATA_DIR, bar_path=None):
+        self.data_dir = data_dir
+        self.bar_path = bar_path or os.path.join(data_dir, "bars.bin")
+        self._bars = None
+        self._calendars = {}
+
+    def symbols(self):
+        return sorted(self._load())
+
+    def get(self, symbol):
+        return self._load().get(normalize_symbol(symbol))
+
+    def __contains__(self, symbol):
+        return normalize_symbol(symbol) in self._load()
+
+    def calendar(self, symbol):
+        symbol = normalize_symbol(symbol)
+        index = self._calendars.get(symbol)
+        if index is None:
+            bars = self._load().get(symbol)
+            if bars is None:
+                return None
+            index = self._calendars[symbol] = CalendarIndex(bars.dates)
+        return index
+
+    def _load(self):
+        if self._bars is None:
+            self._bars = self._open()
+        return self._bars
+
+    def reload(self):
+        self._bars = None
+        self._calendars = {}
+        return self._load()
+
+    def _open(self):
+        import barfile
+
+        try:
+            if barfile.is_stale(self.bar_path, self.data_dir):
+                barfile.convert(self.data_dir, self.bar_path)
+            bars = barfile.open_bars(self.bar_path)
+        except OSError:
+            bars = None
+        if bars is None:
+            # read-only checkout: parse in memory instead
+            bars = {sym: parse_csv(path, sym) for sym, path in csv_files(self.data_dir).items()}
+        return bars
@@ -0,0 +1,58 @@
+"""LTTB and min/max downsampling on 10-year synthetic series.
+
+    python benchmarks/bench_downsample.py [--points 1000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from downsample import downsample_columns, downsample_indices  # noqa: E402
+
+SERIES = {
+    "10y daily": 252 * 10,
+    "10y hourly": 252 * 10 * 7,
+    "10y minute": 252 * 10 * 375,
+}
+
+
+def synthetic_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    columns = {"dates": np.arange(n).astype("datetime64[D]"), "close": close}
+    for name in ("rsi", "macd", "signal", "ma20", "ma30"):
+        columns[name] = rng.normal(size=n)
+    return columns
+
+
+def best_ms(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--points", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    print(f"{'series':<12}{'rows':>10}{'lttb ms':>10}{'minmax ms':>11}{'7 cols ms':>11}")
+    for label, n in SERIES.items():
+        columns = synthetic_columns(n)
+        lttb = best_ms(lambda: downsample_indices(columns["close"], args.points, "lttb"), args.repeat)
+        minmax = best_ms(lambda: downsample_indices(columns["close"], args.points, "minmax"), args.repeat)
+        full = best_ms(lambda: downsample_columns(columns, args.points, "lttb"), args.repeat)
+        print(f"{label:<12}{n:>10}{lttb:>10.2f}{minmax:>11.2f}{full:>11.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Per-request indicator cost: pandas calculate_* vs the precomputed IndicatorEngine.
+
+    python benchmarks/bench_indicators.py [--range 2y] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("TRADEX_PROVIDER", "local")
+
+import app  # noqa: E402
+from barstore import BarStore  # noqa: E402
+from indicators import IndicatorEngine  # noqa: E402
+
+RANGES = {"1d": "1d", "1w": "5d", "1m": "1mo", "3m": "3mo", "1y": "1y", "2y": "2y"}
+
+
+def per_request_us(fn, symbols, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for symbol in symbols:
+            fn(symbol)
+        best = min(best, time.perf_counter() - start)
+    return best / len(symbols) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--range", default="2y", choices=sorted(RANGES))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    period = RANGES[args.range]
+    ma_range = [20, 30]
+    store = BarStore()
+    symbols = store.symbols()
+
+    def before(symbol):
+        df = store.get(symbol).period(period).to_frame()
+        return app.graph_from_history(df, ma_range)
+
+    engine = IndicatorEngine(store)
+    start = time.perf_counter()
+    engine.warm()
+    warm_ms = (time.perf_counter() - start) * 1e3
+
+    def after(symbol):
+        return app.graph_from_series(engine.lookup(symbol, period, ma_range), ma_range)
+
+    def after_lookup(symbol):
+        return engine.lookup(symbol, period, ma_range)
+
+    b = per_request_us(before, symbols, args.repeat)
+    a = per_request_us(after, symbols, args.repeat)
+    s = per_request_us(after_lookup, symbols, args.repeat)
+    print(f"{len(symbols)} symbols, range={args.range}")
+    print(f"engine warm-up (all symbols): {warm_ms:10.2f} ms")
+    print(f"before  pandas + graph:       {b:10.1f} us/request")
+    print(f"after   lookup + graph:       {a:10.1f} us/request  ({b / a:.1f}x)")
+    print(f"after   lookup only:          {s:10.1f} us/request")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""Cold start: time from interpreter start to the first 200 responses.
+
+Every run is a fresh interpreter that imports ``app``, builds it with
+``create_app`` and sends ``/api/companies`` and then ``/api/data`` through the
+test client. ``cold`` builds nothing up front; ``warm`` runs the pre-fork
+warmup inside ``create_app``; ``forked`` warms, forks and times the child's
+first requests, which is what a preloaded gunicorn worker sees.
+
+    python benchmarks/bench_startup.py [--repeat 5] [--symbol INFY]
+    python benchmarks/bench_startup.py --gunicorn   # also a real server, if installed
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("cold", "warm", "forked")
+
+
+def child(mode, symbol):
+    """Runs in the fresh interpreter; prints the stage times as JSON."""
+    start = time.perf_counter()
+    sys.path.insert(0, ROOT)
+    import app
+
+    timings = {"import": time.perf_counter() - start}
+    flask_app = app.create_app(warm_caches=mode != "cold", start_background=False)
+    timings["create"] = time.perf_counter() - start
+
+    def first_requests(origin):
+        client = flask_app.test_client()
+        assert client.get("/api/companies").status_code == 200
+        timings["companies"] = time.perf_counter() - origin
+        assert client.post("/api/data", json={"symbol": symbol, "range": "1y"}).status_code == 200
+        timings["data"] = time.perf_counter() - origin
+
+    if mode != "forked":
+        first_requests(start)
+        print(json.dumps(timings))
+        return
+    read, write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read)
+        forked = time.perf_counter()
+        first_requests(forked)
+        timings["fork_to_data"] = timings["data"]
+        os.write(write, json.dumps(timings).encode())
+        os._exit(0)
+    os.close(write)
+    with os.fdopen(read) as f:
+        result = f.read()
+    os.waitpid(pid, 0)
+    print(result)
+
+
+def run_child(mode, symbol):
+    env = dict(os.environ, TRADEX_PROVIDER=os.environ.get("TRADEX_PROVIDER", "local"))
+    out = subprocess.run([sys.executable, __file__, "--child", mode, "--symbol", symbol],
+                         capture_output=True, text=True, env=env, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def gunicorn_start(port, symbol, timeout=60.0):
+    """Seconds from launching gunicorn to the first 200 of /api/data."""
+    env = dict(os.environ, TRADEX_PROVIDER=os.environ.get("TRADEX_PROVIDER", "local"),
+               TRADEX_BIND=f"127.0.0.1:{port}", TRADEX_WORKERS="2")
+    start = time.perf_counter()
+    proc = subprocess.Popen(["gunicorn", "-c", "gunicorn.conf.py"], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    body = json.dumps({"symbol": symbol, "range": "1y"}).encode()
+    try:
+        while time.perf_counter() - start < timeout:
+            request = urllib.request.Request(f"http://127.0.0.1:{port}/api/data", data=body,
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=5) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - start
+            except OSError:
+                time.sleep(0.02)
+        raise TimeoutError("gunicorn did not answer")
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--symbol", default="INFY")
+    parser.add_argument("--gunicorn", action="store_true", help="also time a real gunicorn server")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.child:
+        child(args.child, args.symbol)
+        return 0
+
+    print(f"{'mode':<8}{'import':>10}{'create':>10}{'companies':>11}{'data':>10}   (median ms from start)")
+    for mode in MODES:
+        runs = [run_child(mode, args.symbol) for _ in range(args.repeat)]
+        med = {k: statistics.median(r[k] for r in runs) * 1e3 for k in runs[0]}
+        if mode == "forked":
+            print(f"{mode:<8}{med['import']:>10.1f}{med['create']:>10.1f}"
+                  f"   first /api/data {med['fork_to_data']:.1f} ms after fork")
+        else:
+            print(f"{mode:<8}{med['import']:>10.1f}{med['create']:>10.1f}{med['companies']:>11.1f}{med['data']:>10.1f}")
+
+    if args.gunicorn:
+        if shutil.which("gunicorn") is None:
+            print("gunicorn not installed, skipped")
+        else:
+            times = [gunicorn_start(args.port, args.symbol) for _ in range(args.repeat)]
+            print(f"gunicorn launch -> first /api/data 200: {statistics.median(times) * 1e3:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,220 @@
+"""Load test for the /api/stream SSE endpoint, fed by the CSV replay.
+
+In-process (default): the ASGI app is driven directly, without a server,
+with ``--subscribers`` idle connections on one event loop while the replay
+feeder pushes bars. A share of the clients drops mid-stream and reconnects
+with ``Last-Event-ID``; every client must end up with exactly the events of
+its symbols, without gaps.
+
+    python benchmarks/load_stream.py --subscribers 1000 --days 60
+
+Against a running server (``TRADEX_INGEST=replay uvicorn asgi:app``), counting
+events over plain TCP connections for ``--duration`` seconds:
+
+    python benchmarks/load_stream.py --url http://127.0.0.1:8000 --subscribers 1000
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import sys
+import time
+from urllib.parse import urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from asgi import AsyncDataApp  # noqa: E402
+from barstore import BarStore  # noqa: E402
+from ingest import ReplayFeeder  # noqa: E402
+from providers import LocalProvider  # noqa: E402
+
+
+class Client:
+    def __init__(self, symbols, reconnect_after=None):
+        self.symbols = symbols
+        self.reconnect_after = reconnect_after
+        self.seqs = []
+        self.latencies = []
+        self.last_id = None
+        self.connects = 0
+        self.resets = 0
+        self.stop = asyncio.Event()
+
+    async def session(self, app, sent):
+        """One connection; True if it should reconnect (it hung up on purpose or got a reset)."""
+        self.connects += 1
+        hang_up = asyncio.Event()
+        headers = [(b"last-event-id", str(self.last_id).encode())] if self.last_id is not None else []
+        scope = {"type": "http", "method": "GET", "path": "/api/stream",
+                 "query_string": f"symbols={','.join(self.symbols)}".encode(), "headers": headers}
+        received = 0
+
+        async def receive():
+            stop = asyncio.ensure_future(self.stop.wait())
+            drop = asyncio.ensure_future(hang_up.wait())
+            try:
+                await asyncio.wait({stop, drop}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                stop.cancel()
+                drop.cancel()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal received
+            if message["type"] != "http.response.body":
+                return
+            now = time.perf_counter()
+            for block in message["body"].split(b"\n\n"):
+                if not block.startswith(b"id: "):
+                    continue
+                head, event = block.split(b"\n", 2)[:2]
+                self.last_id = int(head[4:])
+                if event == b"event: bar":
+                    self.seqs.append(self.last_id)
+                    self.latencies.append(now - sent[self.last_id])
+                    received += 1
+                    if self.reconnect_after and received == self.reconnect_after:
+                        hang_up.set()
+                elif event == b"event: reset":
+                    self.resets += 1
+
+        resets = self.resets
+        await app(scope, receive, send)
+        # after a reset a real client refetches /api/data and resumes from the reset's id
+        return (hang_up.is_set() or self.resets > resets) and not self.stop.is_set()
+
+    async def run(self, app, sent):
+        while await self.session(app, sent):
+            self.reconnect_after = None
+            await asyncio.sleep(random.uniform(0.0, 0.05))
+
+
+async def lifespan(app, messages):
+    async def receive():
+        return await messages.get()
+
+    async def send(message):
+        pass
+
+    await app({"type": "lifespan"}, receive, send)
+
+
+async def run_in_process(args):
+    store = BarStore()
+    symbols = store.symbols()
+    feeder = ReplayFeeder(store, days=args.days, speed=args.speed)
+    app = AsyncDataApp(provider=LocalProvider(store), use_engine=False, ingest=feeder, heartbeat=1.0)
+
+    sent = {}
+    publish = app.hub.publish
+
+    def timed_publish(symbol, data):
+        start = time.perf_counter()
+        seq = publish(symbol, data)
+        sent[seq] = start
+        return seq
+
+    app.hub.publish = timed_publish
+
+    rng = random.Random(0)
+    clients = [
+        Client(rng.sample(symbols, rng.randint(1, 3)),
+               reconnect_after=rng.randint(1, 20) if rng.random() < args.reconnect else None)
+        for _ in range(args.subscribers)
+    ]
+    tasks = [asyncio.ensure_future(c.run(app, sent)) for c in clients]
+    await asyncio.sleep(0.1)
+
+    messages = asyncio.Queue()
+    life = asyncio.ensure_future(lifespan(app, messages))
+    started = time.perf_counter()
+    await messages.put({"type": "lifespan.startup"})
+    while not app.ingestor.done.is_set():
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.5)
+    elapsed = time.perf_counter() - started
+
+    for c in clients:
+        c.stop.set()
+    await asyncio.gather(*tasks)
+    await messages.put({"type": "lifespan.shutdown"})
+    await life
+
+    events = list(app.hub._backlog)
+    gaps = 0
+    for c in clients:
+        wanted = [seq for seq, symbol, _ in events if symbol in c.symbols]
+        if c.resets:
+            # resynced clients skip what the reset covered, but must never repeat or reorder
+            gaps += c.seqs != sorted(set(c.seqs)) or not set(c.seqs) <= set(wanted)
+        else:
+            gaps += c.seqs != wanted
+    latencies = np.array([x for c in clients for x in c.latencies]) * 1e3
+    deliveries = len(latencies)
+    print(f"subscribers        {len(clients)}")
+    print(f"events published   {app.hub.published}")
+    print(f"deliveries         {deliveries} in {elapsed:.2f} s ({deliveries / elapsed:,.0f}/s)")
+    print(f"reconnects         {sum(c.connects - 1 for c in clients)} "
+          f"(resets {sum(c.resets for c in clients)}, hub drops {app.hub.dropped})")
+    print(f"clients with gaps  {gaps}")
+    if deliveries:
+        print(f"fan-out latency    p50 {np.percentile(latencies, 50):.2f} ms  "
+              f"p99 {np.percentile(latencies, 99):.2f} ms  max {latencies.max():.2f} ms")
+    print(f"peak RSS           {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} MiB")
+    return 1 if gaps else 0
+
+
+async def tcp_client(host, port, path, duration, counts, i):
+    try:
+        reader, writer = await asyncio.open_connection(host, port)
+    except OSError:
+        return
+    writer.write(f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAccept: text/event-stream\r\n\r\n".encode())
+    await writer.drain()
+    deadline = time.perf_counter() + duration
+    try:
+        while True:
+            line = await asyncio.wait_for(reader.readline(), max(deadline - time.perf_counter(), 0.001))
+            if not line:
+                break
+            if line.startswith(b"event: bar"):
+                counts[i] += 1
+    except asyncio.TimeoutError:
+        pass
+    finally:
+        writer.close()
+
+
+async def run_remote(args):
+    url = urlsplit(args.url)
+    symbols = BarStore().symbols()
+    rng = random.Random(0)
+    counts = [0] * args.subscribers
+    tasks = []
+    for i in range(args.subscribers):
+        path = f"/api/stream?symbols={','.join(rng.sample(symbols, rng.randint(1, 3)))}"
+        tasks.append(tcp_client(url.hostname, url.port or 80, path, args.duration, counts, i))
+    await asyncio.gather(*tasks)
+    total = sum(counts)
+    print(f"subscribers {args.subscribers}, events received {total} in {args.duration:.0f} s, "
+          f"clients with events {sum(1 for c in counts if c)}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=60, help="trading days to replay")
+    parser.add_argument("--speed", type=float, default=20.0, help="trading days per second, 0 = unthrottled")
+    parser.add_argument("--reconnect", type=float, default=0.1, help="share of clients that drop and resume")
+    parser.add_argument("--url", help="load a running server instead of the in-process app")
+    parser.add_argument("--duration", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    return asyncio.run(run_remote(args) if args.url else run_in_process(args))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Drive the guarded upstream client against a local fake chart server.
+
+The fake server answers ``/v8/finance/chart/<SYMBOL>`` like Yahoo's chart
+endpoint, from ``Data/``, after ``--latency`` seconds, and fails a share of
+requests with 503 (``--error-rate``) or 429 with ``Retry-After``
+(``--throttle-rate``). The run has three phases:
+
+1. ``--threads`` threads request random symbols from a small set, so many
+   requests coalesce and the token bucket paces the rest;
+2. the server goes down (every request 503): the breaker opens and calls fail
+   fast, served from ``Data/`` by the provider's fallback;
+3. the server recovers: after ``--reset`` seconds a probe closes the breaker.
+
+    python benchmarks/load_upstream.py --threads 32 --requests 400 --rate 50
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barstore import BarStore  # noqa: E402
+from providers import LocalProvider, YFinanceProvider  # noqa: E402
+from upstream import CircuitBreaker, UpstreamClient, UpstreamError  # noqa: E402
+
+
+class FakeChartServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, store, latency=0.0, error_rate=0.0, throttle_rate=0.0, seed=0):
+        super().__init__(("127.0.0.1", 0), FakeChartHandler)
+        self.store = store
+        self.latency = latency
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.served = 0
+        self.failed = 0
+        self.connections = set()
+        self.requested = []
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def chart(self, symbol):
+        bars = self.store.get(symbol)
+        if bars is None:
+            return None
+        seconds = bars.dates.astype("datetime64[s]").astype(np.int64) - 19800  # midnight in Asia/Kolkata
+        return {"chart": {"result": [{
+            "meta": {"symbol": symbol, "exchangeTimezoneName": "Asia/Kolkata"},
+            "timestamp": seconds.tolist(),
+            "indicators": {
+                "quote": [{"open": bars.open.tolist(), "high": bars.high.tolist(), "low": bars.low.tolist(),
+                           "close": bars.close.tolist(), "volume": bars.volume.tolist()}],
+                "adjclose": [{"adjclose": bars.close.tolist()}],
+            },
+        }], "error": None}}
+
+
+class FakeChartHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.connections.add(self.client_address)
+            roll = server.rng.random()
+        time.sleep(server.latency)
+        if roll < server.error_rate:
+            return self.reply(503, {"error": "unavailable"}, failed=True)
+        if roll < server.error_rate + server.throttle_rate:
+            return self.reply(429, {"error": "throttled"}, failed=True, headers={"Retry-After": "0"})
+        symbol = unquote(urlsplit(self.path).path.rsplit("/", 1)[-1])
+        with server.lock:
+            server.requested.append(symbol)
+        payload = server.chart(symbol)
+        if payload is None:
+            return self.reply(404, {"chart": {"result": None, "error": {"code": "Not Found"}}})
+        self.reply(200, payload)
+
+    def reply(self, status, payload, failed=False, headers=None):
+        body = json.dumps(payload).encode()
+        with self.server.lock:
+            self.server.served += 1
+            self.server.failed += failed
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def drive(provider, symbols, requests, threads, seed):
+    rng = random.Random(seed)
+    picks = [rng.choice(symbols) for _ in range(requests)]
+    latencies, errors = [], []
+
+    def one(symbol):
+        start = time.perf_counter()
+        try:
+            df = provider.history(symbol, "1y")
+            assert not df.empty
+        except UpstreamError as exc:
+            errors.append(type(exc).__name__)
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        list(pool.map(one, picks))
+    return time.perf_counter() - start, np.array(latencies) * 1e3, errors
+
+
+def report(label, elapsed, latencies, errors, server, client):
+    print(f"\n{label}: {len(latencies)} requests in {elapsed:.2f} s, errors {len(errors)}")
+    print(f"  latency p50 {np.percentile(latencies, 50):.1f} ms  p99 {np.percentile(latencies, 99):.1f} ms")
+    print(f"  server saw {server.served} requests ({server.failed} failed) on {len(server.connections)} connections")
+    print(f"  client {client.stats()}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--symbols", type=int, default=8, help="distinct symbols requested")
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--throttle-rate", type=float, default=0.05)
+    parser.add_argument("--rate", type=float, default=50.0, help="client token bucket, requests per second")
+    parser.add_argument("--reset", type=float, default=1.0, help="breaker reset timeout, seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    store = BarStore()
+    symbols = store.symbols()[:args.symbols]
+    server = FakeChartServer(store, args.latency, args.error_rate, args.throttle_rate, args.seed)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = UpstreamClient(server.url, rate=args.rate, burst=args.rate, retries=3, backoff=0.02,
+                            timeout=5.0, pool_size=args.threads,
+                            breaker=CircuitBreaker(failure_threshold=5, reset_timeout=args.reset))
+    provider = YFinanceProvider(client, fallback=LocalProvider(store))
+    try:
+        report("flaky upstream", *drive(provider, symbols, args.requests, args.threads, args.seed), server, client)
+
+        server.error_rate, server.throttle_rate = 1.0, 0.0
+        report("upstream down (fallback to Data/)",
+               *drive(provider, symbols, args.requests, args.threads, args.seed + 1), server, client)
+
+        server.error_rate = 0.0
+        time.sleep(args.reset)
+        report("upstream recovered", *drive(provider, symbols, args.requests // 4, args.threads, args.seed + 2),
+               server, client)
+    finally:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
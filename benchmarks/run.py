@@ -0,0 +1,272 @@
+"""Benchmark suite for the data, indicator and serialization paths, with JSON output.
+
+    python benchmarks/run.py                       # Data/ + synthetic 10k..1M bars
+    python benchmarks/run.py --sizes 1e4,1e6,1e7   # up to 10M synthetic bars
+    python benchmarks/run.py --e2e                 # /api/data through Flask's test client
+    python benchmarks/run.py --compare benchmarks/results/OLD.json
+
+Results go to ``benchmarks/results/<git commit>.json`` (or ``--out``): one
+record per case with its parameters and the best and median wall time of
+``--repeat`` runs, plus the interpreter and library versions. ``--compare``
+prints the new/old ratio of every case both files share.
+
+The end-to-end mode swaps the app's provider for ``FakeProvider`` (local bars
+behind ``--latency`` seconds of artificial delay) and reports requests per
+second of a single worker, with the precomputed engine and without it, both
+with the response cache off, and once more with the engine and the cache.
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("TRADEX_PROVIDER", "local")
+
+import pandas as pd  # noqa: E402
+
+import app  # noqa: E402
+import indicators  # noqa: E402
+from barstore import Bars, BarStore, csv_files, parse_csv, period_start  # noqa: E402
+from encoding import encode_columns, encode_json  # noqa: E402
+from montecarlo import simulate_chunk  # noqa: E402
+from portfolio import portfolio_backtest  # noqa: E402
+from providers import FakeProvider  # noqa: E402
+from streaming import IndicatorSet  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def measure(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def synthetic_bars(n, seed=0):
+    rng = np.random.default_rng(seed)
+    close = 1000 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    spread = close * rng.uniform(0, 0.01, n)
+    # 30 years of calendar days; long series put several bars on one day so dates stay in range
+    days = 30 * 365
+    dates = np.datetime64("1995-01-01") + np.arange(n, dtype=np.int64) * days // max(n, days)
+    return Bars("SYN", dates, close, close + spread, close - spread, close,
+                rng.integers(1000, 100000, n))
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+    except OSError:
+        return "unknown"
+    return out.stdout.strip() or "unknown"
+
+
+class Suite:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def run(self, name, fn, repeat=None, **params):
+        best, median = measure(fn, repeat or self.repeat)
+        self.results.append({"name": name, "params": params, "best_s": best, "median_s": median})
+        label = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{name:<28}{label:<28}{best * 1e3:>12.3f} ms{median * 1e3:>12.3f} ms")
+
+
+def bench_load(suite):
+    files = csv_files(os.path.join(ROOT, "Data"))
+    suite.run("csv_parse", lambda: [parse_csv(path, sym) for sym, path in files.items()], files=len(files))
+    store = BarStore()
+    store.symbols()
+    suite.run("barfile_open", lambda: store.reload(), files=len(files))
+
+
+def bench_indicators(suite, sizes, streaming_max):
+    for n in sizes:
+        bars = synthetic_bars(n)
+        series = pd.Series(bars.close)
+        repeat = 1 if n >= 5_000_000 else None
+
+        def pandas_path():
+            app.calculate_rsi(series)
+            app.calculate_macd(series)
+            app.calculate_ma(series, 20)
+            app.calculate_ma(series, 30)
+
+        # the engine's layout: the same number of bars as a (time x 50 symbols) matrix
+        matrix = bars.close[:n - n % 50].reshape(50, -1).T.copy()
+
+        def numpy_path():
+            indicators.rsi(matrix)
+            indicators.macd(matrix)
+            indicators.sma(matrix, 20)
+            indicators.sma(matrix, 30)
+
+        suite.run("indicators_pandas", pandas_path, repeat=repeat, bars=n)
+        suite.run("indicators_numpy_matrix", numpy_path, repeat=repeat, bars=n)
+        if n <= streaming_max:
+            suite.run("indicators_streaming", lambda: IndicatorSet().extend(bars.close.tolist()),
+                      repeat=repeat, bars=n)
+
+
+def bench_slicing(suite, services, sizes):
+    engine = services.engine
+    symbols = engine.store.symbols() if engine is not None else []
+    if engine is not None:
+        engine.warm()
+    for period in ("1mo", "1y", "max"):
+        if symbols:
+            suite.run("engine_lookup", lambda: [engine.lookup(s, period, (20, 30)) for s in symbols],
+                      symbols=len(symbols), period=period)
+        for n in sizes:
+            bars = synthetic_bars(n)
+            suite.run("period_slice", lambda: bars.slice(period_start(bars.dates, period)), bars=n, period=period)
+
+
+def bench_portfolio(suite, services):
+    store = services.store
+    if store is None:
+        return
+    store.symbols()
+    for allocation in ("equal", "capped"):
+        suite.run("portfolio_backtest", lambda: portfolio_backtest(store, allocation=allocation),
+                  symbols=len(store.symbols()), allocation=allocation)
+
+
+def bench_montecarlo(suite):
+    close = synthetic_bars(385).close
+    for paths in (1000, 10000):
+        suite.run("montecarlo_chunk", lambda: simulate_chunk(close, 20, 30, paths, 20, 0), bars=385, paths=paths)
+
+
+def bench_encoding(suite, sizes):
+    for n in sizes:
+        if n > 1_000_000:
+            continue
+        bars = synthetic_bars(n)
+        rng = np.random.default_rng(1)
+        columns = {"dates": bars.dates, "close": bars.close}
+        for name in ("rsi", "macd", "signal", "ma20", "ma30"):
+            columns[name] = rng.normal(100, 10, n)
+        payload = {"graph": columns, "financials": {}, "maLabels": ["MA20", "MA30"]}
+        repeat = 1 if n >= 1_000_000 else None
+
+        suite.run("encode_lists_json", lambda: json.dumps(dict(payload, graph=app.graph_lists(columns))),
+                  repeat=repeat, rows=n)
+        suite.run("encode_fast_json", lambda: encode_json(payload), repeat=repeat, rows=n)
+        suite.run("encode_columns", lambda: encode_columns(payload), repeat=repeat, rows=n)
+
+
+def bench_e2e(suite, flask_app, requests, latency):
+    client = flask_app.test_client()
+    services = flask_app.extensions["tradex"]
+    store = services.store
+    symbols = store.symbols()
+    bodies = [{"symbol": s, "range": r} for s in symbols for r in ("1m", "1y", "2y")]
+    bodies = (bodies * (requests // len(bodies) + 1))[:requests]
+    saved = services.provider, services.engine, services.responses.maxsize
+
+    def drive():
+        for body in bodies:
+            response = client.post("/api/data", json=body)
+            assert response.status_code == 200, response.status_code
+
+    try:
+        services.provider = FakeProvider(store, latency=latency)
+        # the bodies repeat, so the response cache is off except in the pass that measures it
+        for label, engine, cached in (("engine", saved[1], False), ("provider", None, False),
+                                      ("engine+cache", saved[1], True)):
+            services.engine = engine
+            services.fundamentals.invalidate()
+            services.responses.clear()
+            services.responses.maxsize = saved[2] if cached else 0
+            best, median = measure(drive, 1)
+            suite.results.append({
+                "name": "e2e_api_data", "params": {"path": label, "requests": len(bodies), "latency": latency},
+                "best_s": best, "median_s": median, "requests_per_s": len(bodies) / best,
+            })
+            print(f"{'e2e_api_data':<28}{f'path={label}':<28}{len(bodies) / best:>12.0f} req/s")
+    finally:
+        services.provider, services.engine, services.responses.maxsize = saved
+
+
+def compare(new, old_path):
+    with open(old_path) as f:
+        old = json.load(f)
+    key = lambda r: (r["name"], json.dumps(r["params"], sort_keys=True))  # noqa: E731
+    before = {key(r): r for r in old["results"]}
+    print(f"\n{'case':<56}{'old ms':>10}{'new ms':>10}{'ratio':>8}")
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        label = r["name"] + " " + " ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{label:<56}{o['best_s'] * 1e3:>10.3f}{r['best_s'] * 1e3:>10.3f}{r['best_s'] / o['best_s']:>8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="1e4,1e5,1e6", help="synthetic series lengths, comma separated")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--streaming-max", type=float, default=1e5,
+                        help="largest series fed bar by bar to the streaming indicators")
+    parser.add_argument("--e2e", action="store_true", help="also drive /api/data through the test client")
+    parser.add_argument("--e2e-only", action="store_true")
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--latency", type=float, default=0.0, help="FakeProvider delay per call, seconds")
+    parser.add_argument("--out", help="result file (default benchmarks/results/<commit>.json)")
+    parser.add_argument("--compare", help="earlier result file to compare against")
+    args = parser.parse_args(argv)
+
+    sizes = [int(float(s)) for s in args.sizes.split(",") if s]
+    flask_app = app.create_app(start_background=False)
+    suite = Suite(args.repeat)
+    print(f"{'case':<28}{'params':<28}{'best':>15}{'median':>15}")
+    if not args.e2e_only:
+        bench_load(suite)
+        bench_indicators(suite, sizes, args.streaming_max)
+        services = flask_app.extensions["tradex"]
+        bench_slicing(suite, services, sizes)
+        bench_portfolio(suite, services)
+        bench_montecarlo(suite)
+        bench_encoding(suite, sizes)
+    if args.e2e or args.e2e_only:
+        bench_e2e(suite, flask_app, args.requests, args.latency)
+
+    commit = git_commit()
+    result = {
+        "meta": {
+            "commit": commit,
+            "time": dt.datetime.now(dt.timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": suite.results,
+    }
+    out = args.out or os.path.join(RESULTS_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w") as f:
+        json.dump(result, f, indent=1)
+    print(f"\nwrote {out}")
+    if args.compare:
+        compare(result, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
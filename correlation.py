@@ -0,0 +1,201 @@
+"""Return correlation and covariance matrices across symbols.
+
+Closes of the requested symbols are laid out on the union of their trading
+calendars, and only dates on which every symbol traded are kept, so a holiday
+in one market never pairs a return with a missing day; each log return spans
+the gap to the previous common date.
+
+Over that (time x symbol) log-return matrix ``R`` a window's statistics follow
+from the row count, the column sums ``R.sum(0)`` and the cross-products
+``R.T @ R``. ``RollingMoments`` keeps those and moves the window with rank-1
+adds and removes, so stepping the end date forward by k days costs k outer
+products instead of a full ``R.T @ R``.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from barstore import normalize_symbol
+
+
+def aligned_closes(bars_list):
+    """``(dates, closes)``: dates every symbol traded on, closes as a (time x symbol) matrix."""
+    if not bars_list:
+        return np.zeros(0, dtype="datetime64[D]"), np.zeros((0, 0))
+    calendar = bars_list[0].dates
+    for bars in bars_list[1:]:
+        calendar = np.union1d(calendar, bars.dates)
+    closes = np.full((len(calendar), len(bars_list)), np.nan)
+    for j, bars in enumerate(bars_list):
+        closes[np.searchsorted(calendar, bars.dates), j] = bars.close
+    common = ~np.isnan(closes).any(axis=1)
+    return calendar[common], closes[common]
+
+
+def log_returns(closes):
+    """Row-to-row log returns of a close matrix, one row shorter."""
+    return np.diff(np.log(closes), axis=0)
+
+
+class RollingMoments:
+    """Count, column sums and cross-products of the rows in a window."""
+
+    __slots__ = ("count", "sums", "cross")
+
+    def __init__(self, rows):
+        rows = np.asarray(rows, dtype=np.float64)
+        self.count = len(rows)
+        self.sums = rows.sum(axis=0)
+        self.cross = rows.T @ rows
+
+    def copy(self):
+        other = RollingMoments.__new__(RollingMoments)
+        other.count, other.sums, other.cross = self.count, self.sums.copy(), self.cross.copy()
+        return other
+
+    def add(self, row):
+        self.count += 1
+        self.sums += row
+        self.cross += np.outer(row, row)
+
+    def remove(self, row):
+        self.count -= 1
+        self.sums -= row
+        self.cross -= np.outer(row, row)
+
+    def covariance(self):
+        n = self.count
+        if n < 2:
+            return np.full(self.cross.shape, np.nan)
+        return (self.cross - np.outer(self.sums, self.sums) / n) / (n - 1)
+
+    def correlation(self):
+        cov = self.covariance()
+        std = np.sqrt(np.diag(cov))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = cov / np.outer(std, std)
+        np.fill_diagonal(corr, 1.0)
+        return np.clip(corr, -1.0, 1.0)
+
+
+class CorrelationService:
+    """Correlation/covariance for (symbols, window, end date), cached and rolled incrementally.
+
+    Results are kept in an LRU keyed by ``(symbols, window, end date)``. For
+    each ``(symbols, window)`` the moments of the last computed window are
+    kept too, in an LRU of the same size; a later end date within ``window`` rows of it is reached by
+    rolling those forward, anything else is recomputed with one matmul.
+    """
+
+    def __init__(self, store, maxsize=128):
+        self.store = store
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+        self._returns = OrderedDict()
+        self._rolling = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.rolled = 0
+
+    def invalidate(self, symbol=None):
+        """Forget everything, or the returns of symbol sets containing ``symbol``.
+
+        Bars are only ever appended, so a new bar adds return rows at the end
+        and leaves results and rolling moments over earlier rows valid.
+        """
+        with self._lock:
+            if symbol is None:
+                self._results.clear()
+                self._returns.clear()
+                self._rolling.clear()
+                return
+            symbol = normalize_symbol(symbol)
+            for key in [k for k in self._returns if symbol in k]:
+                del self._returns[key]
+
+    def _remember(self, cache, key, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.maxsize:
+            cache.popitem(last=False)
+
+    def returns(self, symbols):
+        """``(dates, R)`` for a tuple of normalized symbols; ``dates[i]`` is the end of return ``R[i]``."""
+        with self._lock:
+            cached = self._returns.get(symbols)
+            if cached is not None:
+                self._returns.move_to_end(symbols)
+                return cached
+        bars_list = [self.store.get(s) for s in symbols]
+        missing = [s for s, b in zip(symbols, bars_list) if b is None]
+        if missing:
+            raise KeyError(", ".join(missing))
+        dates, closes = aligned_closes(bars_list)
+        value = (dates[1:], log_returns(closes))
+        with self._lock:
+            self._remember(self._returns, symbols, value)
+        return value
+
+    def matrices(self, symbols, window=60, end=None):
+        """Dict with the window's dates, row count, ``correlation`` and ``covariance`` matrices.
+
+        ``KeyError`` names symbols without data; ``ValueError`` for a window below 2.
+        """
+        symbols = tuple(normalize_symbol(s) for s in symbols)
+        window = int(window)
+        if window < 2:
+            raise ValueError("window must be at least 2")
+        dates, R = self.returns(symbols)
+        stop = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), "right"))
+        start = max(stop - window, 0)
+        key = (symbols, window, str(dates[stop - 1]) if stop else None)
+
+        with self._lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return result
+            self.misses += 1
+            previous = self._rolling.get((symbols, window))
+            if previous is not None:
+                self._rolling.move_to_end((symbols, window))
+
+        if previous is not None and previous[0] <= stop <= previous[0] + window:
+            old_stop, old_start, moments = previous[0], previous[1], previous[2].copy()
+            for i in range(old_stop, stop):
+                moments.add(R[i])
+            for i in range(old_start, start):
+                moments.remove(R[i])
+            with self._lock:
+                self.rolled += 1
+        else:
+            moments = RollingMoments(R[start:stop])
+
+        result = {
+            "symbols": list(symbols),
+            "window": window,
+            "rows": stop - start,
+            "start": str(dates[start]) if stop > start else None,
+            "end": key[2],
+            "correlation": moments.correlation(),
+            "covariance": moments.covariance(),
+        }
+        with self._lock:
+            self._remember(self._rolling, (symbols, window), (stop, start, moments))
+            self._remember(self._results, key, result)
+        return result
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._results),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "rolled": self.rolled,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
@@ -0,0 +1,101 @@
+"""Downsampling of chart series to a point budget.
+
+Both methods pick row *indices* from one driving series (the close), so every
+other column of the payload can be cut with the same indices and stays aligned.
+
+``lttb``
+    Largest-Triangle-Three-Buckets. Rows are laid out as a padded
+    (bucket x width) matrix; for each bucket the triangle areas of all its
+    candidates are one vectorized expression, leaving a single pass over the
+    buckets for the dependency on the previously chosen point.
+``minmax``
+    Lowest and highest point of each bucket, fully vectorized with reduceat;
+    keeps every spike at the cost of two points per bucket.
+"""
+import numpy as np
+
+METHODS = ("lttb", "minmax")
+
+
+def _bucket_edges(n, buckets):
+    # first and last rows are kept as-is; the rest is split into `buckets` near-equal runs
+    return 1 + np.arange(buckets + 1, dtype=np.int64) * (n - 2) // buckets
+
+
+def lttb_indices(y, max_points, x=None):
+    """Indices of at most ``max_points`` rows of ``y`` chosen by LTTB (first and last always kept)."""
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if max_points >= n or n <= 2:
+        return np.arange(n)
+    max_points = max(int(max_points), 3)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    buckets = max_points - 2
+    edges = _bucket_edges(n, buckets)
+    starts, stops = edges[:-1], edges[1:]
+    lengths = stops - starts
+    width = int(lengths.max())
+
+    # padded candidate matrix, padding points repeat the bucket's first row and are masked out
+    cols = np.arange(width)
+    rows = starts[:, None] + np.minimum(cols, lengths[:, None] - 1)
+    valid = cols < lengths[:, None]
+    X, Y = x[rows], y[rows]
+
+    # the third vertex is the mean of the next bucket (the last point for the final bucket)
+    next_x = np.append(np.add.reduceat(x[1:n - 1], starts - 1) / lengths, x[-1])[1:]
+    next_y = np.append(np.add.reduceat(y[1:n - 1], starts - 1) / lengths, y[-1])[1:]
+
+    chosen = np.empty(buckets, dtype=np.int64)
+    ax, ay = x[0], y[0]
+    for b in range(buckets):
+        cx, cy = next_x[b], next_y[b]
+        area = np.abs((ax - cx) * (Y[b] - ay) - (ax - X[b]) * (cy - ay))
+        area[~valid[b]] = -1.0
+        k = int(area.argmax())
+        chosen[b] = rows[b, k]
+        ax, ay = X[b, k], Y[b, k]
+    return np.concatenate(([0], chosen, [n - 1]))
+
+
+def minmax_indices(y, max_points):
+    """Indices of the min and max row of each bucket, at most ``max_points`` in total, sorted."""
+    y = np.nan_to_num(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if max_points >= n or n <= 2:
+        return np.arange(n)
+    if max_points < 4:
+        # no room for a min/max pair besides the first and last row: plain striding
+        return np.unique(np.linspace(0, n - 1, max(int(max_points), 1)).round().astype(np.int64))
+    # first and last row plus two per bucket
+    buckets = (int(max_points) - 2) // 2
+    edges = _bucket_edges(n, buckets)
+    starts, lengths = edges[:-1], np.diff(edges)
+
+    # argmin/argmax per bucket: reduce, then find the first row equal to the reduced value
+    bucket_of = np.repeat(np.arange(buckets), lengths)
+    body = y[1:n - 1]
+    lo = np.minimum.reduceat(body, starts - 1)
+    hi = np.maximum.reduceat(body, starts - 1)
+    pos = np.arange(1, n - 1)
+    big = np.iinfo(np.int64).max
+    first_lo = np.minimum.reduceat(np.where(body == lo[bucket_of], pos, big), starts - 1)
+    first_hi = np.minimum.reduceat(np.where(body == hi[bucket_of], pos, big), starts - 1)
+    return np.unique(np.concatenate(([0], first_lo, first_hi, [n - 1])))
+
+
+def downsample_indices(y, max_points, method="lttb"):
+    if method == "minmax":
+        return minmax_indices(y, max_points)
+    if method == "lttb":
+        return lttb_indices(y, max_points)
+    raise ValueError(f"unknown downsampling method {method!r}")
+
+
+def downsample_columns(columns, max_points, method="lttb", driver="close"):
+    """Cut every array in ``columns`` to the same indices, chosen on ``columns[driver]``."""
+    idx = downsample_indices(columns[driver], max_points, method)
+    if len(idx) == len(columns[driver]):
+        return columns
+    return {name: values[idx] for name, values in columns.items()}
@@ -0,0 +1,201 @@
+"""Response encodings for graph payloads that skip boxing every value into Python objects.
+
+``/api/data`` picks one from the Accept header; plain ``application/json``
+keeps using ``jsonify``.
+
+``application/vnd.tradex+json``
+    Same JSON document, but NumPy columns are written straight to text:
+    prices as fixed two-decimal numbers built digit by digit with array ops,
+    dates as quoted ISO strings.
+
+``application/x-tradex-columns``
+    ``b"TDXC"``, a little-endian u32 length and a JSON header
+    (``{"rows": n, "columns": [{"name", "dtype"}...], ...}`` plus the non-array
+    fields), padded to 4 bytes, followed by each column back to back:
+    ``dates`` as int32 days since 1970-01-01, everything else as float32.
+    In the browser every column is a ``Float32Array``/``Int32Array`` view of
+    the response buffer.
+
+``application/vnd.apache.arrow.stream``
+    Arrow IPC stream with the same columns; offered only if pyarrow is installed.
+"""
+import functools
+import json
+import struct
+
+import numpy as np
+
+JSON_MIME = "application/json"
+FAST_JSON_MIME = "application/vnd.tradex+json"
+COLUMNS_MIME = "application/x-tradex-columns"
+ARROW_MIME = "application/vnd.apache.arrow.stream"
+
+_COMMA = ord(",")
+_DOT = ord(".")
+_MINUS = ord("-")
+_QUOTE = ord('"')
+_ZERO = ord("0")
+
+
+@functools.lru_cache(maxsize=None)
+def has_arrow():
+    # checked once: offered_mimetypes runs on every request and a failed import is not cached
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def offered_mimetypes():
+    offered = [JSON_MIME, FAST_JSON_MIME, COLUMNS_MIME]
+    if has_arrow():
+        offered.append(ARROW_MIME)
+    return offered
+
+
+def format_fixed2(values):
+    """Comma separated two-decimal text of ``values`` (NaN written as 0), as bytes."""
+    cents = np.rint(np.nan_to_num(np.asarray(values, dtype=np.float64)) * 100).astype(np.int64)
+    n = len(cents)
+    if n == 0:
+        return b""
+    neg = cents < 0
+    cents = np.abs(cents)
+    whole, frac = np.divmod(cents, 100)
+    width = max(len(str(int(whole.max()))), 1)
+
+    # one row per number: sign, `width` integer digits, '.', two decimals, ','
+    out = np.empty((n, width + 5), dtype=np.uint8)
+    keep = np.ones(out.shape, dtype=bool)
+    out[:, 0] = _MINUS
+    keep[:, 0] = neg
+    powers = 10 ** np.arange(width - 1, -1, -1, dtype=np.int64)
+    out[:, 1:width + 1] = whole[:, None] // powers % 10 + _ZERO
+    # drop leading zeros, always keep the units digit
+    keep[:, 1:width + 1] = whole[:, None] >= powers
+    keep[:, width] = True
+    out[:, width + 1] = _DOT
+    out[:, width + 2] = frac // 10 + _ZERO
+    out[:, width + 3] = frac % 10 + _ZERO
+    out[:, width + 4] = _COMMA
+    keep[-1, width + 4] = False
+    return out[keep].tobytes()
+
+
+def format_dates(dates):
+    """Comma separated quoted ``YYYY-MM-DD`` strings of a datetime64 array, as bytes."""
+    n = len(dates)
+    if n == 0:
+        return b""
+    dates = np.asarray(dates, dtype="datetime64[D]")
+    months = dates.astype("datetime64[M]")
+    year = months.astype("datetime64[Y]").astype(np.int64) + 1970
+    month = months.astype(np.int64) % 12 + 1
+    day = (dates - months).astype(np.int64) + 1
+    out = np.empty((n, 13), dtype=np.uint8)
+    out[:, 0] = _QUOTE
+    out[:, 1:5] = year[:, None] // np.array([1000, 100, 10, 1]) % 10 + _ZERO
+    out[:, 5] = _MINUS
+    out[:, 6] = month // 10 + _ZERO
+    out[:, 7] = month % 10 + _ZERO
+    out[:, 8] = _MINUS
+    out[:, 9] = day // 10 + _ZERO
+    out[:, 10] = day % 10 + _ZERO
+    out[:, 11] = _QUOTE
+    out[:, 12] = _COMMA
+    return out.reshape(-1)[:-1].tobytes()
+
+
+def _json_value(value):
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "M":
+            return b"[" + format_dates(value) + b"]"
+        return b"[" + format_fixed2(value) + b"]"
+    if isinstance(value, dict):
+        # sorted like Flask's jsonify so both encoders emit the same document
+        items = sorted(value.items())
+        return b"{" + b",".join(json.dumps(str(k)).encode() + b":" + _json_value(v) for k, v in items) + b"}"
+    if isinstance(value, (list, tuple)):
+        return b"[" + b",".join(_json_value(v) for v in value) + b"]"
+    return json.dumps(value).encode()
+
+
+def encode_json(payload):
+    """JSON bytes of ``payload``; NumPy arrays in it are written as number/date lists directly."""
+    return _json_value(payload)
+
+
+def _split(payload, columns_key):
+    columns = payload[columns_key]
+    meta = {k: v for k, v in payload.items() if k != columns_key}
+    return columns, meta
+
+
+def encode_columns(payload, columns_key="graph"):
+    """Typed-array encoding of ``payload[columns_key]`` (see module docstring)."""
+    columns, meta = _split(payload, columns_key)
+    blobs, described = [], []
+    rows = 0
+    for name, values in columns.items():
+        values = np.asarray(values)
+        rows = len(values)
+        if values.dtype.kind == "M":
+            blobs.append(values.astype("datetime64[D]").astype("<i4").tobytes())
+            described.append({"name": name, "dtype": "int32", "unit": "epoch-day"})
+        else:
+            blobs.append(np.nan_to_num(values).astype("<f4").tobytes())
+            described.append({"name": name, "dtype": "float32"})
+    meta = dict(meta, rows=rows, columns=described)
+    header = json.dumps(meta).encode()
+    header += b" " * (-(8 + len(header)) % 4)
+    return b"".join([b"TDXC", struct.pack("<I", len(header)), header] + blobs)
+
+
+def decode_columns(data):
+    """Inverse of ``encode_columns``: ``(meta, {name: array})``; arrays are views of ``data``."""
+    if data[:4] != b"TDXC":
+        raise ValueError("not a TDXC payload")
+    (length,) = struct.unpack_from("<I", data, 4)
+    meta = json.loads(data[8:8 + length])
+    offset = 8 + length
+    rows = meta["rows"]
+    columns = {}
+    for col in meta["columns"]:
+        dtype = "<i4" if col["dtype"] == "int32" else "<f4"
+        values = np.frombuffer(data, dtype=dtype, count=rows, offset=offset)
+        if col.get("unit") == "epoch-day":
+            values = values.astype("datetime64[D]")
+        columns[col["name"]] = values
+        offset += rows * 4
+    return meta, columns
+
+
+def encode_arrow(payload, columns_key="graph"):
+    """Arrow IPC stream of the columns; the remaining fields go into schema metadata as JSON."""
+    import pyarrow as pa
+
+    columns, meta = _split(payload, columns_key)
+    arrays, names = [], []
+    for name, values in columns.items():
+        values = np.asarray(values)
+        if values.dtype.kind == "M":
+            arrays.append(pa.array(values.astype("datetime64[D]").astype(np.int32), type=pa.int32()).cast(pa.date32()))
+        else:
+            arrays.append(pa.array(np.nan_to_num(values).astype(np.float32)))
+        names.append(name)
+    table = pa.Table.from_arrays(arrays, names=names).replace_schema_metadata({"tradex": json.dumps(meta)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def encode(payload, mimetype):
+    if mimetype == FAST_JSON_MIME:
+        return encode_json(payload), JSON_MIME
+    if mimetype == COLUMNS_MIME:
+        return encode_columns(payload), COLUMNS_MIME
+    if mimetype == ARROW_MIME:
+        return encode_arrow(payload), ARROW_MIME
+    raise ValueError(f"unsupported encoding {mimetype}")
@@ -0,0 +1,140 @@
+"""Fan-out of per-symbol deltas to many idle subscribers on one event loop.
+
+Every published event gets the next sequence number and is kept in a bounded
+backlog. A subscriber names its symbols and the last sequence number it saw;
+it first receives the backlog after that cursor, then live events. If the
+cursor is older than the backlog, newer than the last event (the hub was
+restarted) or the subscriber falls ``queue_size`` events behind, it gets a
+single ``reset`` event and should refetch full data.
+
+Subscribers are an ``asyncio.Queue`` each, indexed by symbol, so an idle
+connection costs one queue and no thread. ``publish`` may be called from any
+thread; delivery always happens on the hub's loop.
+"""
+import asyncio
+import itertools
+import threading
+from collections import deque
+
+RESET = "reset"
+CLOSED = "closed"
+
+
+class Subscription:
+    __slots__ = ("symbols", "queue", "overflowed", "cursor")
+
+    def __init__(self, symbols, queue_size):
+        self.symbols = frozenset(symbols)
+        self.queue = asyncio.Queue(queue_size)
+        self.overflowed = False
+        # events up to here came from the backlog; a late dispatch of them is skipped
+        self.cursor = 0
+
+    async def get(self):
+        return await self.queue.get()
+
+    def drain(self):
+        """Events already queued, without waiting."""
+        events = []
+        while not self.queue.empty():
+            events.append(self.queue.get_nowait())
+        return events
+
+    def close(self):
+        """Wake a pending ``get`` with a ``CLOSED`` event, e.g. when the client went away."""
+        self.overflowed = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait((None, None, CLOSED))
+
+
+class DeltaHub:
+    def __init__(self, backlog=10000, queue_size=256):
+        self.queue_size = queue_size
+        self.loop = None
+        self._seq = itertools.count(1)
+        self._lock = threading.Lock()
+        self._backlog = deque(maxlen=backlog)
+        self._by_symbol = {}
+        self.published = 0
+        self.dropped = 0
+
+    @property
+    def last_seq(self):
+        return self._backlog[-1][0] if self._backlog else 0
+
+    def bind(self, loop=None):
+        self.loop = loop or asyncio.get_running_loop()
+
+    def publish(self, symbol, data):
+        """Number and record one event; subscribers of ``symbol`` get ``(seq, symbol, data)``."""
+        with self._lock:
+            event = (next(self._seq), symbol, data)
+            self._backlog.append(event)
+            self.published += 1
+        if self.loop is None:
+            return event[0]
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self.loop:
+            self._dispatch(event)
+        else:
+            self.loop.call_soon_threadsafe(self._dispatch, event)
+        return event[0]
+
+    def _dispatch(self, event):
+        for sub in list(self._by_symbol.get(event[1], ())):
+            if sub.overflowed or event[0] <= sub.cursor:
+                continue
+            try:
+                sub.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # too far behind to catch up event by event: replace the queue with one reset
+                sub.overflowed = True
+                self.dropped += 1
+                while not sub.queue.empty():
+                    sub.queue.get_nowait()
+                sub.queue.put_nowait((self.last_seq, None, RESET))
+
+    def subscribe(self, symbols, since=None):
+        """Register a subscription; with ``since`` the backlog after that cursor is queued first."""
+        if self.loop is None:
+            self.bind()
+        sub = Subscription(symbols, self.queue_size)
+        with self._lock:
+            backlog = list(self._backlog)
+            sub.cursor = backlog[-1][0] if backlog else 0
+            for symbol in sub.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(sub)
+        if since is not None:
+            oldest = backlog[0][0] if backlog else self.last_seq + 1
+            missed = [e for e in backlog if e[0] > since and e[1] in sub.symbols]
+            # a cursor past the newest event comes from before a restart: its gap is unknown
+            if not oldest - 1 <= since <= sub.cursor or len(missed) >= self.queue_size:
+                sub.overflowed = True
+                sub.queue.put_nowait((self.last_seq, None, RESET))
+            else:
+                for event in missed:
+                    sub.queue.put_nowait(event)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            for symbol in sub.symbols:
+                subs = self._by_symbol.get(symbol)
+                if subs is not None:
+                    subs.discard(sub)
+                    if not subs:
+                        del self._by_symbol[symbol]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "subscribers": len({sub for subs in self._by_symbol.values() for sub in subs}),
+                "published": self.published,
+                "dropped": self.dropped,
+                "lastSeq": self.last_seq,
+                "backlog": len(self._backlog),
+            }
@@ -0,0 +1,139 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# response label -> ticker.info key
+FINANCIAL_FIELDS = {
+    "Name": "longName",
+    "Sector": "sector",
+    "Industry": "industry",
+    "Market Cap": "marketCap",
+    "P/E Ratio": "trailingPE",
+    "EPS": "trailingEps",
+    "Dividend Yield": "dividendYield",
+}
+
+
+def extract_financials(info):
+    return {label: info.get(key) for label, key in FINANCIAL_FIELDS.items()}
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class FundamentalsCache:
+    """TTL + LRU cache in front of a slow ``fetch(symbol) -> dict`` call.
+
+    Concurrent misses for the same symbol share one upstream call. Empty
+    results are kept for ``negative_ttl`` only, so a transient upstream failure
+    does not blank a symbol for a whole day. With ``snapshot_path`` set, entries
+    are written to a JSON file and read back on start so a restarted worker is warm.
+    """
+
+    def __init__(self, fetch, ttl=24 * 3600, maxsize=256, negative_ttl=300,
+                 snapshot_path=None, clock=time.time):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.negative_ttl = negative_ttl
+        self.snapshot_path = snapshot_path
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # symbol -> (expires_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        if snapshot_path:
+            self._load_snapshot()
+
+    def get(self, symbol):
+        with self._lock:
+            entry = self._entries.get(symbol)
+            if entry is not None and entry[0] > self.clock():
+                self._entries.move_to_end(symbol)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+            call = self._inflight.get(symbol)
+            leader = call is None
+            if leader:
+                call = self._inflight[symbol] = _Call()
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+
+        try:
+            call.value = self.fetch(symbol)
+            self._put(symbol, call.value)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[symbol]
+            call.done.set()
+        return call.value
+
+    def _put(self, symbol, value):
+        ttl = self.ttl if any(v is not None for v in value.values()) else self.negative_ttl
+        with self._lock:
+            self._entries[symbol] = (self.clock() + ttl, value)
+            self._entries.move_to_end(symbol)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        if self.snapshot_path:
+            self._save_snapshot()
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(symbol, None)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _save_snapshot(self):
+        with self._lock:
+            entries = [[symbol, expires, value] for symbol, (expires, value) in self._entries.items()]
+        tmp = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp, self.snapshot_path)
+        except OSError:
+            pass
+
+    def _load_snapshot(self):
+        try:
+            with open(self.snapshot_path) as f:
+                entries = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = self.clock()
+        for symbol, expires, value in entries[-self.maxsize:]:
+            if expires > now:
+                self._entries[symbol] = (expires, value)
@@ -0,0 +1,30 @@
+"""gunicorn settings: build and warm the app once in the master, then fork.
+
+    gunicorn -c gunicorn.conf.py
+
+With ``preload_app`` the master runs ``create_app`` with warm caches before
+forking, so the bar store and the precomputed indicators are built once and
+the workers share them copy-on-write. ``gc.freeze`` keeps the collector from
+touching (and so copying) those objects in the workers. Threads do not survive
+a fork, so the ingest thread (``TRADEX_INGEST=replay``) is started per worker,
+and each worker shuts down its own pools when it exits.
+"""
+import gc
+import os
+
+bind = os.environ.get("TRADEX_BIND", "127.0.0.1:8000")
+workers = int(os.environ.get("TRADEX_WORKERS", 4))
+preload_app = True
+wsgi_app = "app:create_app(warm_caches=True, start_background=False)"
+
+
+def when_ready(server):
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    server.app.wsgi().extensions["tradex"].start_ingest()
+
+
+def worker_exit(server, worker):
+    server.app.wsgi().extensions["tradex"].close()
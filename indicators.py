@@ -0,0 +1,239 @@
+"""Vectorized RSI / MACD / SMA over the whole bar store at once.
+
+Closes of every symbol are stacked into one (time x symbol) matrix. Series of
+different lengths are right-aligned, i.e. padded with NaN at the top, so row
+``T - 1`` is the latest bar of every symbol. All indicators are computed for all
+symbols in one pass and kept, so serving a request is a slice of a column.
+
+The results follow ``calculate_rsi``, ``calculate_macd`` and ``calculate_ma`` in
+``app.py`` (simple-average RSI, ``adjust=False`` EMAs) up to float rounding.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from barstore import CalendarIndex, normalize_symbol, period_start
+from resample import DAILY, parse_interval, resample
+
+
+def close_matrix(bars_list):
+    """Right-aligned (time x symbol) float64 matrix of closes plus the pad of each column."""
+    T = max((len(b) for b in bars_list), default=0)
+    closes = np.full((T, len(bars_list)), np.nan)
+    pads = np.empty(len(bars_list), dtype=np.int64)
+    for j, b in enumerate(bars_list):
+        pads[j] = T - len(b)
+        closes[pads[j]:, j] = b.close
+    return closes, pads
+
+
+def prefix_sums(values):
+    # leading row of zeros so window sums are csum[t + 1] - csum[t + 1 - w]
+    csum = np.zeros((values.shape[0] + 1,) + values.shape[1:])
+    np.cumsum(np.nan_to_num(values), axis=0, out=csum[1:])
+    return csum
+
+
+def sma_from_prefix(csum, pads, window):
+    """Rolling mean of ``window`` rows; NaN until a column has ``window`` real values."""
+    T = csum.shape[0] - 1
+    out = np.full((T,) + csum.shape[1:], np.nan)
+    if window <= T:
+        out[window - 1:] = (csum[window:] - csum[:-window]) / window
+        rows = np.arange(T).reshape((T,) + (1,) * (csum.ndim - 1))
+        out[np.broadcast_to(rows < pads + window - 1, out.shape)] = np.nan
+    return out
+
+
+def sma(values, window, pads=None):
+    if pads is None:
+        pads = _leading_nans(values)
+    return sma_from_prefix(prefix_sums(values), pads, window)
+
+
+def _leading_nans(values):
+    valid = ~np.isnan(values)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), values.shape[0])
+
+
+def ema(values, span):
+    """``ewm(span=span, adjust=False).mean()`` along axis 0, seeded at each column's first value."""
+    alpha = 2.0 / (span + 1.0)
+    beta = 1.0 - alpha
+    out = np.empty_like(values)
+    prev = np.full(values.shape[1:], np.nan)
+    for t in range(values.shape[0]):
+        row = values[t]
+        # first real value of a column seeds it, NaN padding before that propagates
+        prev = np.where(np.isnan(prev), row, beta * prev + alpha * row)
+        out[t] = prev
+    return out
+
+
+def rsi(values, window=14, pads=None):
+    if pads is None:
+        pads = _leading_nans(values)
+    delta = np.zeros_like(values)
+    delta[1:] = values[1:] - values[:-1]
+    # calculate_rsi's .where() turns the leading NaN diff into a 0 gain/loss
+    delta = np.nan_to_num(delta)
+    gain = np.maximum(delta, 0.0)
+    loss = np.maximum(-delta, 0.0)
+    avg_gain = sma(gain, window, pads)
+    avg_loss = sma(loss, window, pads)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+def macd(values, fast=12, slow=26, signal=9):
+    line = ema(values, fast) - ema(values, slow)
+    return line, ema(line, signal)
+
+
+class IndicatorEngine:
+    """Indicators for every symbol of a ``BarStore``, computed once and served as slices.
+
+    RSI and MACD are computed on first use; each SMA window is computed for the
+    whole universe the first time any symbol asks for it, from a shared prefix
+    sum of the close matrix. The default windows are kept for good, other
+    windows in an LRU of ``ma_cache_size`` per interval. Resampled intervals
+    (see ``resample``) get their own state, built from the aggregated bars of
+    every symbol and cached the same way. A symbol whose bars changed
+    (``invalidate(symbol)``) is served from a one-column state of its own, so
+    the other columns are not recomputed.
+    """
+
+    def __init__(self, store, rsi_window=14, macd_params=(12, 26, 9), ma_windows=(20, 30), ma_cache_size=8):
+        self.store = store
+        self.rsi_window = rsi_window
+        self.macd_params = macd_params
+        self.default_windows = tuple(ma_windows)
+        self.ma_cache_size = ma_cache_size
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def invalidate(self, symbol=None):
+        """Drop every state, or only the indicators of ``symbol``."""
+        with self._lock:
+            if symbol is None:
+                self._states = {}
+                return
+            symbol = normalize_symbol(symbol)
+            for state in self._states.values():
+                # bumped so a rebuild racing with this call is not kept
+                state["stale"][symbol] = state["stale"].get(symbol, 0) + 1
+                state["own"].pop(symbol, None)
+
+    def _build(self, interval, symbols=None):
+        symbols = self.store.symbols() if symbols is None else symbols
+        bars = [resample(self.store.get(s), interval) for s in symbols]
+        closes, pads = close_matrix(bars)
+        macd_line, signal_line = macd(closes, *self.macd_params)
+        state = {
+            "columns": {s: j for j, s in enumerate(symbols)},
+            "bars": bars,
+            "pads": pads,
+            "T": closes.shape[0],
+            "csum": prefix_sums(closes),
+            "rsi": rsi(closes, self.rsi_window, pads),
+            "macd": macd_line,
+            "signal": signal_line,
+            "ma": {},
+            "extra_ma": OrderedDict(),
+            "calendars": {},
+            "stale": {},
+            "own": {},
+        }
+        for w in self.default_windows:
+            state["ma"][w] = sma_from_prefix(state["csum"], pads, w)
+        return state
+
+    def _get_state(self, interval=DAILY):
+        state = self._states.get(interval)
+        if state is None:
+            with self._lock:
+                state = self._states.get(interval)
+                if state is None:
+                    state = self._states[interval] = self._build(interval)
+        return state
+
+    def _ma(self, state, window):
+        ma = state["ma"].get(window)
+        if ma is not None:
+            return ma
+        extra = state["extra_ma"]
+        with self._lock:
+            ma = extra.get(window)
+            if ma is not None:
+                extra.move_to_end(window)
+                return ma
+        ma = sma_from_prefix(state["csum"], state["pads"], window)
+        with self._lock:
+            extra[window] = ma
+            extra.move_to_end(window)
+            while len(extra) > self.ma_cache_size:
+                extra.popitem(last=False)
+        return ma
+
+    def _state_of(self, symbol, interval):
+        """``(state, column)`` holding ``symbol`` at ``interval``; the column is ``None`` if unknown."""
+        state = self._get_state(interval)
+        symbol = normalize_symbol(symbol)
+        generation = state["stale"].get(symbol)
+        if generation is not None:
+            own = state["own"].get(symbol)
+            if own is None:
+                if self.store.get(symbol) is None:
+                    return state, None
+                own = self._build(interval, [symbol])
+                with self._lock:
+                    if state["stale"].get(symbol) == generation:
+                        state["own"][symbol] = own
+            state = own
+        return state, state["columns"].get(symbol)
+
+    def warm(self, interval=DAILY):
+        self._get_state(parse_interval(interval))
+
+    def calendar(self, symbol, interval=DAILY):
+        """``CalendarIndex`` over the (possibly resampled) bars of ``symbol``."""
+        interval = parse_interval(interval)
+        if interval == DAILY:
+            return self.store.calendar(symbol)
+        state, j = self._state_of(symbol, interval)
+        if j is None:
+            return None
+        index = state["calendars"].get(j)
+        if index is None:
+            index = state["calendars"][j] = CalendarIndex(state["bars"][j].dates)
+        return index
+
+    def lookup(self, symbol, period="max", ma_windows=None, rows=None, interval=DAILY):
+        """Bars and indicators of ``symbol`` for a yfinance style ``period``.
+
+        With ``rows`` (indices into the symbol's full history at ``interval``)
+        those bars are picked instead of a trailing period; indicators are still
+        the ones computed over the whole series. Returns ``None`` if the symbol
+        is not in the store.
+        """
+        state, j = self._state_of(symbol, parse_interval(interval))
+        if j is None:
+            return None
+        bars = state["bars"][j]
+        pad = int(state["pads"][j])
+        windows = self.default_windows if ma_windows is None else ma_windows
+        if rows is None:
+            first = period_start(bars.dates, period)
+            bars = bars.slice(first)
+            rows = slice(pad + first, state["T"])
+        else:
+            bars = bars.take(rows)
+            rows = np.asarray(rows) + pad
+        return {
+            "bars": bars,
+            "rsi": state["rsi"][rows, j],
+            "macd": state["macd"][rows, j],
+            "signal": state["signal"][rows, j],
+            "ma": {w: self._ma(state, w)[rows, j] for w in windows},
+        }
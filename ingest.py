@@ -0,0 +1,380 @@
+"""Live bar ingestion: feeder -> bounded queue -> append-only store -> listeners.
+
+A feeder is an async iterator of ``BarUpdate``. ``ReplayFeeder`` stands in for
+a live source by replaying the ``Data/`` bars from a start date onwards, one
+trading day at a time. ``Ingestor`` moves updates through a bounded
+``asyncio.Queue`` (a slow consumer back-pressures the feeder instead of
+buffering without limit) into an ``AppendStore``.
+
+``AppendStore`` serves the history of a ``BarStore`` plus everything appended
+since. Columns live in buffers with spare capacity, so an append writes one
+row and never rewrites earlier ones; ``get`` returns views of the filled
+prefix, which later appends do not touch. With ``journal_dir`` every appended
+bar is also written to ``<journal_dir>/<SYMBOL>.bars`` (fixed-size records,
+opened for append) and replayed on the next start.
+
+Each accepted append is passed to the store's listeners in turn; one that
+raises is logged and counted in the ingest errors, and the rest still run.
+``LiveIndicators`` is
+one: it keeps RSI, MACD and MA columns per symbol and extends them with the
+O(1) ``streaming`` indicators instead of recomputing the series.
+
+    TRADEX_INGEST=replay TRADEX_REPLAY_START=2025-06-01 TRADEX_REPLAY_SPEED=2 python app.py
+"""
+import asyncio
+import logging
+import os
+import threading
+from collections import namedtuple
+
+import numpy as np
+
+from barstore import Bars, CalendarIndex, normalize_symbol, period_start
+from indicators import macd, rsi, sma
+from streaming import IndicatorSet
+
+BarUpdate = namedtuple("BarUpdate", "symbol date open high low close volume")
+
+JOURNAL_DTYPE = np.dtype([
+    ("date", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"), ("volume", "<i8"),
+])
+_FIELDS = ("open", "high", "low", "close", "volume")
+
+log = logging.getLogger(__name__)
+
+
+class Feeder:
+    """Source of ``BarUpdate``s; ``bars()`` is an async iterator that ends when the source does."""
+
+    def bars(self):
+        raise NotImplementedError
+
+
+class ReplayFeeder(Feeder):
+    """Replays the bars of ``store`` dated ``start`` or later, oldest day first.
+
+    ``speed`` is in trading days per second; 0 replays as fast as the queue
+    takes them. Without ``start`` the last ``days`` trading days are replayed.
+    """
+
+    def __init__(self, store, symbols=None, start=None, speed=1.0, days=60):
+        self.store = store
+        self.symbols = [normalize_symbol(s) for s in symbols] if symbols else store.symbols()
+        self.speed = speed
+        if start is None:
+            calendar = np.unique(np.concatenate([store.get(s).dates for s in self.symbols] or [[]]))
+            start = calendar[-days] if len(calendar) >= days else (calendar[0] if len(calendar) else None)
+        self.start = np.datetime64(start, "D") if start is not None else None
+
+    def updates(self):
+        """All updates to replay, sorted by date then symbol."""
+        updates = []
+        for symbol in self.symbols:
+            bars = self.store.get(symbol)
+            first = int(np.searchsorted(bars.dates, self.start)) if self.start is not None else len(bars)
+            for i in range(first, len(bars)):
+                updates.append(BarUpdate(symbol, bars.dates[i], float(bars.open[i]), float(bars.high[i]),
+                                         float(bars.low[i]), float(bars.close[i]), int(bars.volume[i])))
+        updates.sort(key=lambda u: (u.date, u.symbol))
+        return updates
+
+    async def bars(self):
+        day = None
+        for update in self.updates():
+            if day is not None and update.date != day and self.speed > 0:
+                await asyncio.sleep(1.0 / self.speed)
+            day = update.date
+            yield update
+
+
+class _Columns:
+    """Growable OHLCV buffers of one symbol; rows ``[:count]`` are filled and never rewritten."""
+
+    __slots__ = ("dates", "open", "high", "low", "close", "volume", "count")
+
+    def __init__(self, bars, capacity=None):
+        n = len(bars) if bars is not None else 0
+        capacity = max(capacity or 0, 2 * n, 64)
+        self.count = n
+        self.dates = np.empty(capacity, dtype="datetime64[D]")
+        self.open, self.high, self.low, self.close = (np.empty(capacity) for _ in range(4))
+        self.volume = np.empty(capacity, dtype=np.int64)
+        if n:
+            for name in ("dates",) + _FIELDS:
+                getattr(self, name)[:n] = getattr(bars, name)
+
+    def append(self, update):
+        if self.count == len(self.dates):
+            # new buffers; views handed out earlier keep the old ones alive unchanged
+            for name in ("dates",) + _FIELDS:
+                old = getattr(self, name)
+                new = np.empty(2 * len(old), dtype=old.dtype)
+                new[:self.count] = old[:self.count]
+                setattr(self, name, new)
+        i = self.count
+        self.dates[i] = update.date
+        self.open[i], self.high[i], self.low[i] = update.open, update.high, update.low
+        self.close[i], self.volume[i] = update.close, update.volume
+        self.count = i + 1
+
+    def bars(self, symbol):
+        n = self.count
+        return Bars(symbol, self.dates[:n], self.open[:n], self.high[:n], self.low[:n],
+                    self.close[:n], self.volume[:n])
+
+
+class AppendStore:
+    """``BarStore`` interface over a base store plus appended bars (see module docstring).
+
+    Base history dated ``until`` or later is left out, so a replay starting
+    there does not duplicate it.
+    """
+
+    def __init__(self, base, until=None, journal_dir=None):
+        self.base = base
+        self.until = np.datetime64(until, "D") if until is not None else None
+        self.journal_dir = journal_dir
+        self.listeners = []
+        self.listener_errors = 0
+        self._lock = threading.Lock()
+        self._columns = {}
+        self._calendars = {}
+        if journal_dir:
+            os.makedirs(journal_dir, exist_ok=True)
+
+    def _journal_path(self, symbol):
+        return os.path.join(self.journal_dir, f"{symbol}.bars")
+
+    def _columns_of(self, symbol):
+        columns = self._columns.get(symbol)
+        if columns is None:
+            bars = self.base.get(symbol) if symbol in self.base else None
+            if bars is not None and self.until is not None:
+                bars = bars.slice(0, int(np.searchsorted(bars.dates, self.until)))
+            columns = _Columns(bars)
+            if self.journal_dir and os.path.exists(self._journal_path(symbol)):
+                for rec in np.fromfile(self._journal_path(symbol), dtype=JOURNAL_DTYPE):
+                    date = np.datetime64(int(rec["date"]), "D")
+                    if columns.count == 0 or date > columns.dates[columns.count - 1]:
+                        columns.append(BarUpdate(symbol, date, *(rec[f].item() for f in _FIELDS)))
+            self._columns[symbol] = columns
+        return columns
+
+    def symbols(self):
+        return sorted(set(self.base.symbols()) | set(self._columns))
+
+    def get(self, symbol):
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            if symbol not in self._columns and symbol not in self.base:
+                return None
+            return self._columns_of(symbol).bars(symbol)
+
+    def __contains__(self, symbol):
+        symbol = normalize_symbol(symbol)
+        return symbol in self._columns or symbol in self.base
+
+    def version(self, symbol):
+        """``(bar count, last date)`` of ``symbol``; changes exactly when a bar is appended."""
+        bars = self.get(symbol)
+        if bars is None or len(bars) == 0:
+            return 0, None
+        return len(bars), str(bars.dates[-1])
+
+    def calendar(self, symbol):
+        bars = self.get(symbol)
+        if bars is None:
+            return None
+        cached = self._calendars.get(bars.symbol)
+        if cached is None or cached[0] != len(bars):
+            cached = self._calendars[bars.symbol] = (len(bars), CalendarIndex(bars.dates))
+        return cached[1]
+
+    def append(self, update):
+        """Append one bar; ``False`` (and nothing stored) unless it is newer than the symbol's last bar."""
+        symbol = normalize_symbol(update.symbol)
+        update = update._replace(symbol=symbol, date=np.datetime64(update.date, "D"))
+        with self._lock:
+            columns = self._columns_of(symbol)
+            if columns.count and update.date <= columns.dates[columns.count - 1]:
+                return False
+            columns.append(update)
+            if self.journal_dir:
+                rec = np.array([(update.date.astype(np.int64), update.open, update.high, update.low,
+                                 update.close, update.volume)], dtype=JOURNAL_DTYPE)
+                with open(self._journal_path(symbol), "ab") as f:
+                    f.write(rec.tobytes())
+        for listener in self.listeners:
+            # a failing listener must not keep the ones after it (cache invalidations) from running
+            try:
+                listener(update)
+            except Exception:
+                self.listener_errors += 1
+                log.exception("listener %r failed on %s %s", listener, symbol, update.date)
+        return True
+
+
+class _LiveSeries:
+    __slots__ = ("indicators", "columns", "count", "last_date")
+
+    def __init__(self, indicators, columns, count, last_date):
+        self.indicators = indicators
+        self.columns = columns
+        self.count = count
+        self.last_date = last_date
+
+
+class LiveIndicators:
+    """Indicator columns per symbol of an ``AppendStore``, extended in O(1) per appended bar.
+
+    A symbol's columns are computed with the vectorized ``indicators`` functions
+    the first time it is asked for (or gets a bar); after that ``on_append``
+    only steps its ``IndicatorSet`` and writes one row. ``lookup`` returns the
+    same shape as ``IndicatorEngine.lookup``.
+    """
+
+    def __init__(self, store, ma_windows=(20, 30), rsi_window=14, macd_params=(12, 26, 9)):
+        self.store = store
+        self.ma_windows = tuple(ma_windows)
+        self.rsi_window = rsi_window
+        self.macd_params = macd_params
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _build(self, bars):
+        close = np.asarray(bars.close, dtype=np.float64)
+        macd_line, signal_line = macd(close, *self.macd_params)
+        values = {"rsi": rsi(close, self.rsi_window), "macd": macd_line, "signal": signal_line}
+        for w in self.ma_windows:
+            values[f"ma{w}"] = sma(close, w)
+        capacity = max(2 * len(close), 64)
+        columns = {}
+        for name, series in values.items():
+            columns[name] = np.empty(capacity)
+            columns[name][:len(close)] = series
+        indicators = IndicatorSet(self.ma_windows, self.rsi_window, self.macd_params)
+        indicators.extend(close.tolist())
+        return _LiveSeries(indicators, columns, len(close), bars.dates[-1] if len(bars) else None)
+
+    def _series_of(self, symbol, bars):
+        series = self._series.get(symbol)
+        if series is None:
+            series = self._series[symbol] = self._build(bars)
+        return series
+
+    def warm(self):
+        for symbol in self.store.symbols():
+            self.lookup(symbol, "1d")
+
+    def on_append(self, update):
+        bars = self.store.get(update.symbol)
+        with self._lock:
+            series = self._series.get(update.symbol)
+            if series is None:
+                # first sight of the symbol: the build already includes this bar
+                self._series_of(update.symbol, bars)
+                return
+            if series.last_date is not None and update.date <= series.last_date:
+                # already folded in by a lookup that built the series after the store had this bar
+                return
+            values = series.indicators.update(update.close)
+            i = series.count
+            if i == len(series.columns["rsi"]):
+                for name, column in series.columns.items():
+                    grown = np.empty(2 * len(column))
+                    grown[:i] = column[:i]
+                    series.columns[name] = grown
+            for name, column in series.columns.items():
+                column[i] = values[name]
+            series.count = i + 1
+            series.last_date = update.date
+
+    def lookup(self, symbol, period="max", ma_windows=None, rows=None):
+        bars = self.store.get(symbol)
+        if bars is None:
+            return None
+        with self._lock:
+            series = self._series_of(bars.symbol, bars)
+            n = series.count
+            columns = {name: column[:n] for name, column in series.columns.items()}
+        # the store may already hold a bar whose listener call has not run yet
+        bars = bars.slice(0, n)
+        if rows is None:
+            rows = slice(period_start(bars.dates, period), n)
+            picked = bars.slice(rows.start)
+        else:
+            picked = bars.take(rows)
+        windows = self.ma_windows if ma_windows is None else ma_windows
+        ma = {}
+        for w in windows:
+            full = columns.get(f"ma{w}")
+            ma[w] = (full if full is not None else sma(np.asarray(bars.close, dtype=np.float64), w))[rows]
+        return {
+            "bars": picked,
+            "rsi": columns["rsi"][rows],
+            "macd": columns["macd"][rows],
+            "signal": columns["signal"][rows],
+            "ma": ma,
+        }
+
+
+class Ingestor:
+    """Runs ``feeder`` into ``store`` through a bounded queue; ``start()`` does so on a daemon thread."""
+
+    def __init__(self, feeder, store, maxsize=1024):
+        self.feeder = feeder
+        self.store = store
+        self.maxsize = maxsize
+        self.received = 0
+        self.appended = 0
+        self.rejected = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.done = threading.Event()
+        self._thread = None
+
+    async def _produce(self, queue):
+        try:
+            async for update in self.feeder.bars():
+                await queue.put(update)
+                self.received += 1
+                self.max_depth = max(self.max_depth, queue.qsize())
+        finally:
+            await queue.put(None)
+
+    async def _consume(self, queue):
+        while True:
+            update = await queue.get()
+            if update is None:
+                return
+            try:
+                if self.store.append(update):
+                    self.appended += 1
+                else:
+                    self.rejected += 1
+            except Exception:
+                self.errors += 1
+
+    async def run(self):
+        queue = asyncio.Queue(self.maxsize)
+        try:
+            await asyncio.gather(self._produce(queue), self._consume(queue))
+        finally:
+            self.done.set()
+
+    def start(self):
+        if self._thread is not None:
+            return self._thread
+        self._thread = threading.Thread(target=asyncio.run, args=(self.run(),), name="ingest", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stats(self):
+        return {
+            "received": self.received,
+            "appended": self.appended,
+            "rejected": self.rejected,
+            "errors": self.errors + getattr(self.store, "listener_errors", 0),
+            "maxQueueDepth": self.max_depth,
+            "done": self.done.is_set(),
+        }
@@ -0,0 +1,180 @@
+"""Monte Carlo robustness check of the MA crossover by stationary block bootstrap.
+
+For a symbol, the daily log returns of its history are resampled into
+synthetic price paths of the same length (Politis-Romano stationary
+bootstrap: blocks of consecutive returns with geometrically distributed
+lengths of mean ``block``, wrapping around at the end), and the crossover is
+run on every path. The result is the distribution of final principal,
+maximum drawdown and number of trades over the paths.
+
+A chunk of paths is one (time x paths) price matrix: the bootstrap indices,
+the averages (one prefix sum for both windows), the positions (``holding_states``) and the
+equity curves are each one array operation over the whole chunk. Equity
+compounds the whole balance while holding (fractional shares, as in
+``walkforward.py``) so no per-bar loop is needed.
+
+Chunks of ``chunk`` paths are spread over a process pool; a worker draws its
+own paths from a seed spawned per chunk, so results do not depend on the
+number of workers and memory stays at a few ``chunk x bars`` matrices per
+worker however many paths are requested.
+
+    python montecarlo.py --paths 10000 --block 20 --symbols INFY TCS
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from backtest import INITIAL_PRINCIPAL, date_window, holding_states
+from barstore import BarStore
+from indicators import prefix_sums, sma_from_prefix
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+def bootstrap_indices(rng, n, length, paths, block):
+    """(length x paths) indices into ``n`` returns drawn by the stationary bootstrap."""
+    new_block = rng.random((length, paths)) < 1.0 / block
+    new_block[0] = True
+    rows = np.arange(length)[:, None]
+    # row where the block covering each row began, and that block's random start
+    began = np.where(new_block, rows, 0)
+    np.maximum.accumulate(began, axis=0, out=began)
+    starts = np.zeros((length, paths), dtype=np.int64)
+    starts[new_block] = rng.integers(0, n, int(new_block.sum()))
+    return (np.take_along_axis(starts, began, axis=0) + rows - began) % n
+
+
+def crossover_paths(close, short, long, principal=INITIAL_PRINCIPAL, log_returns=None):
+    """``(final principal, max drawdown, trades)`` of the crossover on every column of ``close``.
+
+    ``log_returns`` (one row shorter) may be passed when the caller has them.
+    """
+    pads = np.zeros(close.shape[1], dtype=np.int64)
+    csum = prefix_sums(close)
+    holding = holding_states(sma_from_prefix(csum, pads, short), sma_from_prefix(csum, pads, long))
+    if log_returns is None:
+        log_returns = np.diff(np.log(close), axis=0)
+    log_equity = np.zeros(close.shape)
+    np.cumsum(holding[:-1] * log_returns, axis=0, out=log_equity[1:])
+    drawdown = np.maximum.accumulate(log_equity, axis=0) - log_equity
+    entries = holding.copy()
+    entries[1:] &= ~holding[:-1]
+    return principal * np.exp(log_equity[-1]), -np.expm1(-drawdown.max(axis=0)), entries.sum(axis=0)
+
+
+def simulate_chunk(close, short, long, paths, block, seed, principal=INITIAL_PRINCIPAL):
+    """Crossover results on ``paths`` bootstrap paths of ``close``."""
+    rng = np.random.default_rng(seed)
+    log_returns = np.diff(np.log(close))
+    idx = bootstrap_indices(rng, len(log_returns), len(log_returns), paths, block)
+    path_returns = log_returns[idx]
+    prices = np.empty((len(close), paths))
+    prices[0] = close[0]
+    prices[1:] = close[0] * np.exp(np.cumsum(path_returns, axis=0))
+    return crossover_paths(prices, short, long, principal, path_returns)
+
+
+def _chunk_task(task):
+    return simulate_chunk(*task)
+
+
+def distribution(values):
+    values = np.asarray(values, dtype=np.float64)
+    summary = {f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+    summary["mean"] = float(values.mean())
+    summary["std"] = float(values.std())
+    return summary
+
+
+def monte_carlo(store=None, symbols=None, short=20, long=30, paths=10000, block=20, start=None, end=None,
+                principal=INITIAL_PRINCIPAL, chunk=1000, seed=0, workers=None, pool=None):
+    """``{symbol: result}`` with the per-path arrays and the observed (historical) result.
+
+    Each result has ``finalPrincipal``, ``maxDrawdown`` and ``trades`` arrays
+    over the paths and ``observed``, the same three numbers on the real path.
+    ``pool`` is a process pool to reuse; without one a pool of ``workers`` is
+    started per call.
+    """
+    if short < 1 or long < 1 or paths < 1 or block < 1 or chunk < 1:
+        raise ValueError("short, long, paths, block and chunk must be positive")
+    store = store if store is not None else BarStore()
+    closes = {}
+    for symbol in symbols or store.symbols():
+        bars = store.get(symbol)
+        if bars is None:
+            continue
+        lo, hi = date_window(bars.dates, start, end)
+        if hi - lo >= 2:
+            closes[bars.symbol] = np.array(bars.close[lo:hi], dtype=np.float64)
+
+    sizes = [chunk] * (paths // chunk) + ([paths % chunk] if paths % chunk else [])
+    seeds = iter(np.random.SeedSequence(seed).spawn(len(closes) * len(sizes)))
+    tasks = [(close, short, long, size, block, next(seeds), principal)
+             for close in closes.values() for size in sizes]
+    if workers == 1 or len(tasks) == 1:
+        results = [simulate_chunk(*t) for t in tasks]
+    elif pool is not None:
+        results = list(pool.map(_chunk_task, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as own:
+            results = list(own.map(_chunk_task, tasks))
+
+    out = {}
+    for i, (symbol, close) in enumerate(closes.items()):
+        parts = results[i * len(sizes):(i + 1) * len(sizes)]
+        final, max_dd, trades = crossover_paths(close[:, None], short, long, principal)
+        out[symbol] = {
+            "finalPrincipal": np.concatenate([p[0] for p in parts]),
+            "maxDrawdown": np.concatenate([p[1] for p in parts]),
+            "trades": np.concatenate([p[2] for p in parts]),
+            "observed": {"finalPrincipal": float(final[0]), "maxDrawdown": float(max_dd[0]),
+                         "trades": int(trades[0])},
+        }
+    return out
+
+
+def summarize(result, principal=INITIAL_PRINCIPAL):
+    """Percentiles, mean and spread of each distribution, plus the share of losing paths."""
+    return {
+        "paths": len(result["finalPrincipal"]),
+        "finalPrincipal": distribution(result["finalPrincipal"]),
+        "maxDrawdown": distribution(result["maxDrawdown"]),
+        "trades": distribution(result["trades"]),
+        "lossProbability": float((result["finalPrincipal"] < principal).mean()),
+        "observed": result["observed"],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bootstrap the MA crossover over Data/ symbols.")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--short", type=int, default=20)
+    parser.add_argument("--long", type=int, default=30)
+    parser.add_argument("--paths", type=int, default=10000)
+    parser.add_argument("--block", type=float, default=20, help="mean block length in bars")
+    parser.add_argument("--chunk", type=int, default=1000, help="paths per array operation / task")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    results = monte_carlo(symbols=args.symbols, short=args.short, long=args.long, paths=args.paths,
+                          block=args.block, start=args.start, end=args.end, chunk=args.chunk,
+                          seed=args.seed, workers=args.workers)
+    print(f"{'symbol':<12}{'observed':>12}{'p5':>12}{'p50':>12}{'p95':>12}{'P(loss)':>9}{'maxDD p50':>11}"
+          f"{'trades p50':>11}")
+    for symbol, result in results.items():
+        s = summarize(result)
+        f = s["finalPrincipal"]
+        print(f"{symbol:<12}{s['observed']['finalPrincipal']:>12.0f}{f['p5']:>12.0f}{f['p50']:>12.0f}"
+              f"{f['p95']:>12.0f}{s['lossProbability']:>9.1%}{s['maxDrawdown']['p50']:>11.1%}"
+              f"{s['trades']['p50']:>11.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
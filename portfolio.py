@@ -0,0 +1,187 @@
+"""MA crossover backtest of a whole basket at once.
+
+Closes and moving averages of every symbol are laid out as (time x symbol)
+matrices on the union of the trading calendars, forward filled over a
+symbol's holidays. Averages come from each symbol's full history, so there is
+no warm-up gap at the start of the window. The signal matrix is
+``holding_states`` of the two averages, forced flat on the last bar so every
+position is liquidated like in ``backtest.py``.
+
+Two allocations:
+
+* ``equal``: the principal is split into one sleeve per symbol and every
+  sleeve trades its own symbol with all of its cash (``runSimulation`` per
+  symbol, on 1/N of the capital).
+* ``capped``: one cash pool; an entry gets at most ``max_weight`` of current
+  equity, and symbols entering on the same day share the remaining cash.
+
+Integer share counts make each entry depend on the cash left by earlier
+trades, so the account is stepped through the days with at least one entry
+or exit, one row of the matrix (all symbols) per step. Share and cash paths,
+the equity curve, turnover and per-symbol P&L are then filled in with array
+operations.
+
+    python portfolio.py --start 2024-01-01 --allocation capped --max-weight 0.05
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from backtest import INITIAL_PRINCIPAL, date_window, holding_states
+from barstore import BarStore
+from indicators import close_matrix, sma
+
+ALLOCATIONS = ("equal", "capped")
+
+
+def forward_fill(values):
+    """Carry the last non-NaN value of each column down; leading NaNs stay."""
+    rows = np.arange(values.shape[0]).reshape((-1,) + (1,) * (values.ndim - 1))
+    idx = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    return np.take_along_axis(values, idx, axis=0)
+
+
+def calendar_matrices(bars_list, short, long):
+    """``(dates, close, ma_short, ma_long)`` on the union calendar, forward filled per symbol."""
+    if not bars_list:
+        empty = np.zeros((0, 0))
+        return np.zeros(0, dtype="datetime64[D]"), empty, empty, empty
+    closes, pads = close_matrix(bars_list)
+    series = (closes, sma(closes, short, pads), sma(closes, long, pads))
+    calendar = np.unique(np.concatenate([b.dates for b in bars_list]))
+    out = [np.full((len(calendar), len(bars_list)), np.nan) for _ in series]
+    for j, bars in enumerate(bars_list):
+        rows = np.searchsorted(calendar, bars.dates)
+        for dst, src in zip(out, series):
+            dst[rows, j] = src[pads[j]:, j]
+    return (calendar,) + tuple(forward_fill(m) for m in out)
+
+
+def _fill_events(events, values, length, initial):
+    """Rows ``events`` take ``values[k]``; rows between keep the previous one, rows before take ``initial``."""
+    idx = np.full(length, -1, dtype=np.int64)
+    idx[events] = np.arange(len(events))
+    np.maximum.accumulate(idx, out=idx)
+    filled = values[np.maximum(idx, 0)]
+    before = idx < 0
+    filled[before] = initial
+    return filled
+
+
+def simulate(close, holding, principal=INITIAL_PRINCIPAL, allocation="equal", max_weight=0.1):
+    """``(shares, cash)`` paths for the boolean ``holding`` matrix, trading at ``close``.
+
+    Exits of a day are settled before its entries so their cash can be reused
+    the same day. ``cash`` is the total over all sleeves.
+    """
+    if allocation not in ALLOCATIONS:
+        raise ValueError(f"allocation must be one of {', '.join(ALLOCATIONS)}")
+    if not principal > 0 or not 0 < max_weight <= 1:
+        raise ValueError("principal must be positive and max_weight in (0, 1]")
+    T, N = close.shape
+    if N == 0:
+        raise ValueError("no symbols to trade")
+    step = np.diff(holding.astype(np.int8), axis=0, prepend=np.zeros((1, N), dtype=np.int8))
+    events = np.flatnonzero(step.any(axis=1))
+    prices = np.nan_to_num(close)
+
+    shares = np.zeros(N)
+    cash = np.full(N, principal / N) if allocation == "equal" else np.array(float(principal))
+    shares_at = np.zeros((len(events), N))
+    cash_at = np.zeros(len(events))
+    for k, t in enumerate(events):
+        price, row = prices[t], step[t]
+        leave = row < 0
+        if allocation == "equal":
+            cash[leave] += shares[leave] * price[leave]
+            shares[leave] = 0.0
+            enter = row > 0
+            shares[enter] = np.floor(cash[enter] / price[enter])
+            cash[enter] -= shares[enter] * price[enter]
+        else:
+            cash += shares[leave] @ price[leave]
+            shares[leave] = 0.0
+            enter = np.flatnonzero(row > 0)
+            if len(enter):
+                equity = cash + shares @ price
+                budget = min(max_weight * equity, cash / len(enter))
+                shares[enter] = np.floor(budget / price[enter])
+                cash -= shares[enter] @ price[enter]
+        shares_at[k] = shares
+        cash_at[k] = cash.sum()
+
+    return _fill_events(events, shares_at, T, 0.0), _fill_events(events, cash_at, T, float(principal))
+
+
+def portfolio_backtest(store=None, symbols=None, start=None, end=None, short=20, long=30,
+                       principal=INITIAL_PRINCIPAL, allocation="equal", max_weight=0.1):
+    """Equity curve, turnover and per-symbol P&L of the crossover strategy over a basket.
+
+    Returns arrays: ``dates``, ``equity``, ``cash``, ``traded`` (value traded
+    per day), per symbol ``pnl`` and ``trades`` (entries), plus ``symbols``,
+    ``finalEquity``, ``turnover`` (traded value over mean equity) and
+    ``maxDrawdown``. ``KeyError`` if none of ``symbols`` has bars.
+    """
+    store = store if store is not None else BarStore()
+    bars_list = [b for b in (store.get(s) for s in (symbols or store.symbols())) if b is not None and len(b)]
+    if not bars_list:
+        raise KeyError("no symbol with data")
+    dates, close, ma_short, ma_long = calendar_matrices(bars_list, short, long)
+    lo, hi = date_window(dates, start, end)
+    dates, close, ma_short, ma_long = dates[lo:hi], close[lo:hi], ma_short[lo:hi], ma_long[lo:hi]
+    T, N = close.shape
+
+    holding = holding_states(ma_short, ma_long)
+    if T:
+        holding[-1] = False
+    shares, cash = simulate(close, holding, principal, allocation, max_weight)
+
+    prices = np.nan_to_num(close)
+    equity = cash + (shares * prices).sum(axis=1)
+    bought = np.diff(shares, axis=0, prepend=np.zeros((1, N)))
+    flows = bought * prices
+    traded = np.abs(flows).sum(axis=1)
+    pnl = (shares[-1] * prices[-1] if T else 0.0) - flows.sum(axis=0)
+    peak = np.maximum.accumulate(equity) if T else equity
+    return {
+        "symbols": [b.symbol for b in bars_list],
+        "dates": dates,
+        "equity": equity,
+        "cash": cash,
+        "traded": traded,
+        "pnl": pnl,
+        "trades": (bought > 0).sum(axis=0),
+        "finalEquity": float(equity[-1]) if T else float(principal),
+        "turnover": float(traded.sum() / equity.mean()) if T else 0.0,
+        "maxDrawdown": float(((peak - equity) / peak).max()) if T else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest the MA crossover over the Data/ basket.")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--short", type=int, default=20)
+    parser.add_argument("--long", type=int, default=30)
+    parser.add_argument("--principal", type=float, default=INITIAL_PRINCIPAL)
+    parser.add_argument("--allocation", choices=ALLOCATIONS, default="equal")
+    parser.add_argument("--max-weight", type=float, default=0.1, help="cap per position, capped allocation")
+    args = parser.parse_args(argv)
+
+    result = portfolio_backtest(symbols=args.symbols, start=args.start, end=args.end, short=args.short,
+                                long=args.long, principal=args.principal, allocation=args.allocation,
+                                max_weight=args.max_weight)
+    print(f"final equity  {result['finalEquity']:,.2f}")
+    print(f"turnover      {result['turnover']:.2f}x")
+    print(f"max drawdown  {result['maxDrawdown']:.2%}")
+    print(f"\n{'symbol':<12}{'pnl':>14}{'trades':>8}")
+    for k in np.argsort(-result["pnl"]):
+        print(f"{result['symbols'][k]:<12}{result['pnl'][k]:>14.2f}{result['trades'][k]:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,180 @@
+import os
+import time
+
+from barstore import BarStore
+from upstream import UpstreamClient, UpstreamError
+
+
+class MarketDataProvider:
+    """Source of bars and fundamentals for the API.
+
+    ``history`` returns a DataFrame shaped like ``yf.Ticker.history`` (Open, High,
+    Low, Close, Volume on a DatetimeIndex) and is empty when nothing was found.
+    Providers backed by the local ``BarStore`` expose it as ``store``, network
+    ones their ``UpstreamClient`` as ``client``. Failures a provider recovers
+    from itself are passed to the ``report_errors`` callback as ``(call, exc)``.
+    """
+
+    name = "base"
+    store = None
+    client = None
+    on_error = None
+
+    def history(self, symbol, period):
+        raise NotImplementedError
+
+    def info(self, symbol):
+        return {}
+
+    def report_errors(self, callback):
+        """Call ``callback(call, exc)`` for every failure this provider swallows."""
+        self.on_error = callback
+
+    def failed(self, call, exc):
+        if self.on_error is not None:
+            self.on_error(call, exc)
+
+
+def _empty_frame():
+    import pandas as pd
+
+    return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+
+class LocalProvider(MarketDataProvider):
+    """Serves bars from the columnar store built from ``Data/*.csv``."""
+
+    name = "local"
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else BarStore()
+
+    def bars(self, symbol, period="max"):
+        bars = self.store.get(symbol)
+        if bars is None:
+            return None
+        return bars.period(period)
+
+    def history(self, symbol, period):
+        bars = self.bars(symbol, period)
+        if bars is None or len(bars) == 0:
+            return _empty_frame()
+        return bars.to_frame()
+
+
+class YFinanceProvider(MarketDataProvider):
+    """Network provider backed by Yahoo Finance, every call through one ``UpstreamClient``.
+
+    Bars come from the chart endpoint on the client's pooled session; ``info``
+    uses yfinance, which is only imported when used. When the client gives up
+    (circuit open, rate limit queue full, retries exhausted) ``history`` is
+    answered by ``fallback`` if there is one and ``info`` is empty.
+    """
+
+    name = "yfinance"
+
+    def __init__(self, client=None, fallback=None):
+        self.client = client if client is not None else UpstreamClient.from_env()
+        self.fallback = fallback
+
+    def report_errors(self, callback):
+        super().report_errors(callback)
+        if self.fallback is not None:
+            self.fallback.report_errors(callback)
+
+    def history(self, symbol, period):
+        try:
+            return self.client.chart(symbol, period)
+        except UpstreamError as exc:
+            if self.fallback is None:
+                raise
+            self.failed("history", exc)
+            return self.fallback.history(symbol, period)
+
+    def info(self, symbol):
+        def fetch():
+            import yfinance as yf
+
+            return yf.Ticker(symbol).info or {}
+
+        try:
+            return self.client.call(("info", symbol), fetch)
+        except UpstreamError as exc:
+            self.failed("info", exc)
+            return {}
+
+
+class FallbackProvider(MarketDataProvider):
+    """Asks each provider in turn and returns the first non-empty answer."""
+
+    name = "fallback"
+
+    def __init__(self, *providers):
+        self.providers = providers
+        self.store = next((p.store for p in providers if p.store is not None), None)
+        self.client = next((p.client for p in providers if p.client is not None), None)
+
+    def report_errors(self, callback):
+        super().report_errors(callback)
+        for provider in self.providers:
+            provider.report_errors(callback)
+
+    def history(self, symbol, period):
+        df = None
+        for provider in self.providers:
+            try:
+                df = provider.history(symbol, period)
+            except Exception as exc:
+                self.failed("history", exc)
+                continue
+            if df is not None and not df.empty:
+                return df
+        return df if df is not None else _empty_frame()
+
+    def info(self, symbol):
+        for provider in self.providers:
+            try:
+                info = provider.info(symbol)
+            except Exception as exc:
+                self.failed("info", exc)
+                continue
+            if info:
+                return info
+        return {}
+
+
+class FakeProvider(LocalProvider):
+    """Local bars behind an artificial delay, standing in for a slow upstream in tests."""
+
+    name = "fake"
+
+    def __init__(self, store=None, latency=0.2, info=None):
+        super().__init__(store)
+        self.latency = latency
+        self.canned_info = info if info is not None else {"longName": "Fake Ltd", "sector": "Testing"}
+        self.calls = 0
+
+    def history(self, symbol, period):
+        self.calls += 1
+        time.sleep(self.latency)
+        return super().history(symbol, period)
+
+    def info(self, symbol):
+        self.calls += 1
+        time.sleep(self.latency)
+        return dict(self.canned_info)
+
+
+def get_provider(name=None):
+    """Provider selected by ``name`` or the ``TRADEX_PROVIDER`` env var.
+
+    ``local`` uses ``Data/`` only and ``yfinance`` the network, falling back to
+    ``Data/`` only while upstream is failing; anything else (the default) serves
+    from ``Data/`` and falls back to yfinance for unknown symbols and fundamentals.
+    """
+    name = (name or os.environ.get("TRADEX_PROVIDER", "auto")).lower()
+    if name == "local":
+        return LocalProvider()
+    if name == "yfinance":
+        return YFinanceProvider(fallback=LocalProvider())
+    return FallbackProvider(LocalProvider(), YFinanceProvider())
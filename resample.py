@@ -0,0 +1,66 @@
+"""OHLCV resampling to weekly, monthly or N-calendar-day intervals.
+
+Bucket boundaries are found once from the date column and every field is
+aggregated with one ``reduceat``: first open, max high, min low, last close,
+summed volume. Each bucket is labelled with the date of its first bar.
+Buckets are calendar ranges (Monday weeks, months, ``N`` day spans counted
+from 1970-01-01), so they hold however many bars traded in them and do not
+move with where a symbol's history starts.
+"""
+import re
+
+import numpy as np
+
+from barstore import Bars
+
+DAILY = "1d"
+_N_DAYS = re.compile(r"^(\d+)d$")
+
+
+def parse_interval(interval):
+    """Canonical interval name: ``"1d"``, ``"1wk"``, ``"1mo"`` or ``"<N>d"``; ValueError otherwise.
+
+    ``"<N>d"`` is ``N`` calendar days, not ``N`` bars. ``"1m"`` is rejected as
+    ambiguous (minute or month); months are ``"1mo"``.
+    """
+    interval = str(interval or DAILY).strip().lower()
+    if interval in ("1w", "1wk"):
+        return "1wk"
+    if interval == "1mo":
+        return "1mo"
+    match = _N_DAYS.match(interval)
+    if match and int(match.group(1)) >= 1:
+        return f"{int(match.group(1))}d"
+    raise ValueError(f"unsupported interval {interval!r}")
+
+
+def bucket_starts(dates, interval):
+    """Index of the first bar of every bucket of a sorted datetime64[D] column."""
+    n = len(dates)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    if interval == "1wk":
+        # 1970-01-01 was a Thursday; shifting by 3 days makes weeks start on Monday
+        keys = (dates.astype(np.int64) + 3) // 7
+    elif interval == "1mo":
+        keys = dates.astype("datetime64[M]").astype(np.int64)
+    else:
+        keys = dates.astype(np.int64) // int(interval[:-1])
+    return np.flatnonzero(np.diff(keys, prepend=keys[0] - 1))
+
+
+def resample(bars, interval):
+    interval = parse_interval(interval)
+    if interval == DAILY or len(bars) == 0:
+        return bars
+    starts = bucket_starts(bars.dates, interval)
+    stops = np.append(starts[1:], len(bars)) - 1
+    return Bars(
+        bars.symbol,
+        bars.dates[starts],
+        bars.open[starts],
+        np.maximum.reduceat(bars.high, starts),
+        np.minimum.reduceat(bars.low, starts),
+        bars.close[stops],
+        np.add.reduceat(bars.volume, starts),
+    )
@@ -0,0 +1,115 @@
+"""Cache of encoded ``/api/data`` responses with ETags and precompressed bodies.
+
+An entry is keyed by the normalized request parameters and stored with the
+data version it was built from (for ``Data/`` symbols the bar count and last
+bar date), so a new bar makes older entries unreachable; ``invalidate_symbol``
+also drops them at once when the ingestor appends to that symbol.
+
+The body is kept as encoded bytes together with its gzip (and, if the
+``brotli`` module is installed, brotli) form, so a hit costs a dictionary
+lookup and no re-encoding or compression. The ETag is a hash of the
+uncompressed body.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def compressions():
+    """Content-codings entries are precompressed with, best first."""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+class CachedResponse:
+    __slots__ = ("version", "body", "content_type", "etag", "encoded")
+
+    def __init__(self, version, body, content_type, compress_min):
+        self.version = version
+        self.body = body
+        self.content_type = content_type
+        self.etag = hashlib.blake2b(body, digest_size=16).hexdigest()
+        self.encoded = {}
+        if len(body) >= compress_min:
+            self.encoded["gzip"] = gzip.compress(body, 6)
+            if brotli is not None:
+                self.encoded["br"] = brotli.compress(body, quality=5)
+
+    def variant(self, coding):
+        """``(body, content coding or None)`` for the coding the client asked for."""
+        if coding in self.encoded:
+            return self.encoded[coding], coding
+        return self.body, None
+
+
+class ResponseCache:
+    def __init__(self, maxsize=512, compress_min=1024):
+        self.maxsize = maxsize
+        self.compress_min = compress_min
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._by_symbol = {}
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+
+    def get(self, key, version):
+        """The entry for ``key`` if it was built from ``version`` of the data, else ``None``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, symbol, version, body, content_type):
+        entry = CachedResponse(version, body, content_type, self.compress_min)
+        if self.maxsize <= 0:
+            return entry
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            self._by_symbol.setdefault(symbol, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, _ = self._entries.popitem(last=False)
+                keys = self._by_symbol.get(old_key[0])
+                if keys is not None:
+                    keys.discard(old_key)
+        return entry
+
+    def count_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def invalidate_symbol(self, symbol):
+        """Drop every entry of ``symbol`` (keys start with the normalized symbol)."""
+        with self._lock:
+            for key in self._by_symbol.pop(symbol, ()):
+                if self._entries.pop(key, None) is not None:
+                    self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_symbol.clear()
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "notModified": self.not_modified,
+                "invalidations": self.invalidations,
+                "hit_ratio": self.hits / total if total else 0.0,
+            }
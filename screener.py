@@ -0,0 +1,250 @@
+"""Cross-sectional screens over the latest indicator values of every symbol.
+
+``LatestTable`` keeps one row per symbol: the newest close, RSI, MACD, signal
+and moving averages, plus the same values one bar earlier so crossovers can be
+tested. Each row is backed by a ``streaming.IndicatorSet``, so appending a bar
+updates that row in O(1) and a screen only touches ``len(symbols)`` values per
+column.
+
+Filters are small Python-like expressions over the column names::
+
+    rsi < 30 and crosses_above(ma20, ma30)
+    close > ma200 * 1.05 or change <= -3
+
+They are parsed with ``ast`` and evaluated as NumPy operations on whole
+columns; only comparisons, arithmetic, ``and``/``or``/``not``, numbers, column
+names and the functions in ``FUNCTIONS`` are accepted.
+"""
+import ast
+import operator
+import threading
+
+import numpy as np
+
+from barstore import normalize_symbol
+from streaming import IndicatorSet
+
+SCREEN_MA_WINDOWS = (20, 30, 50, 200)
+
+_COMPARE = {
+    ast.Lt: operator.lt, ast.LtE: operator.le, ast.Gt: operator.gt,
+    ast.GtE: operator.ge, ast.Eq: operator.eq, ast.NotEq: operator.ne,
+}
+_BINARY = {
+    ast.Add: operator.add, ast.Sub: operator.sub,
+    ast.Mult: operator.mul, ast.Div: operator.truediv,
+}
+
+
+class FilterError(ValueError):
+    pass
+
+
+def _crosses_above(cur_a, cur_b, prev_a, prev_b):
+    return (prev_a <= prev_b) & (cur_a > cur_b)
+
+
+def _crosses_below(cur_a, cur_b, prev_a, prev_b):
+    return (prev_a >= prev_b) & (cur_a < cur_b)
+
+
+# name -> (function, number of arguments, whether it also receives them evaluated one bar earlier)
+FUNCTIONS = {
+    "crosses_above": (_crosses_above, 2, True),
+    "crosses_below": (_crosses_below, 2, True),
+    "abs": (np.abs, 1, False),
+}
+
+
+def compile_filter(expression):
+    """Parse ``expression`` once; ``FilterError`` if it uses anything outside the grammar."""
+    try:
+        tree = ast.parse(str(expression), mode="eval")
+    except SyntaxError as exc:
+        raise FilterError(f"invalid filter: {exc.msg}") from None
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise FilterError("unsupported function call")
+            arity = FUNCTIONS[node.func.id][1]
+            if len(node.args) != arity:
+                raise FilterError(f"{node.func.id}() takes {arity} argument{'s' if arity > 1 else ''}")
+        elif not isinstance(node, (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not,
+                                   ast.USub, ast.Compare, ast.BinOp, ast.Name, ast.Load, ast.Constant,
+                                   *_COMPARE, *_BINARY)):
+            raise FilterError(f"unsupported syntax: {type(node).__name__}")
+        if isinstance(node, ast.Constant):
+            if not isinstance(node.value, (int, float)):
+                raise FilterError("only numeric constants are allowed")
+            try:
+                float(node.value)
+            except OverflowError:
+                raise FilterError("numeric constant out of range") from None
+    return tree
+
+
+def _evaluate(node, cur, prev):
+    if isinstance(node, ast.Expression):
+        return _evaluate(node.body, cur, prev)
+    if isinstance(node, ast.Constant):
+        # NumPy scalars, so 1 / 0 is inf like it would be on a column rather than ZeroDivisionError
+        return np.float64(node.value)
+    if isinstance(node, ast.Name):
+        if node.id not in cur:
+            raise FilterError(f"unknown column {node.id!r}")
+        return cur[node.id]
+    if isinstance(node, ast.BoolOp):
+        combine = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        result = _evaluate(node.values[0], cur, prev)
+        for value in node.values[1:]:
+            result = combine(result, _evaluate(value, cur, prev))
+        return result
+    if isinstance(node, ast.UnaryOp):
+        value = _evaluate(node.operand, cur, prev)
+        return np.logical_not(value) if isinstance(node.op, ast.Not) else -value
+    if isinstance(node, ast.BinOp):
+        return _BINARY[type(node.op)](_evaluate(node.left, cur, prev), _evaluate(node.right, cur, prev))
+    if isinstance(node, ast.Compare):
+        left = _evaluate(node.left, cur, prev)
+        result = True
+        for op, right_node in zip(node.ops, node.comparators):
+            right = _evaluate(right_node, cur, prev)
+            result = np.logical_and(result, _COMPARE[type(op)](left, right))
+            left = right
+        return result
+    fn, _, needs_prev = FUNCTIONS[node.func.id]
+    args = [_evaluate(arg, cur, prev) for arg in node.args]
+    if needs_prev:
+        args += [_evaluate(arg, prev, prev) for arg in node.args]
+    return fn(*args)
+
+
+class LatestTable:
+    """Materialized latest-values table, one row per symbol (see module docstring)."""
+
+    def __init__(self, store, ma_windows=SCREEN_MA_WINDOWS, rsi_window=14, macd_params=(12, 26, 9)):
+        self.store = store
+        self.ma_windows = tuple(ma_windows)
+        self.rsi_window = rsi_window
+        self.macd_params = macd_params
+        self.series = ("close", "rsi", "macd", "signal") + tuple(f"ma{w}" for w in self.ma_windows)
+        self._lock = threading.Lock()
+        self._built = False
+        self._reset()
+
+    def _reset(self):
+        self.symbols = []
+        self._rows = {}
+        self._sets = []
+        self.dates = np.zeros(0, dtype="datetime64[D]")
+        self.volume = np.zeros(0)
+        self.cur = {name: np.zeros(0) for name in self.series}
+        self.prev = {name: np.zeros(0) for name in self.series}
+
+    def _new_set(self):
+        return IndicatorSet(self.ma_windows, self.rsi_window, self.macd_params)
+
+    def _add_row(self, symbol):
+        row = len(self.symbols)
+        self.symbols.append(symbol)
+        self._rows[symbol] = row
+        self._sets.append(self._new_set())
+        self.dates = np.append(self.dates, np.datetime64("NaT", "D"))
+        self.volume = np.append(self.volume, np.nan)
+        for cols in (self.cur, self.prev):
+            for name in self.series:
+                cols[name] = np.append(cols[name], np.nan)
+        return row
+
+    def _write(self, row, values):
+        for name in self.series:
+            self.prev[name][row] = self.cur[name][row]
+            self.cur[name][row] = values[name]
+
+    def build(self):
+        """Replay every symbol's history once; afterwards rows only move through ``append``."""
+        with self._lock:
+            self._reset()
+            symbols = self.store.symbols() if self.store is not None else []
+            n = len(symbols)
+            self.symbols = list(symbols)
+            self._rows = {s: i for i, s in enumerate(symbols)}
+            self._sets = [self._new_set() for _ in symbols]
+            self.dates = np.full(n, np.datetime64("NaT"), dtype="datetime64[D]")
+            self.volume = np.full(n, np.nan)
+            self.cur = {name: np.full(n, np.nan) for name in self.series}
+            self.prev = {name: np.full(n, np.nan) for name in self.series}
+            for row, symbol in enumerate(symbols):
+                bars = self.store.get(symbol)
+                if bars is None or len(bars) == 0:
+                    continue
+                closes = bars.close.tolist()
+                ind = self._sets[row]
+                ind.extend(closes[:-1])
+                self._write(row, ind.snapshot())
+                self._write(row, ind.update(closes[-1]))
+                self.dates[row] = bars.dates[-1]
+                self.volume[row] = bars.volume[-1]
+            self._built = True
+
+    def ensure_built(self):
+        if not self._built:
+            self.build()
+
+    def append(self, symbol, date, close, volume=np.nan):
+        """Fold one new bar into ``symbol``'s row; unknown symbols get a new row."""
+        self.ensure_built()
+        symbol = normalize_symbol(symbol)
+        with self._lock:
+            row = self._rows.get(symbol)
+            if row is None:
+                row = self._add_row(symbol)
+            elif np.datetime64(date, "D") <= self.dates[row]:
+                # already folded in, e.g. by a build that saw the store after this bar
+                return
+            self._write(row, self._sets[row].update(close))
+            self.dates[row] = np.datetime64(date, "D")
+            self.volume[row] = volume
+
+    def columns(self):
+        """Copies of the current and previous columns, plus derived ``change`` (% vs previous close)."""
+        self.ensure_built()
+        with self._lock:
+            cur = {name: values.copy() for name, values in self.cur.items()}
+            prev = {name: values.copy() for name, values in self.prev.items()}
+            symbols = list(self.symbols)
+            dates = self.dates.copy()
+            cur["volume"] = prev["volume"] = self.volume.copy()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cur["change"] = (cur["close"] / prev["close"] - 1.0) * 100.0
+        prev["change"] = np.full(len(symbols), np.nan)
+        return symbols, dates, cur, prev
+
+    def screen(self, expression, symbols=None, sort=None, descending=False, limit=None):
+        """Rows matching ``expression`` as dicts, optionally restricted to ``symbols`` and sorted."""
+        tree = compile_filter(expression)
+        names, dates, cur, prev = self.columns()
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            mask = np.broadcast_to(np.asarray(_evaluate(tree, cur, prev), dtype=bool), (len(names),)).copy()
+        if symbols:
+            wanted = {normalize_symbol(s) for s in symbols}
+            mask &= np.array([s in wanted for s in names], dtype=bool)
+        hits = np.flatnonzero(mask)
+
+        if sort is not None:
+            if sort not in cur:
+                raise FilterError(f"unknown sort column {sort!r}")
+            keys = cur[sort][hits]
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            hits = hits[order]
+        if limit is not None:
+            hits = hits[:limit]
+
+        rows = []
+        for i in hits:
+            row = {"symbol": names[i], "date": str(dates[i])}
+            for name, values in cur.items():
+                value = float(values[i])
+                row[name] = None if np.isnan(value) else round(value, 2)
+            rows.append(row)
+        return rows
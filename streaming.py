@@ -0,0 +1,170 @@
+"""Incremental indicators: feed one close at a time, O(1) work per bar.
+
+Each indicator keeps only the state it needs (``__slots__``), ``update(close)``
+returns the new value and ``snapshot()`` the current one. Values follow
+``calculate_ma``, ``calculate_macd`` and ``calculate_rsi`` in ``app.py``: NaN
+until the window is full, EMAs seeded with the first close (``adjust=False``),
+and the simple-average RSI counting the first bar as a zero change.
+"""
+import math
+
+NAN = float("nan")
+
+
+class SMA:
+    """Rolling mean over a ring buffer with a compensated running sum."""
+
+    __slots__ = ("window", "buf", "pos", "count", "total", "comp")
+
+    def __init__(self, window):
+        self.window = window
+        self.buf = [0.0] * window
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.comp = 0.0
+
+    def _add(self, x):
+        # Kahan summation keeps the add/remove drift far below display precision
+        y = x - self.comp
+        t = self.total + y
+        self.comp = (t - self.total) - y
+        self.total = t
+
+    def update(self, value):
+        if self.count >= self.window:
+            self._add(-self.buf[self.pos])
+        else:
+            self.count += 1
+        self.buf[self.pos] = value
+        self._add(value)
+        self.pos = (self.pos + 1) % self.window
+        return self.snapshot()
+
+    def snapshot(self):
+        if self.count < self.window:
+            return NAN
+        return self.total / self.window
+
+
+class EMA:
+    __slots__ = ("alpha", "value")
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def update(self, value):
+        if math.isnan(self.value):
+            self.value = value
+        else:
+            self.value = (1.0 - self.alpha) * self.value + self.alpha * value
+        return self.value
+
+    def snapshot(self):
+        return self.value
+
+
+class MACD:
+    __slots__ = ("fast", "slow", "signal", "macd")
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.macd = NAN
+
+    def update(self, value):
+        self.macd = self.fast.update(value) - self.slow.update(value)
+        self.signal.update(self.macd)
+        return self.snapshot()
+
+    def snapshot(self):
+        return self.macd, self.signal.value
+
+
+def _rsi(avg_gain, avg_loss):
+    if avg_loss == 0.0:
+        return NAN if avg_gain == 0.0 else 100.0
+    return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+
+class RSI:
+    """Simple-average RSI (``wilder=False``, as ``calculate_rsi``) or Wilder's smoothed RSI."""
+
+    __slots__ = ("window", "wilder", "prev", "gains", "losses", "avg_gain", "avg_loss", "seen")
+
+    def __init__(self, window=14, wilder=False):
+        self.window = window
+        self.wilder = wilder
+        self.prev = NAN
+        self.gains = SMA(window)
+        self.losses = SMA(window)
+        self.avg_gain = NAN
+        self.avg_loss = NAN
+        self.seen = 0
+
+    def update(self, value):
+        first = math.isnan(self.prev)
+        delta = 0.0 if first else value - self.prev
+        self.prev = value
+        gain = delta if delta > 0 else 0.0
+        loss = -delta if delta < 0 else 0.0
+
+        if not self.wilder:
+            self.avg_gain = self.gains.update(gain)
+            self.avg_loss = self.losses.update(loss)
+            return self.snapshot()
+
+        if first:
+            return NAN
+        self.seen += 1
+        if self.seen <= self.window:
+            # seed with the simple average of the first `window` changes
+            self.avg_gain = self.gains.update(gain)
+            self.avg_loss = self.losses.update(loss)
+        else:
+            w = self.window
+            self.avg_gain = (self.avg_gain * (w - 1) + gain) / w
+            self.avg_loss = (self.avg_loss * (w - 1) + loss) / w
+        return self.snapshot()
+
+    def snapshot(self):
+        if math.isnan(self.avg_gain):
+            return NAN
+        return _rsi(self.avg_gain, self.avg_loss)
+
+
+class IndicatorSet:
+    """The indicators served by ``/api/data`` for one symbol, updated together."""
+
+    __slots__ = ("rsi", "macd", "mas", "close", "count")
+
+    def __init__(self, ma_windows=(20, 30), rsi_window=14, macd_params=(12, 26, 9), wilder=False):
+        self.rsi = RSI(rsi_window, wilder)
+        self.macd = MACD(*macd_params)
+        self.mas = {w: SMA(w) for w in ma_windows}
+        self.close = NAN
+        self.count = 0
+
+    def update(self, close):
+        close = float(close)
+        self.close = close
+        self.count += 1
+        self.rsi.update(close)
+        self.macd.update(close)
+        for ma in self.mas.values():
+            ma.update(close)
+        return self.snapshot()
+
+    def extend(self, closes):
+        for close in closes:
+            self.update(close)
+        return self.snapshot()
+
+    def snapshot(self):
+        macd, signal = self.macd.snapshot()
+        values = {"close": self.close, "rsi": self.rsi.snapshot(), "macd": macd, "signal": signal}
+        for w, ma in self.mas.items():
+            values[f"ma{w}"] = ma.snapshot()
+        return values
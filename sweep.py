@@ -0,0 +1,173 @@
+"""Grid sweep of MA crossover windows over every symbol in ``Data/``.
+
+For one symbol the SMA of every window in the grid is built from a single
+prefix sum, the position path of all (short, long) pairs comes out of one
+``holding_states`` call on a (time x pair) matrix, and the account is stepped
+through time once for all pairs together. Symbols are spread over a process
+pool; the close matrix is placed in shared memory so workers attach to it
+instead of receiving pickled copies.
+
+    python sweep.py --short 5:50 --long 10:100 --top 20
+"""
+import argparse
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import INITIAL_PRINCIPAL, date_window, holding_states
+from barstore import BarStore
+from indicators import close_matrix, prefix_sums, sma_from_prefix
+
+
+def window_pairs(shorts, longs):
+    if min(shorts, default=1) < 1 or min(longs, default=1) < 1:
+        raise ValueError("MA windows must be at least 1")
+    shorts = np.asarray(sorted(set(shorts)), dtype=np.int64)
+    longs = np.asarray(sorted(set(longs)), dtype=np.int64)
+    s, l = np.meshgrid(shorts, longs, indexing="ij")
+    keep = s < l
+    return s[keep], l[keep]
+
+
+def sma_table(close, windows):
+    """``{window: sma}`` for each window, all from one prefix sum of ``close``."""
+    csum = prefix_sums(close)
+    return {int(w): sma_from_prefix(csum, 0, int(w)) for w in windows}
+
+
+def evaluate_pairs(close, shorts, longs, principal=INITIAL_PRINCIPAL):
+    """Final principal, round trips and max drawdown of every (short, long) pair on ``close``."""
+    close = np.asarray(close, dtype=np.float64)
+    n, p = len(close), len(shorts)
+    if n == 0 or p == 0:
+        return np.full(p, float(principal)), np.zeros(p, dtype=np.int64), np.zeros(p)
+
+    table = sma_table(close, np.union1d(shorts, longs))
+    ma_short = np.stack([table[int(w)] for w in shorts], axis=1)
+    ma_long = np.stack([table[int(w)] for w in longs], axis=1)
+    holding = holding_states(ma_short, ma_long)
+    step = np.diff(holding.astype(np.int8), axis=0, prepend=np.zeros((1, p), dtype=np.int8))
+
+    cash = np.full(p, float(principal))
+    shares = np.zeros(p)
+    peak = cash.copy()
+    max_dd = np.zeros(p)
+    for t in range(n):
+        price = close[t]
+        row = step[t]
+        if row.any():
+            enter = row > 0
+            shares[enter] = np.floor(cash[enter] / price)
+            cash[enter] -= shares[enter] * price
+            leave = row < 0
+            cash[leave] += shares[leave] * price
+            shares[leave] = 0.0
+        equity = cash + shares * price
+        np.maximum(peak, equity, out=peak)
+        np.maximum(max_dd, (peak - equity) / peak, out=max_dd)
+
+    final = cash + shares * close[-1]
+    trades = (step > 0).sum(axis=0)
+    return final, trades, max_dd
+
+
+def _sweep_symbol(task):
+    shm_name, shape, column, lo, hi, shorts, longs, principal = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        closes = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        close = np.array(closes[lo:hi, column])
+    finally:
+        shm.close()
+    return evaluate_pairs(close, shorts, longs, principal)
+
+
+def sweep(store=None, shorts=range(5, 51), longs=range(10, 101), symbols=None,
+          start=None, end=None, principal=INITIAL_PRINCIPAL, workers=None, pool=None):
+    """Ranked rows (best final principal first) for every symbol and window pair.
+
+    ``pool`` is a process pool to reuse; without one a pool of ``workers`` is started per call.
+    """
+    store = store if store is not None else BarStore()
+    symbols = [s for s in (symbols or store.symbols()) if store.get(s) is not None]
+    bars = [store.get(s) for s in symbols]
+    short_w, long_w = window_pairs(shorts, longs)
+    if not bars or len(short_w) == 0:
+        return []
+
+    closes, pads = close_matrix(bars)
+    tasks = []
+    for j, b in enumerate(bars):
+        lo, hi = date_window(b.dates, start, end)
+        tasks.append([None, closes.shape, j, int(pads[j]) + lo, int(pads[j]) + hi, short_w, long_w, principal])
+
+    if workers == 1 or len(tasks) == 1:
+        results = [evaluate_pairs(closes[t[3]:t[4], t[2]], short_w, long_w, principal) for t in tasks]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+        try:
+            np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)[:] = closes
+            for t in tasks:
+                t[0] = shm.name
+            if pool is not None:
+                results = list(pool.map(_sweep_symbol, tasks))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as own:
+                    results = list(own.map(_sweep_symbol, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    rows = []
+    for b, (final, trades, max_dd) in zip(bars, results):
+        for k in range(len(short_w)):
+            rows.append({
+                "symbol": b.symbol,
+                "short": int(short_w[k]),
+                "long": int(long_w[k]),
+                "finalPrincipal": round(float(final[k]), 2),
+                "trades": int(trades[k]),
+                "maxDrawdown": round(float(max_dd[k]), 4),
+            })
+    rows.sort(key=lambda r: r["finalPrincipal"], reverse=True)
+    return rows
+
+
+def parse_range(text):
+    """``"5:50"`` -> 5..50 inclusive, ``"5:50:5"`` with a step, ``"20"`` -> just 20.
+
+    Bounds and step must be at least 1 (ValueError otherwise).
+    """
+    parts = [int(p) for p in str(text).split(":")]
+    if len(parts) > 3 or min(parts) < 1:
+        raise ValueError(f"invalid window range {text!r}")
+    if len(parts) == 1:
+        return range(parts[0], parts[0] + 1)
+    step = parts[2] if len(parts) > 2 else 1
+    return range(parts[0], parts[1] + 1, step)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep MA crossover windows over Data/.")
+    parser.add_argument("--short", default="5:50", help="start:stop[:step], inclusive")
+    parser.add_argument("--long", default="10:100", help="start:stop[:step], inclusive")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--start")
+    parser.add_argument("--end")
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    rows = sweep(shorts=parse_range(args.short), longs=parse_range(args.long), symbols=args.symbols,
+                 start=args.start, end=args.end, workers=args.workers)
+    print(f"{'symbol':<12}{'short':>6}{'long':>6}{'final':>14}{'trades':>8}{'maxDD':>8}")
+    for r in rows[:args.top]:
+        print(f"{r['symbol']:<12}{r['short']:>6}{r['long']:>6}{r['finalPrincipal']:>14.2f}"
+              f"{r['trades']:>8}{r['maxDrawdown']:>8.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""A listener that raises does not keep the ones after it from seeing the append."""
+import asyncio
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from barstore import BarStore  # noqa: E402
+from ingest import AppendStore, BarUpdate, Ingestor  # noqa: E402
+
+
+class ListFeeder:
+    def __init__(self, updates):
+        self.updates = updates
+
+    async def bars(self):
+        for update in self.updates:
+            yield update
+
+
+def test_failing_listener_is_counted_and_skipped():
+    store = AppendStore(BarStore())
+    last = store.get("INFY").dates[-1]
+    updates = [BarUpdate("INFY", last + np.timedelta64(k, "D"), 1.0, 1.0, 1.0, 1.0, 100) for k in (1, 2)]
+    seen = []
+
+    def broken(update):
+        raise RuntimeError("listener bug")
+
+    store.listeners += [broken, lambda update: seen.append(update.date)]
+    ingestor = Ingestor(ListFeeder(updates), store)
+    asyncio.run(ingestor.run())
+
+    assert seen == [u.date for u in updates]
+    stats = ingestor.stats()
+    assert stats["appended"] == 2
+    assert stats["errors"] == 2
@@ -0,0 +1,47 @@
+"""Upstream failures the providers recover from still show up in the metrics."""
+import os
+import socket
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+from providers import FallbackProvider, LocalProvider, YFinanceProvider  # noqa: E402
+from upstream import UpstreamClient  # noqa: E402
+
+
+def dead_url():
+    """URL of a local port nothing listens on."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return f"http://127.0.0.1:{sock.getsockname()[1]}"
+
+
+def dead_client():
+    return UpstreamClient(dead_url(), retries=0, timeout=1.0)
+
+
+def errors(call):
+    return app_module.upstream_errors._values.get((call,), 0)
+
+
+def test_yfinance_fallback_counts_the_failure(monkeypatch):
+    monkeypatch.setattr(app_module, "get_provider",
+                        lambda: YFinanceProvider(dead_client(), fallback=LocalProvider()))
+    client = app_module.create_app(warm_caches=False, start_background=False).test_client()
+    before = errors("history")
+
+    response = client.get("/api/data?symbol=NOSUCHSYMBOL")
+
+    assert response.status_code == 404
+    assert errors("history") == before + 1
+    assert 'tradex_upstream_errors_total{call="history"}' in client.get("/metrics").get_data(as_text=True)
+
+
+def test_fallback_provider_counts_the_failure():
+    seen = []
+    provider = FallbackProvider(LocalProvider(), YFinanceProvider(dead_client()))
+    provider.report_errors(lambda call, exc: seen.append(call))
+
+    assert provider.history("NOSUCHSYMBOL", "1y").empty
+    assert seen == ["history"]
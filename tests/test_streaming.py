@@ -0,0 +1,71 @@
+"""Property test: the incremental indicators match the pandas ones in ``app.py``."""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import calculate_ma, calculate_macd, calculate_rsi  # noqa: E402
+from streaming import IndicatorSet  # noqa: E402
+
+MA_WINDOWS = (5, 20, 30)
+
+
+def random_walk(rng, n):
+    return 100.0 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+def with_flat_runs(rng, n):
+    close = np.round(random_walk(rng, n), 1)
+    for _ in range(3):
+        start = rng.integers(0, n)
+        close[start:start + rng.integers(1, 40)] = close[start]
+    return close
+
+
+def streamed(close):
+    indicators = IndicatorSet(MA_WINDOWS)
+    rows = [indicators.update(c) for c in close]
+    return {name: np.array([row[name] for row in rows]) for name in rows[0]}
+
+
+def assert_matches(actual, expected):
+    expected = np.asarray(expected, dtype=np.float64)
+    np.testing.assert_array_equal(np.isnan(actual), np.isnan(expected))
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+def check(close):
+    series = pd.Series(close)
+    got = streamed(close)
+    macd, signal = calculate_macd(series)
+    assert_matches(got["rsi"], calculate_rsi(series))
+    assert_matches(got["macd"], macd)
+    assert_matches(got["signal"], signal)
+    for w in MA_WINDOWS:
+        assert_matches(got[f"ma{w}"], calculate_ma(series, w))
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_random_walks(seed):
+    rng = np.random.default_rng(seed)
+    check(random_walk(rng, int(rng.integers(1, 400))))
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_series_with_flat_runs(seed):
+    rng = np.random.default_rng(1000 + seed)
+    check(with_flat_runs(rng, int(rng.integers(50, 400))))
+
+
+@pytest.mark.parametrize("n", [1, 2, 4, 5, 13, 14, 15, 29, 30])
+def test_short_series(n):
+    check(random_walk(np.random.default_rng(n), n))
+
+
+@pytest.mark.parametrize("n", [1, 14, 100])
+def test_flat_series(n):
+    check(np.full(n, 42.0))
@@ -0,0 +1,121 @@
+"""``UpstreamClient`` against the fake chart server from ``benchmarks/load_upstream.py``."""
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from barstore import BarStore  # noqa: E402
+from load_upstream import FakeChartServer  # noqa: E402
+from upstream import (CircuitBreaker, CircuitOpenError, RateLimitedError, TokenBucket,  # noqa: E402
+                      UpstreamClient, UpstreamError)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def server():
+    server = FakeChartServer(BarStore())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def client_for(server, **kwargs):
+    kwargs.setdefault("sleep", lambda seconds: None)
+    return UpstreamClient(server.url, **kwargs)
+
+
+def test_chart_quotes_the_symbol(server):
+    client = client_for(server)
+
+    assert not client.chart("INFY", "1y").empty
+    assert client.chart("A/B?C#D", "1y").empty
+    assert server.requested == ["INFY", "A/B?C#D"]
+
+
+def test_retries_transient_errors(server):
+    server.error_rate = 1.0
+    client = client_for(server, retries=2)
+
+    with pytest.raises(UpstreamError):
+        client.chart("INFY", "1y")
+    assert server.served == 3
+    assert client.stats()["retried"] == 2
+
+    server.error_rate = 0.0
+    assert not client.chart("INFY", "1y").empty
+
+
+def test_breaker_opens_and_recovers(server):
+    clock = Clock()
+    server.error_rate = 1.0
+    client = client_for(server, retries=0, breaker=CircuitBreaker(2, reset_timeout=30, clock=clock))
+
+    for _ in range(2):
+        with pytest.raises(UpstreamError):
+            client.chart("INFY", "1y")
+    with pytest.raises(CircuitOpenError):
+        client.chart("INFY", "1y")
+    assert server.served == 2
+
+    server.error_rate = 0.0
+    clock.now += 30
+    assert not client.chart("INFY", "1y").empty
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_rejects_when_queue_full(server):
+    client = client_for(server, rate=0.001, burst=1, queue_timeout=0)
+
+    assert not client.chart("INFY", "1y").empty
+    with pytest.raises(RateLimitedError):
+        client.chart("TCS", "1y")
+    assert server.served == 1
+    assert client.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_token_bucket_paces_calls():
+    clock = Clock()
+    bucket = TokenBucket(rate=2, burst=2, clock=clock, sleep=clock.sleep)
+
+    for _ in range(6):
+        assert bucket.acquire()
+    assert clock.now == pytest.approx(2.0)
+    assert not bucket.acquire(timeout=0.1)
+
+
+def test_concurrent_calls_coalesce(server):
+    server.latency = 0.3
+    client = client_for(server)
+    start = threading.Barrier(8)
+    frames = []
+
+    def fetch():
+        start.wait()
+        frames.append(client.chart("INFY", "1y"))
+
+    threads = [threading.Thread(target=fetch) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(frames) == 8 and not frames[0].empty
+    assert server.served == 1
+    assert client.stats()["coalesced"] == 7
@@ -0,0 +1,347 @@
+"""Guarded access to the upstream market data API (Yahoo Finance).
+
+``UpstreamClient`` puts every upstream call behind, in order:
+
+* coalescing: concurrent calls with the same key share one execution;
+* a circuit breaker: after ``failure_threshold`` failed calls in a row it
+  fails fast with ``CircuitOpenError`` for ``reset_timeout`` seconds, then lets
+  a single probe through;
+* a token bucket: ``rate`` calls per second with bursts of ``burst``; a call
+  that cannot get a token within ``queue_timeout`` fails instead of piling up;
+* bounded retries of connection errors, timeouts, 429 and 5xx, with full
+  jitter exponential backoff (or the server's ``Retry-After``, capped).
+
+Bars come from the chart endpoint over one keep-alive ``requests`` session
+with a connection pool of ``pool_size`` and a per-request ``timeout``;
+``base_url`` can point at a local fake server (``benchmarks/load_upstream.py``).
+Fundamentals still go through ``yfinance``, which handles Yahoo's cookie and
+crumb, but under the same coalescing, breaker, limiter and retries.
+"""
+import os
+import random
+import sys
+import threading
+import time
+from urllib.parse import quote
+
+DEFAULT_BASE_URL = "https://query2.finance.yahoo.com"
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+
+
+class UpstreamError(Exception):
+    """A failed upstream call; ``retryable`` ones are retried and count against the breaker."""
+
+    def __init__(self, message, status=None, retryable=False, retry_after=None):
+        super().__init__(message)
+        self.status = status
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+
+class RateLimitedError(UpstreamError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate, burst, clock=time.monotonic, sleep=time.sleep):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = self.burst
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=None):
+        """Take a token, waiting up to ``timeout`` seconds (forever if ``None``); False if none came."""
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            with self._lock:
+                now = self.clock()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and now + wait > deadline:
+                return False
+            self.sleep(wait)
+
+
+class CircuitBreaker:
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """Whether a call may go upstream now; while half-open only one probe at a time."""
+        with self._lock:
+            if self.state == self.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def release(self):
+        """End a call that never reached upstream without judging its health."""
+        with self._lock:
+            self._probing = False
+
+    def success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.opened += 1
+                self.state = self.OPEN
+                self._opened_at = self.clock()
+
+
+class _Call:
+    __slots__ = ("done", "value", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class Coalescer:
+    """Single flight: concurrent ``do(key, fn)`` calls with one key run ``fn`` once and share its outcome."""
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+            else:
+                self.coalesced += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = fn()
+            return call.value
+        except Exception as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            call.done.set()
+
+
+class UpstreamClient:
+    def __init__(self, base_url=DEFAULT_BASE_URL, rate=5.0, burst=10, queue_timeout=5.0, retries=2,
+                 backoff=0.25, max_backoff=4.0, timeout=10.0, pool_size=16, breaker=None,
+                 sleep=time.sleep, jitter=random.random):
+        self.base_url = base_url.rstrip("/")
+        self.bucket = TokenBucket(rate, burst)
+        self.queue_timeout = queue_timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.breaker = breaker if breaker is not None else CircuitBreaker()
+        self.coalescer = Coalescer()
+        self.sleep = sleep
+        self.jitter = jitter
+        self.calls = 0
+        self.attempts = 0
+        self.retried = 0
+        self.rejected = 0
+        self.failed = 0
+        self._session = None
+        self._session_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        env = os.environ.get
+        return cls(
+            base_url=env("TRADEX_UPSTREAM_URL", DEFAULT_BASE_URL),
+            rate=float(env("TRADEX_UPSTREAM_RATE", 5)),
+            burst=int(env("TRADEX_UPSTREAM_BURST", 10)),
+            retries=int(env("TRADEX_UPSTREAM_RETRIES", 2)),
+            timeout=float(env("TRADEX_UPSTREAM_TIMEOUT", 10)),
+            pool_size=int(env("TRADEX_UPSTREAM_POOL", 16)),
+            breaker=CircuitBreaker(int(env("TRADEX_UPSTREAM_FAILURES", 5)),
+                                   float(env("TRADEX_UPSTREAM_RESET", 30))),
+        )
+
+    @property
+    def session(self):
+        # requests is imported on first use so a local-only worker never loads it
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.pool_size, max_retries=0)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    session.headers["User-Agent"] = USER_AGENT
+                    self._session = session
+        return self._session
+
+    def call(self, key, fn):
+        """``fn()`` coalesced on ``key`` and guarded by the breaker, the rate limiter and retries."""
+        return self.coalescer.do(key, lambda: self._guarded(fn))
+
+    def _guarded(self, fn):
+        self.calls += 1
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError("upstream circuit open")
+        for attempt in range(self.retries + 1):
+            if not self.bucket.acquire(self.queue_timeout):
+                # our own limit, not upstream trouble: leave the breaker alone
+                self.rejected += 1
+                self.breaker.release()
+                raise RateLimitedError("upstream rate limit queue full")
+            self.attempts += 1
+            try:
+                value = fn()
+            except Exception as exc:
+                error = exc if isinstance(exc, UpstreamError) else self._classify(exc)
+                if error is not exc:
+                    error.__cause__ = exc
+                if not error.retryable:
+                    # the request itself was bad (e.g. unknown symbol); upstream is healthy
+                    self.breaker.success()
+                    raise error
+                if attempt == self.retries:
+                    self.failed += 1
+                    self.breaker.failure()
+                    raise error
+                self.retried += 1
+                self.sleep(self._delay(attempt, error.retry_after))
+            else:
+                self.breaker.success()
+                return value
+
+    def _classify(self, exc):
+        # only transport failures and throttling are worth a retry; anything else (a bad symbol, a
+        # response yfinance cannot parse) would fail again and says nothing about upstream's health
+        return UpstreamError(f"{type(exc).__name__}: {exc}", retryable=transient(exc))
+
+    def _delay(self, attempt, retry_after=None):
+        if retry_after is not None:
+            return min(float(retry_after), self.max_backoff)
+        return self.jitter() * min(self.max_backoff, self.backoff * 2 ** attempt)
+
+    def get_json(self, path, params=None):
+        """GET ``base_url + path`` as JSON; 429 and 5xx are retryable, other 4xx are not."""
+        key = ("GET", path, tuple(sorted((params or {}).items())))
+        return self.call(key, lambda: self._get_json(path, params))
+
+    def _get_json(self, path, params):
+        response = self.session.get(self.base_url + path, params=params, timeout=self.timeout)
+        status = response.status_code
+        if status == 429 or status >= 500:
+            retry_after = response.headers.get("Retry-After")
+            raise UpstreamError(f"upstream HTTP {status}", status=status, retryable=True,
+                                retry_after=float(retry_after) if retry_after and retry_after.isdigit() else None)
+        if status >= 400:
+            raise UpstreamError(f"upstream HTTP {status}", status=status)
+        return response.json()
+
+    def chart(self, symbol, period):
+        """Daily bars of ``symbol`` over ``period`` as a frame like ``yf.Ticker.history`` (auto adjusted)."""
+        try:
+            payload = self.get_json(f"/v8/finance/chart/{quote(symbol, safe='')}",
+                                    {"range": period, "interval": "1d", "events": "div,splits"})
+        except UpstreamError as exc:
+            if exc.status == 404:
+                return chart_frame({})
+            raise
+        return chart_frame(payload)
+
+    def stats(self):
+        return {
+            "calls": self.calls,
+            "attempts": self.attempts,
+            "retried": self.retried,
+            "coalesced": self.coalescer.coalesced,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "circuit": self.breaker.state,
+            "circuitOpened": self.breaker.opened,
+        }
+
+
+def transient(exc):
+    """Whether ``exc`` is a connection error, a timeout or upstream throttling."""
+    if isinstance(exc, (ConnectionError, TimeoutError)):
+        return True
+    # the libraries are only consulted if something already imported them
+    requests = sys.modules.get("requests")
+    if requests is not None and isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    yf_errors = sys.modules.get("yfinance.exceptions")
+    return yf_errors is not None and isinstance(exc, getattr(yf_errors, "YFRateLimitError", ()))
+
+
+def chart_frame(payload):
+    """OHLCV frame from a chart response, prices adjusted by ``adjclose`` like ``auto_adjust=True``."""
+    import numpy as np
+    import pandas as pd
+
+    results = (payload.get("chart") or {}).get("result") or []
+    result = results[0] if results else {}
+    timestamps = result.get("timestamp") or []
+    quote = ((result.get("indicators") or {}).get("quote") or [{}])[0]
+    if not timestamps or not quote:
+        return pd.DataFrame(columns=["Open", "High", "Low", "Close", "Volume"])
+
+    def column(values):
+        return np.array([np.nan if v is None else v for v in values], dtype=float)
+
+    close = column(quote.get("close", []))
+    adjclose = (result["indicators"].get("adjclose") or [{}])[0].get("adjclose")
+    ratio = column(adjclose) / close if adjclose else np.ones(len(close))
+    tz = (result.get("meta") or {}).get("exchangeTimezoneName") or "UTC"
+    index = pd.to_datetime(np.asarray(timestamps, dtype=np.int64), unit="s", utc=True).tz_convert(tz).normalize()
+    df = pd.DataFrame({
+        "Open": column(quote.get("open", [])) * ratio,
+        "High": column(quote.get("high", [])) * ratio,
+        "Low": column(quote.get("low", [])) * ratio,
+        "Close": close * ratio,
+        "Volume": np.nan_to_num(column(quote.get("volume", []))).astype(np.int64),
+    }, index=pd.DatetimeIndex(index, name="Date"))
+    df = df[~np.isnan(df["Close"].to_numpy())]
+    return df[~df.index.duplicated(keep="last")]
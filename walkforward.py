@@ -0,0 +1,207 @@
+"""Walk-forward evaluation of MA crossover windows over ``Data/``.
+
+Each symbol's bars are cut into rolling folds of ``train`` bars followed by
+``test`` bars, moved forward by ``step`` (default ``test``) bars. ``step``
+may not be shorter than ``test``: test folds never overlap, so compounding
+their returns gives the out-of-sample equity of one account. The best
+(short, long) pair of a train fold is the one with the highest return there;
+it is then scored on the following test fold, so every reported test return
+is out of sample.
+
+Overlapping folds share all of their intermediate results. Per symbol, the
+averages of every window come from one prefix sum (``sweep.sma_table``) over
+the full history and the position of every pair from one ``holding_states``
+call on a (time x pair) matrix. The log return of a pair over a fold is the
+sum of the bar-to-bar log returns of the close over the bars it holds, so the
+returns of every pair on every fold are one (folds x time) @ (time x pair)
+product of fold-masked close returns with the positions. Averages at a fold's
+first bar use the bars before it, as they would have been known at the time.
+
+Fold returns assume the whole balance is invested while holding (fractional
+shares); ``sweep.py`` and ``backtest.py`` keep the integer-share remainder as
+cash, which only changes the numbers slightly.
+
+Symbols, and chunks of folds when there are fewer symbols than workers, run
+on a process pool reading the close matrix from shared memory.
+
+    python walkforward.py --short 5:50 --long 10:100 --train 120 --test 20
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from backtest import holding_states
+from barstore import BarStore
+from indicators import close_matrix
+from sweep import parse_range, sma_table, window_pairs
+
+
+def fold_rows(n, train, test, step=None):
+    """``(train start, test start, test end)`` row triples of the folds over ``n`` bars."""
+    step = step or test
+    if train < 2 or test < 2 or step < test:
+        raise ValueError("train and test must be at least 2 bars and step at least test")
+    starts = np.arange(0, max(n - train - test + 1, 0), step, dtype=np.int64)
+    return np.stack([starts, starts + train, starts + train + test], axis=1)
+
+
+def pair_positions(close, shorts, longs):
+    """(time x pair) boolean position of every (short, long) pair on ``close``."""
+    table = sma_table(close, np.union1d(shorts, longs))
+    windows = sorted(table)
+    averages = np.stack([table[w] for w in windows], axis=1)
+    return holding_states(averages[:, np.searchsorted(windows, shorts)],
+                          averages[:, np.searchsorted(windows, longs)])
+
+
+def fold_weights(log_returns, lo, hi):
+    """(folds x time) ``log_returns`` masked to bars ``lo .. hi - 2`` of each fold.
+
+    A position held at bar ``t`` earns ``log_returns[t]`` (close ``t`` to ``t + 1``);
+    the last bar of a fold only liquidates.
+    """
+    rows = np.arange(len(log_returns))
+    return ((rows >= lo[:, None]) & (rows < hi[:, None] - 1)) * log_returns
+
+
+def evaluate_folds(close, shorts, longs, folds):
+    """Best train pair per fold and its out-of-sample numbers, as arrays over the folds."""
+    close = np.asarray(close, dtype=np.float64)
+    holding = pair_positions(close, shorts, longs)
+    log_returns = np.zeros(len(close))
+    log_returns[:-1] = np.diff(np.log(close))
+    a, m, b = folds.T
+
+    train = fold_weights(log_returns, a, m) @ holding.astype(np.float64)
+    best = train.argmax(axis=1)
+    k = np.arange(len(folds))
+    chosen = holding[:, best].T
+    test = (fold_weights(log_returns, m, b) * chosen).sum(axis=1)
+
+    # entries of the chosen pair in its test fold; a position held at the start counts as entered there
+    rows = np.arange(len(close))
+    before = np.zeros_like(chosen)
+    before[:, 1:] = chosen[:, :-1]
+    before[k, m] = False
+    in_test = (rows >= m[:, None]) & (rows < b[:, None])
+    trades = (chosen & ~before & in_test).sum(axis=1)
+    return {
+        "best": best,
+        "trainReturn": np.expm1(train[k, best]),
+        "testReturn": np.expm1(test),
+        "testTrades": trades,
+        "buyHoldReturn": close[b - 1] / close[m] - 1,
+    }
+
+
+def _walk_task(task):
+    shm_name, shape, column, lo, hi, shorts, longs, folds = task
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        closes = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        close = np.array(closes[lo:hi, column])
+    finally:
+        shm.close()
+    return evaluate_folds(close, shorts, longs, folds)
+
+
+def walk_forward(store=None, shorts=range(5, 51), longs=range(10, 101), train=120, test=20, step=None,
+                 symbols=None, workers=None, pool=None):
+    """Per-fold rows and a per-symbol summary of the out-of-sample results.
+
+    ``pool`` is a process pool to reuse; without one a pool of ``workers`` is started per call.
+    """
+    store = store if store is not None else BarStore()
+    symbols = [s for s in (symbols or store.symbols()) if store.get(s) is not None]
+    bars = [store.get(s) for s in symbols]
+    short_w, long_w = window_pairs(shorts, longs)
+    folds = [fold_rows(len(b), train, test, step) for b in bars]
+    if len(short_w) == 0 or not any(len(f) for f in folds):
+        return {"folds": [], "symbols": []}
+
+    workers = workers or os.cpu_count() or 1
+    # fewer symbols than workers: split each symbol's folds so every core gets work
+    chunks = max(1, -(-workers // len(bars)))
+    closes, pads = close_matrix(bars)
+    tasks = []
+    for j, f in enumerate(folds):
+        for part in np.array_split(f, min(chunks, len(f))) if len(f) else ():
+            # bars up to the chunk's last test end; its folds share one position matrix
+            tasks.append([None, closes.shape, j, int(pads[j]), int(pads[j] + part[-1, 2]), short_w, long_w, part])
+
+    if workers == 1 or len(tasks) == 1:
+        results = [evaluate_folds(closes[t[3]:t[4], t[2]], short_w, long_w, t[7]) for t in tasks]
+    else:
+        shm = shared_memory.SharedMemory(create=True, size=max(closes.nbytes, 1))
+        try:
+            np.ndarray(closes.shape, dtype=np.float64, buffer=shm.buf)[:] = closes
+            for t in tasks:
+                t[0] = shm.name
+            if pool is not None:
+                results = list(pool.map(_walk_task, tasks))
+            else:
+                with ProcessPoolExecutor(max_workers=workers) as own:
+                    results = list(own.map(_walk_task, tasks))
+        finally:
+            shm.close()
+            shm.unlink()
+
+    rows = []
+    for t, r in zip(tasks, results):
+        b = bars[t[2]]
+        for i, (lo, mid, hi) in enumerate(t[7]):
+            rows.append({
+                "symbol": b.symbol,
+                "trainStart": str(b.dates[lo]),
+                "testStart": str(b.dates[mid]),
+                "testEnd": str(b.dates[hi - 1]),
+                "short": int(short_w[r["best"][i]]),
+                "long": int(long_w[r["best"][i]]),
+                "trainReturn": round(float(r["trainReturn"][i]), 6),
+                "testReturn": round(float(r["testReturn"][i]), 6),
+                "testTrades": int(r["testTrades"][i]),
+                "buyHoldReturn": round(float(r["buyHoldReturn"][i]), 6),
+            })
+
+    summary = {}
+    for row in rows:
+        s = summary.setdefault(row["symbol"], {"symbol": row["symbol"], "folds": 0, "meanTrainReturn": 0.0,
+                                               "testReturn": 1.0, "buyHoldReturn": 1.0})
+        s["folds"] += 1
+        s["meanTrainReturn"] += row["trainReturn"]
+        # test folds do not overlap (step >= test), so the product is the out-of-sample equity
+        s["testReturn"] *= 1 + row["testReturn"]
+        s["buyHoldReturn"] *= 1 + row["buyHoldReturn"]
+    for s in summary.values():
+        s["meanTrainReturn"] = round(s["meanTrainReturn"] / s["folds"], 6)
+        s["testReturn"] = round(s["testReturn"] - 1, 6)
+        s["buyHoldReturn"] = round(s["buyHoldReturn"] - 1, 6)
+    return {"folds": rows, "symbols": sorted(summary.values(), key=lambda s: s["testReturn"], reverse=True)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Walk-forward evaluation of MA crossover windows over Data/.")
+    parser.add_argument("--short", default="5:50", help="start:stop[:step], inclusive")
+    parser.add_argument("--long", default="10:100", help="start:stop[:step], inclusive")
+    parser.add_argument("--train", type=int, default=120, help="bars per train fold")
+    parser.add_argument("--test", type=int, default=20, help="bars per test fold")
+    parser.add_argument("--step", type=int, help="bars between fold starts, at least --test (default --test)")
+    parser.add_argument("--symbols", nargs="*")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args(argv)
+
+    result = walk_forward(shorts=parse_range(args.short), longs=parse_range(args.long), train=args.train,
+                          test=args.test, step=args.step, symbols=args.symbols, workers=args.workers)
+    print(f"{'symbol':<12}{'folds':>6}{'train/fold':>12}{'out-of-sample':>15}{'buy&hold':>10}")
+    for s in result["symbols"]:
+        print(f"{s['symbol']:<12}{s['folds']:>6}{s['meanTrainReturn']:>12.2%}{s['testReturn']:>15.2%}"
+              f"{s['buyHoldReturn']:>10.2%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())